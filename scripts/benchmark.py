@@ -0,0 +1,328 @@
+"""
+Suíte de benchmark dos caminhos críticos: ingestão (uma leitura por transação, como o menu,
+e em lote), listagem paginada de leituras, consultas do dashboard e passo de previsão. Com
+--sem-indices, mede também as consultas sobre Leitura forçando `IGNORE INDEX`, para comparar
+com o plano sem os índices compostos da migração 2.
+
+Semeia plantações "Benchmark Suite N" com leituras sintéticas (dataset_mock) e grava os
+resultados em JSON, com o commit e os parâmetros, para comparar execuções entre commits.
+
+Uso (com o MySQL do docker-compose no ar, ou outro servidor via FARMTECH_DB_HOST/FARMTECH_DB_PORT):
+    docker compose exec app python -m scripts.benchmark --leituras 1000000 --saida bench.json
+    docker compose exec app python -m scripts.benchmark --saida bench.json   # reaproveita os dados semeados
+    docker compose exec app python -m scripts.benchmark --leituras 10000000 --load-data --sem-indices
+    docker compose exec app python -m scripts.benchmark --limpar
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.agregados import atualizar_agregados
+from src.banco_dados import (
+    QUERY_INSERIR_LEITURA, codigo_tipo_sensor, conexao, criar_tabelas, inserir_leituras_em_lote, paginar_leituras
+)
+from src.consultas import consultar_leituras, escolher_fonte
+from src.dataset_mock import TIPOS_SINTETICOS, gerar_blocos_sinteticos, gerar_plantacoes_sinteticas, linhas_do_bloco
+from src.metadados import registrar_alteracao
+from src.populate_db import limpar_plantacoes
+from src.previsao import HORIZONTES_PADRAO, RegressaoIncremental, para_segundos, regressao_por_grupo
+
+PREFIXO = "Benchmark Suite"
+PERIODOS = {"24h": 1, "7d": 7, "30d": 30, "tudo": None}
+
+# Consultas sobre Leitura medidas com e sem os índices compostos (--sem-indices)
+CONSULTAS_INDICES = {
+    "dashboard_leituras_plantacao": """
+        SELECT L.data_hora, L.valor, T.nome AS tipo_sensor
+        FROM Leitura L {dica}
+        JOIN Sensor S ON L.id_sensor = S.id
+        JOIN TipoSensor T ON L.id_tipo = T.id
+        WHERE S.id_plantacao = %(id_plantacao)s
+        ORDER BY L.data_hora
+    """,
+    "sensor_ultimas_100": """
+        SELECT L.id, L.data_hora, L.valor
+        FROM Leitura L {dica}
+        WHERE L.id_sensor = %(id_sensor)s
+        ORDER BY L.data_hora DESC
+        LIMIT 100
+    """,
+    "listagem_100_recentes": """
+        SELECT L.id, L.id_sensor, L.data_hora, L.valor
+        FROM Leitura L {dica}
+        ORDER BY L.data_hora DESC, L.id DESC
+        LIMIT 100
+    """,
+}
+SEM_INDICES = "IGNORE INDEX (idx_leitura_sensor_data, idx_leitura_data)"
+
+def medir(funcao, repeticoes, aquecimento=1):
+    """Executa `funcao` e resume as latências em ms (a primeira execução só aquece caches)."""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    tempos = np.array(tempos)
+    return {
+        'repeticoes': repeticoes,
+        'mediana_ms': round(float(np.median(tempos)), 3),
+        'p95_ms': round(float(np.percentile(tempos, 95)), 3),
+        'min_ms': round(float(tempos.min()), 3),
+        'max_ms': round(float(tempos.max()), 3)
+    }
+
+def vazao(linhas, segundos):
+    return {'linhas': linhas, 'segundos': round(segundos, 3), 'linhas_por_s': round(linhas / max(segundos, 1e-9), 1)}
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def sensores_do_benchmark(conn):
+    """(id_plantacao, id_sensor, tipo) dos sensores das plantações do benchmark."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.id, s.id, s.tipo FROM Sensor s JOIN Plantacao p ON s.id_plantacao = p.id
+        WHERE p.nome LIKE %s ORDER BY p.id, s.id
+    """, (f"{PREFIXO} %",))
+    sensores = cursor.fetchall()
+    cursor.close()
+    return sensores
+
+def semear(conn, total_leituras, num_plantacoes, sensores_por_plantacao, intervalo_segundos, semente, usar_load_data):
+    """Cria as plantações/sensores do benchmark e carrega as leituras sintéticas; retorna a vazão da carga."""
+    cursor = conn.cursor()
+    sensores = []
+    for i, plantacao in enumerate(gerar_plantacoes_sinteticas(num_plantacoes, semente)):
+        cursor.execute(
+            "INSERT INTO Plantacao (nome, localizacao, umidade_ideal, ph_ideal_min, ph_ideal_max) VALUES (%s, %s, %s, %s, %s)",
+            (f"{PREFIXO} {i}", plantacao['localizacao'], plantacao['umidade_ideal'], plantacao['ph_ideal_min'], plantacao['ph_ideal_max'])
+        )
+        id_plantacao = cursor.lastrowid
+        for s in range(sensores_por_plantacao):
+            tipo = TIPOS_SINTETICOS[s % len(TIPOS_SINTETICOS)]
+            cursor.execute("INSERT INTO Sensor (tipo, id_plantacao) VALUES (%s, %s)", (tipo, id_plantacao))
+            sensores.append((cursor.lastrowid, tipo))
+    registrar_alteracao(cursor)
+    conn.commit()
+    cursor.close()
+
+    # Sem falhas simuladas, para que o total de leituras seja o pedido
+    fim = datetime.datetime.now().replace(microsecond=0)
+    inicio = fim - datetime.timedelta(seconds=total_leituras // len(sensores) * intervalo_segundos)
+    blocos = gerar_blocos_sinteticos(sensores, inicio, fim, intervalo_segundos, semente, taxa_falhas=0, taxa_interrupcoes=0)
+
+    t0 = time.perf_counter()
+    inseridas = inserir_leituras_em_lote(
+        (linhas_do_bloco(bloco) for bloco in blocos),
+        tamanho_lote=100000 if usar_load_data else 1000,
+        linhas_por_commit=500000,
+        usar_load_data=usar_load_data,
+        conn=None if usar_load_data else conn
+    )
+    return vazao(inseridas, time.perf_counter() - t0)
+
+def limpar(conn):
+    limpar_plantacoes(conn, prefixo=f"{PREFIXO} ")
+
+def _leituras_novas(sensores, n):
+    """n leituras recentes distribuídas entre os sensores, para os testes de ingestão."""
+    agora = datetime.datetime.now().replace(microsecond=0)
+    return [
+        (sensores[i % len(sensores)][1], sensores[i % len(sensores)][2], agora + datetime.timedelta(milliseconds=i), 50.0 + i % 20)
+        for i in range(n)
+    ]
+
+def medir_ingestao(conn, sensores, n_unitarias, n_lote, usar_load_data):
+    resultados = {}
+
+    # Como `inserir_leitura` do menu: um INSERT, o upsert dos agregados e um commit por leitura
+    cursor = conn.cursor()
+    t0 = time.perf_counter()
+    for id_sensor, tipo, data_hora, valor in _leituras_novas(sensores, n_unitarias):
+        linha = (id_sensor, codigo_tipo_sensor(tipo, conn), data_hora, valor)
+        cursor.execute(QUERY_INSERIR_LEITURA, linha)
+        atualizar_agregados(conn, [linha])
+        conn.commit()
+    resultados['unitaria'] = vazao(n_unitarias, time.perf_counter() - t0)
+    cursor.close()
+
+    t0 = time.perf_counter()
+    inseridas = inserir_leituras_em_lote(_leituras_novas(sensores, n_lote), conn=conn)
+    resultados['lote_executemany'] = vazao(inseridas, time.perf_counter() - t0)
+
+    if usar_load_data:
+        t0 = time.perf_counter()
+        inseridas = inserir_leituras_em_lote(_leituras_novas(sensores, n_lote), tamanho_lote=100000, usar_load_data=True)
+        resultados['lote_load_data'] = vazao(inseridas, time.perf_counter() - t0)
+    return resultados
+
+def medir_listagem(conn, id_plantacao, repeticoes, paginas_profundas=50):
+    resultados = {
+        'primeira_pagina': medir(lambda: paginar_leituras(conn), repeticoes),
+        'primeira_pagina_plantacao': medir(lambda: paginar_leituras(conn, id_plantacao=id_plantacao), repeticoes)
+    }
+    # Página distante do início: com keyset o custo deve ser o mesmo da primeira
+    apos = None
+    for _ in range(paginas_profundas):
+        pagina = paginar_leituras(conn, id_plantacao=id_plantacao, apos=apos)
+        if not pagina:
+            break
+        apos = (pagina[-1][3], pagina[-1][0])
+    resultados[f'pagina_{paginas_profundas}'] = medir(lambda: paginar_leituras(conn, id_plantacao=id_plantacao, apos=apos), repeticoes)
+    return resultados
+
+def medir_dashboard(conn, id_plantacao, repeticoes):
+    resultados = {}
+    frames = {}
+    for nome, dias in PERIODOS.items():
+        fonte = escolher_fonte(conn, id_plantacao, dias)
+        frames[nome] = df = consultar_leituras(conn, id_plantacao, dias, fonte)
+        resultado = {
+            'fonte': fonte,
+            'linhas': len(df),
+            'carga_completa': medir(lambda: consultar_leituras(conn, id_plantacao, dias, escolher_fonte(conn, id_plantacao, dias)), repeticoes)
+        }
+        if fonte == 'Leitura':
+            ultimo_id = int(df['id'].max()) if not df.empty else 0
+            resultado['delta'] = medir(lambda: consultar_leituras(conn, id_plantacao, dias, 'Leitura', apos_id=ultimo_id), repeticoes)
+        elif not df.empty:
+            ultimo_inicio = df['data_hora'].max()
+            resultado['delta'] = medir(lambda: consultar_leituras(conn, id_plantacao, dias, fonte, desde_inicio=ultimo_inicio), repeticoes)
+        resultados[nome] = resultado
+    return resultados, frames
+
+def medir_indices(conn, id_plantacao, id_sensor, repeticoes):
+    """Latência das consultas de CONSULTAS_INDICES com os índices compostos e forçando IGNORE INDEX."""
+    params = {'id_plantacao': id_plantacao, 'id_sensor': id_sensor}
+    cursor = conn.cursor()
+
+    def consultar(sql):
+        cursor.execute(sql, params)
+        cursor.fetchall()
+
+    try:
+        return {
+            nome: {
+                'com_indices': medir(lambda: consultar(sql.format(dica="")), repeticoes),
+                'sem_indices': medir(lambda: consultar(sql.format(dica=SEM_INDICES)), repeticoes)
+            }
+            for nome, sql in CONSULTAS_INDICES.items()
+        }
+    finally:
+        cursor.close()
+
+def medir_previsao(df, repeticoes):
+    """Passo de previsão do dashboard sobre um frame já carregado."""
+    if df.empty:
+        return {}
+
+    def incremental():
+        for _, grupo in df.groupby('tipo_sensor'):
+            previsor = RegressaoIncremental()
+            previsor.adicionar(para_segundos(grupo['data_hora']), grupo['valor'].to_numpy())
+            previsor.prever_horizontes(para_segundos(grupo['data_hora'].max()), HORIZONTES_PADRAO)
+
+    resultados = {
+        'linhas': len(df),
+        'regressao_incremental': medir(incremental, repeticoes),
+        'regressao_por_grupo': medir(lambda: regressao_por_grupo(df, ['tipo_sensor']), repeticoes)
+    }
+    try:
+        from sklearn.linear_model import LinearRegression
+    except ImportError:
+        return resultados
+
+    def sklearn():
+        # Caminho anterior do dashboard: um ajuste completo por tipo a cada atualização
+        for _, grupo in df.groupby('tipo_sensor'):
+            x = para_segundos(grupo['data_hora']).reshape(-1, 1)
+            LinearRegression().fit(x, grupo['valor'].to_numpy()).predict(x[-1:] + 3600)
+
+    resultados['sklearn_linear_regression'] = medir(sklearn, repeticoes)
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão, listagem, consultas do dashboard e previsão (saída em JSON).")
+    parser.add_argument('--leituras', type=int, default=0, help="Leituras a semear antes de medir (0 = usa as já semeadas)")
+    parser.add_argument('--plantacoes', type=int, default=10)
+    parser.add_argument('--sensores', type=int, default=3, help="Sensores por plantação")
+    parser.add_argument('--intervalo', type=int, default=60, help="Segundos entre leituras de um sensor")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--unitarias', type=int, default=500, help="Leituras no teste de ingestão unitária")
+    parser.add_argument('--lote', type=int, default=50000, help="Leituras no teste de ingestão em lote")
+    parser.add_argument('--load-data', action='store_true', help="Usa e mede também LOAD DATA LOCAL INFILE")
+    parser.add_argument('--sem-indices', action='store_true', help="Mede também as consultas sobre Leitura sem os índices compostos")
+    parser.add_argument('--saida', default='-', help="Arquivo JSON de saída ('-' para a saída padrão)")
+    parser.add_argument('--limpar', action='store_true', help="Remove os dados do benchmark e sai")
+    args = parser.parse_args()
+
+    with conexao() as conn:
+        if not conn:
+            sys.exit(1)
+        criar_tabelas(conn)
+        if args.limpar:
+            limpar(conn)
+            return
+
+        relatorio = {
+            'commit': _commit_atual(),
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'mysql': conn.get_server_info(),
+            'parametros': vars(args),
+            'resultados': {}
+        }
+        resultados = relatorio['resultados']
+
+        if args.leituras:
+            print(f"Semeando {args.leituras} leituras...", file=sys.stderr)
+            resultados['carga_inicial'] = semear(
+                conn, args.leituras, args.plantacoes, args.sensores, args.intervalo, args.semente, args.load_data
+            )
+        sensores = sensores_do_benchmark(conn)
+        if not sensores:
+            print("Nenhuma plantação de benchmark encontrada. Rode com --leituras N primeiro.", file=sys.stderr)
+            sys.exit(1)
+        id_plantacao = sensores[0][0]
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Leitura")
+        relatorio['leituras_na_tabela'] = cursor.fetchone()[0]
+        cursor.close()
+
+        print("Medindo consultas do dashboard...", file=sys.stderr)
+        resultados['dashboard'], frames = medir_dashboard(conn, id_plantacao, args.repeticoes)
+        print("Medindo previsão...", file=sys.stderr)
+        resultados['previsao'] = {nome: medir_previsao(df, args.repeticoes) for nome, df in frames.items()}
+        print("Medindo listagem...", file=sys.stderr)
+        resultados['listagem'] = medir_listagem(conn, id_plantacao, args.repeticoes)
+        if args.sem_indices:
+            print("Medindo consultas sem os índices compostos...", file=sys.stderr)
+            resultados['indices'] = medir_indices(conn, id_plantacao, sensores[0][1], args.repeticoes)
+        # Por último: a ingestão acrescenta leituras que mudariam as medições acima
+        print("Medindo ingestão...", file=sys.stderr)
+        resultados['ingestao'] = medir_ingestao(conn, sensores, args.unitarias, args.lote, args.load_data)
+
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False, default=str)
+    if args.saida == '-':
+        print(saida)
+    else:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(saida + '\n')
+        print(f"📊 Resultados gravados em {args.saida}.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
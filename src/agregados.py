@@ -0,0 +1,199 @@
+"""
+Agregados por hora (LeituraHora) e por dia (LeituraDia) de cada sensor: mínimo, máximo,
+soma, quantidade e último valor. A média é soma / quantidade.
+
+São mantidos incrementalmente pelo caminho de gravação (`banco_dados.inserir_leituras_em_lote`
+chama `atualizar_agregados` na mesma transação) e podem ser recalculados a partir de Leitura
+quando leituras são removidas, com o job:
+
+    python -m src.agregados                       # recalcula tudo
+    python -m src.agregados --desde 2024-01-01    # recalcula a partir de uma data
+"""
+import argparse
+import datetime
+
+import mysql.connector
+
+from src.armazenamento import dialeto
+
+TABELAS = {
+    'LeituraHora': lambda dh: dh.replace(minute=0, second=0, microsecond=0),
+    'LeituraDia': lambda dh: dh.replace(hour=0, minute=0, second=0, microsecond=0)
+}
+
+# Início do intervalo de cada tabela, em SQL
+_INICIO_SQL = {
+    'LeituraHora': "TIMESTAMP(DATE(data_hora), MAKETIME(HOUR(data_hora), 0, 0))",
+    'LeituraDia': "TIMESTAMP(DATE(data_hora))"
+}
+
+def ddl_agregado(tabela):
+    return (
+        f"CREATE TABLE IF NOT EXISTS `{tabela}` ("
+        "  `id_sensor` INT NOT NULL,"
+        "  `inicio` DATETIME NOT NULL,"
+        "  `id_tipo` TINYINT UNSIGNED NOT NULL,"
+        "  `minimo` FLOAT NOT NULL,"
+        "  `maximo` FLOAT NOT NULL,"
+        "  `soma` DOUBLE NOT NULL,"
+        "  `quantidade` INT UNSIGNED NOT NULL,"
+        "  `ultimo_valor` FLOAT NOT NULL,"
+        "  `ultima_data` DATETIME NOT NULL,"
+        "  PRIMARY KEY (`id_sensor`, `inicio`),"
+        f"  CONSTRAINT `fk_{tabela.lower()}_sensor` FOREIGN KEY (`id_sensor`) REFERENCES `Sensor`(`id`) ON DELETE CASCADE"
+        ") ENGINE=InnoDB"
+    )
+
+def _upsert(tabela, dialeto_conn='mysql'):
+    if dialeto_conn != 'mysql':
+        # SQLite/DuckDB: as expressões do SET veem a linha antiga, então a ordem não importa
+        return f"""
+            INSERT INTO {tabela} (id_sensor, inicio, id_tipo, minimo, maximo, soma, quantidade, ultimo_valor, ultima_data)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (id_sensor, inicio) DO UPDATE SET
+                minimo = MIN(minimo, excluded.minimo),
+                maximo = MAX(maximo, excluded.maximo),
+                soma = soma + excluded.soma,
+                quantidade = quantidade + excluded.quantidade,
+                ultimo_valor = CASE WHEN excluded.ultima_data >= ultima_data THEN excluded.ultimo_valor ELSE ultimo_valor END,
+                ultima_data = MAX(ultima_data, excluded.ultima_data)
+        """
+    # ultimo_valor é atribuído antes de ultima_data: o MySQL avalia as atribuições em ordem
+    return f"""
+        INSERT INTO {tabela} (id_sensor, inicio, id_tipo, minimo, maximo, soma, quantidade, ultimo_valor, ultima_data)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) AS novo
+        ON DUPLICATE KEY UPDATE
+            minimo = LEAST({tabela}.minimo, novo.minimo),
+            maximo = GREATEST({tabela}.maximo, novo.maximo),
+            soma = {tabela}.soma + novo.soma,
+            quantidade = {tabela}.quantidade + novo.quantidade,
+            ultimo_valor = IF(novo.ultima_data >= {tabela}.ultima_data, novo.ultimo_valor, {tabela}.ultimo_valor),
+            ultima_data = GREATEST({tabela}.ultima_data, novo.ultima_data)
+    """
+
+def _como_datetime(data_hora):
+    if isinstance(data_hora, str):
+        return datetime.datetime.fromisoformat(data_hora)
+    return data_hora
+
+def atualizar_agregados(conn, linhas):
+    """
+    Soma um lote de linhas de Leitura (id_sensor, id_tipo, data_hora, valor) aos agregados.
+    O lote é reduzido em memória a uma linha por sensor e intervalo antes do upsert,
+    então o custo no banco cresce com o número de intervalos tocados, não de leituras.
+    Não confirma a transação: quem chama faz o commit junto com as leituras.
+    """
+    cursor = conn.cursor()
+    try:
+        for tabela, truncar in TABELAS.items():
+            intervalos = {}
+            for id_sensor, id_tipo, data_hora, valor in linhas:
+                data_hora = _como_datetime(data_hora)
+                chave = (id_sensor, truncar(data_hora))
+                atual = intervalos.get(chave)
+                if atual is None:
+                    intervalos[chave] = [id_tipo, valor, valor, valor, 1, valor, data_hora]
+                    continue
+                atual[1] = min(atual[1], valor)
+                atual[2] = max(atual[2], valor)
+                atual[3] += valor
+                atual[4] += 1
+                if data_hora >= atual[6]:
+                    atual[5], atual[6] = valor, data_hora
+            if intervalos:
+                cursor.executemany(_upsert(tabela, dialeto(conn)), [chave + tuple(v) for chave, v in intervalos.items()])
+    finally:
+        cursor.close()
+
+def _reconstruir_dia(conn, cursor, dia, filtro_sensor="", extra=()):
+    # Refaz os agregados do dia a partir de Leitura, sem confirmar a transação
+    proximo = dia + datetime.timedelta(days=1)
+    for tabela in TABELAS:
+        cursor.execute(
+            f"DELETE FROM {tabela} WHERE inicio >= %s AND inicio < %s{filtro_sensor}",
+            (dia, proximo) + extra
+        )
+        if dialeto(conn) != 'mysql':
+            continue
+        cursor.execute(f"""
+            INSERT INTO {tabela} (id_sensor, inicio, id_tipo, minimo, maximo, soma, quantidade, ultimo_valor, ultima_data)
+            SELECT id_sensor, {_INICIO_SQL[tabela]} AS inicio, MAX(id_tipo), MIN(valor), MAX(valor), SUM(valor), COUNT(*),
+                   CAST(SUBSTRING_INDEX(GROUP_CONCAT(valor ORDER BY data_hora DESC, id DESC), ',', 1) AS DOUBLE),
+                   MAX(data_hora)
+            FROM Leitura
+            WHERE data_hora >= %s AND data_hora < %s{filtro_sensor}
+            GROUP BY id_sensor, inicio
+        """, (dia, proximo) + extra)
+    if dialeto(conn) != 'mysql':
+        # Backend embarcado: as leituras do dia passam pela mesma redução da ingestão
+        cursor.execute(
+            f"SELECT id_sensor, id_tipo, data_hora, valor FROM Leitura"
+            f" WHERE data_hora >= %s AND data_hora < %s{filtro_sensor} ORDER BY data_hora, id",
+            (dia, proximo) + extra
+        )
+        atualizar_agregados(conn, cursor.fetchall())
+
+def recalcular_dias(conn, dias_por_sensor):
+    """
+    Reconstrói os agregados só dos dias afetados ({id_sensor: {dia, ...}}), sem confirmar a
+    transação: quem remove leituras refaz os agregados no mesmo commit da remoção.
+    """
+    cursor = conn.cursor()
+    try:
+        for id_sensor, dias in dias_por_sensor.items():
+            for dia in sorted(dias):
+                _reconstruir_dia(conn, cursor, TABELAS['LeituraDia'](_como_datetime(dia)), " AND id_sensor = %s", (id_sensor,))
+    finally:
+        cursor.close()
+
+def recalcular_agregados(conn, desde=None, ate=None, id_sensor=None):
+    """
+    Reconstrói os agregados a partir de Leitura, um dia por transação, para o período
+    [desde, ate) (padrão: todo o histórico) e, opcionalmente, um único sensor.
+    Use após remover leituras, que não podem ser descontadas de mínimos/máximos.
+    """
+    cursor = conn.cursor()
+    try:
+        filtro_sensor = " AND id_sensor = %s" if id_sensor is not None else ""
+        extra = (id_sensor,) if id_sensor is not None else ()
+        if desde is None or ate is None:
+            cursor.execute(f"SELECT MIN(data_hora), MAX(data_hora) FROM Leitura WHERE 1 = 1{filtro_sensor}", extra)
+            minimo, maximo = cursor.fetchone()
+            if minimo is None:
+                minimo = maximo = datetime.datetime.now()
+            desde = desde or minimo
+            ate = ate or _como_datetime(maximo) + datetime.timedelta(days=1)
+
+        dia = TABELAS['LeituraDia'](_como_datetime(desde))
+        ate = _como_datetime(ate)
+        dias = 0
+        while dia < ate:
+            _reconstruir_dia(conn, cursor, dia, filtro_sensor, extra)
+            conn.commit()
+            dia += datetime.timedelta(days=1)
+            dias += 1
+        return dias
+    finally:
+        cursor.close()
+
+def main():
+    from src.banco_dados import conexao # import local: banco_dados depende deste módulo
+
+    parser = argparse.ArgumentParser(description="Recalcula os agregados por hora e por dia de Leitura.")
+    parser.add_argument('--desde', type=datetime.datetime.fromisoformat, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument('--ate', type=datetime.datetime.fromisoformat, help="Data final, exclusiva (AAAA-MM-DD)")
+    parser.add_argument('--sensor', type=int, help="Recalcula apenas este sensor")
+    args = parser.parse_args()
+
+    with conexao() as conn:
+        if not conn:
+            return
+        try:
+            dias = recalcular_agregados(conn, args.desde, args.ate, args.sensor)
+            print(f"📊 Agregados recalculados para {dias} dia(s).")
+        except mysql.connector.Error as err:
+            print(f"Erro ao recalcular agregados: {err}")
+            conn.rollback()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Motor de alertas das leituras recebidas contra os limites ideais de cada plantação.
+
+Os limites (Plantacao.umidade_ideal, ph_ideal_min e ph_ideal_max) ficam num índice em memória
+id_sensor -> (plantação, tipo, mínimo, máximo, histerese), montado a partir do cache de
+metadados (src/metadados.py) e remontado quando ele muda (cadastro ou alteração em qualquer
+processo), quando aparece um sensor desconhecido ou após `invalidar()`. Avaliar uma leitura é
+uma consulta a dicionário, sem SQL por leitura.
+
+Cada sensor tem um estado ('ok', 'baixo' ou 'alto'). A mudança de estado exige CONFIRMACOES
+leituras seguidas na nova situação (debounce), e a volta ao normal exige passar do limite pela
+margem de HISTERESE, para um valor oscilando na borda não gerar uma rajada de alertas.
+Cada mudança vira um registro em Alerta, gravado em lote (não uma transação por alerta).
+
+Usado pelos serviços de ingestão com --alertas (src/ingestao_serial.py e src/ingestao_http.py).
+"""
+import time
+
+import mysql.connector
+
+from src.banco_dados import conexao
+from src.metadados import atualizar_metadados, geracao_metadados, metadados_vencidos, obter_plantacoes, obter_sensores
+from src.metricas import medido
+
+TOLERANCIA_UMIDADE = 10.0 # pontos percentuais aceitos em torno de umidade_ideal
+HISTERESE = {'umidade': 2.0, 'ph': 0.1} # margem para voltar ao normal depois de um alerta
+CONFIRMACOES = 3 # leituras seguidas na nova situação antes de mudar de estado
+INTERVALO_SENSOR_DESCONHECIDO = 1.0 # segundos mínimos entre recargas por sensor desconhecido
+TAMANHO_LOTE_ALERTAS = 100 # alertas acumulados antes de gravar
+INTERVALO_PERSISTENCIA = 5.0 # segundos máximos que um alerta espera para ser gravado
+MAX_ALERTAS_PENDENTES = 10000 # com o banco fora do ar, os mais antigos são descartados
+
+MENSAGENS = {
+    ('umidade', 'baixo'): "🚨 Umidade abaixo do ideal: irrigar",
+    ('umidade', 'alto'): "🚨 Umidade acima do ideal: suspender a irrigação",
+    ('ph', 'baixo'): "🚨 pH abaixo do ideal: solo ácido",
+    ('ph', 'alto'): "🚨 pH acima do ideal: solo alcalino",
+}
+
+QUERY_INSERIR_ALERTA = """
+    INSERT INTO Alerta (id_sensor, id_plantacao, situacao, valor, limite, data_hora)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+def limites_do_sensor(tipo, umidade_ideal, ph_ideal_min, ph_ideal_max):
+    """(mínimo, máximo, histerese) aceitos para o tipo de sensor, ou None se o tipo não tem limites."""
+    if tipo == 'umidade' and umidade_ideal is not None:
+        return umidade_ideal - TOLERANCIA_UMIDADE, umidade_ideal + TOLERANCIA_UMIDADE, HISTERESE['umidade']
+    if tipo == 'ph' and ph_ideal_min is not None and ph_ideal_max is not None:
+        return ph_ideal_min, ph_ideal_max, HISTERESE['ph']
+    return None
+
+def _classificar(valor, atual, minimo, maximo, histerese):
+    # Já em alerta, só volta quando o valor passa do limite pela margem de histerese
+    if atual == 'baixo' and valor < minimo + histerese:
+        return 'baixo'
+    if atual == 'alto' and valor > maximo - histerese:
+        return 'alto'
+    if valor < minimo:
+        return 'baixo'
+    if valor > maximo:
+        return 'alto'
+    return 'ok'
+
+class MotorAlertas:
+    """
+    Avalia as leituras em fluxo e grava as mudanças de situação em Alerta.
+    Não é seguro entre threads: use a partir de uma única thread (a de escrita da ingestão).
+    """
+
+    def __init__(self, confirmacoes=CONFIRMACOES, ao_alertar=None):
+        self.confirmacoes = confirmacoes
+        self.ao_alertar = ao_alertar # função chamada com cada alerta (além do print)
+        self.total_alertas = 0
+        self._indice = {} # id_sensor -> (id_plantacao, tipo, mínimo, máximo, histerese) ou None (sem limites)
+        self._estados = {} # id_sensor -> [situação atual, situação candidata, leituras seguidas na candidata]
+        self._pendentes = [] # linhas de Alerta aguardando gravação
+        self._geracao = None # geração do cache de metadados usada no índice
+        self._ultima_recarga = 0.0
+        self._ultima_persistencia = time.monotonic()
+
+    def invalidar(self):
+        """Força a conferência dos limites na próxima avaliação (ex: após alterar uma plantação)."""
+        self._geracao = None
+
+    def carregar(self, forcar=True):
+        """
+        Atualiza o cache de metadados (src/metadados.py) e, se ele mudou, remonta o índice de limites.
+        Retorna False se o banco estiver indisponível (o índice atual continua valendo).
+        """
+        self._ultima_recarga = time.monotonic()
+        with conexao() as conn:
+            if not conn or not atualizar_metadados(conn, forcar=forcar):
+                return False
+        if self._geracao != geracao_metadados():
+            self._montar_indice()
+        return True
+
+    def _montar_indice(self):
+        plantacoes = obter_plantacoes()
+        indice = {}
+        for id_sensor, (tipo, id_plantacao) in obter_sensores().items():
+            plantacao = plantacoes.get(id_plantacao)
+            limites = None if plantacao is None else limites_do_sensor(
+                tipo, plantacao['umidade_ideal'], plantacao['ph_ideal_min'], plantacao['ph_ideal_max']
+            )
+            # Sensores sem limites (ex: temperatura) entram como None: conhecidos, mas não avaliados
+            indice[id_sensor] = None if limites is None else (id_plantacao, tipo) + limites
+        self._indice = indice
+        # Sensores removidos deixam de ter estado; os demais mantêm o estado atual
+        self._estados = {id_sensor: estado for id_sensor, estado in self._estados.items() if indice.get(id_sensor)}
+        self._geracao = geracao_metadados()
+
+    @medido('alertas.avaliar')
+    def avaliar(self, leituras):
+        """
+        Avalia leituras (id_sensor, tipo_sensor, data_hora, valor) ou dicts com essas chaves, na ordem
+        em que chegaram. Retorna os alertas gerados: dicts com sensor, plantação, situação, valor e limite.
+        """
+        if self._geracao is None:
+            self.carregar()
+        elif metadados_vencidos():
+            self.carregar(forcar=False) # confere a versão dos metadados (uma consulta de uma linha)
+        indice = self._indice
+        estados = self._estados
+        alertas = []
+        for leitura in leituras:
+            if isinstance(leitura, dict):
+                id_sensor, data_hora, valor = leitura['id_sensor'], leitura['data_hora'], leitura['valor']
+            else:
+                id_sensor, _, data_hora, valor = leitura
+            if id_sensor not in indice:
+                # Sensor cadastrado depois da última carga: recarrega, no máximo uma vez por segundo
+                if time.monotonic() - self._ultima_recarga < INTERVALO_SENSOR_DESCONHECIDO:
+                    continue
+                self.carregar()
+                indice, estados = self._indice, self._estados
+            limites = indice.get(id_sensor)
+            if limites is None:
+                continue
+            id_plantacao, tipo, minimo, maximo, histerese = limites
+            estado = estados.get(id_sensor)
+            if estado is None:
+                estado = estados[id_sensor] = ['ok', 'ok', 0]
+            situacao = _classificar(valor, estado[0], minimo, maximo, histerese)
+            if situacao == estado[0]:
+                estado[1], estado[2] = situacao, 0
+                continue
+            if situacao == estado[1]:
+                estado[2] += 1
+            else:
+                estado[1], estado[2] = situacao, 1
+            if estado[2] < self.confirmacoes:
+                continue
+            anterior = estado[0]
+            estado[0], estado[2] = situacao, 0
+            # Limite cruzado: o da nova situação ou, na volta ao normal, o da situação anterior
+            limite = minimo if (anterior if situacao == 'ok' else situacao) == 'baixo' else maximo
+            alertas.append({
+                'id_sensor': id_sensor, 'id_plantacao': id_plantacao, 'tipo_sensor': tipo, 'situacao': situacao,
+                'anterior': anterior, 'valor': valor, 'limite': limite, 'data_hora': data_hora
+            })
+        for alerta in alertas:
+            self._notificar(alerta)
+        self.persistir()
+        return alertas
+
+    def _notificar(self, alerta):
+        self.total_alertas += 1
+        self._pendentes.append((
+            alerta['id_sensor'], alerta['id_plantacao'], alerta['situacao'],
+            alerta['valor'], alerta['limite'], alerta['data_hora']
+        ))
+        if alerta['situacao'] == 'ok':
+            mensagem = f"✅ {alerta['tipo_sensor'].capitalize()} de volta à faixa ideal"
+        else:
+            mensagem = MENSAGENS[(alerta['tipo_sensor'], alerta['situacao'])]
+        print(f"{mensagem} (plantação {alerta['id_plantacao']}, sensor {alerta['id_sensor']}: "
+              f"{alerta['valor']:.2f}, limite {alerta['limite']:.2f}).")
+        if self.ao_alertar is not None:
+            self.ao_alertar(alerta)
+
+    @medido('alertas.persistir', linhas=int)
+    def persistir(self, forcar=False):
+        """
+        Grava os alertas pendentes numa única transação quando acumulam TAMANHO_LOTE_ALERTAS
+        ou o mais antigo espera há INTERVALO_PERSISTENCIA segundos (ou sempre, com `forcar`).
+        """
+        if not self._pendentes:
+            self._ultima_persistencia = time.monotonic()
+            return 0
+        vencido = time.monotonic() - self._ultima_persistencia >= INTERVALO_PERSISTENCIA
+        if not (forcar or vencido or len(self._pendentes) >= TAMANHO_LOTE_ALERTAS):
+            return 0
+        self._ultima_persistencia = time.monotonic()
+        lote = self._pendentes
+        with conexao() as conn:
+            if not conn:
+                del lote[:-MAX_ALERTAS_PENDENTES] # tenta de novo no próximo intervalo
+                return 0
+            cursor = conn.cursor()
+            try:
+                try:
+                    cursor.executemany(QUERY_INSERIR_ALERTA, lote)
+                except mysql.connector.IntegrityError as err:
+                    # Sensor removido depois do alerta: descarta só as linhas dele e grava as demais
+                    conn.rollback()
+                    ids = sorted({linha[0] for linha in lote})
+                    cursor.execute(f"SELECT id FROM Sensor WHERE id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+                    existentes = {id_sensor for (id_sensor,) in cursor.fetchall()}
+                    validas = [linha for linha in lote if linha[0] in existentes]
+                    if len(validas) == len(lote):
+                        print(f"⚠️ Alertas descartados: {err}")
+                        self._pendentes = []
+                        return 0
+                    print(f"⚠️ {len(lote) - len(validas)} alertas de sensores removidos descartados.")
+                    lote[:] = validas
+                    if lote:
+                        cursor.executemany(QUERY_INSERIR_ALERTA, lote)
+                conn.commit()
+            except mysql.connector.Error as err:
+                print(f"Erro ao gravar alertas: {err}")
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass # conexão perdida
+                del lote[:-MAX_ALERTAS_PENDENTES]
+                return 0
+            finally:
+                cursor.close()
+        self._pendentes = []
+        return len(lote)
@@ -0,0 +1,80 @@
+"""
+Redução de séries temporais para gráficos, com NumPy.
+
+Um gráfico não mostra mais pontos do que tem de pixels de largura; enviar milhões de leituras
+ao navegador só custa serialização e renderização. As funções abaixo escolhem quais pontos
+manter preservando o formato da série (e os picos) e devolvem os índices escolhidos.
+"""
+import numpy as np
+
+LARGURA_GRAFICO_PX = 1200 # largura aproximada de um gráfico no layout "wide" do dashboard
+
+def _como_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+def lttb(x, y, n_pontos):
+    """
+    Largest-Triangle-Three-Buckets: divide a série em n_pontos - 2 baldes e, em cada um, mantém
+    o ponto que forma o maior triângulo com o ponto escolhido no balde anterior e a média do
+    próximo. A área é calculada vetorialmente dentro de cada balde.
+    """
+    x = _como_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    baldes = n_pontos - 2
+    limites = np.linspace(1, n - 1, baldes + 1).astype(np.int64)
+    tamanhos = np.diff(limites)
+    media_x = np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / tamanhos
+    media_y = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / tamanhos
+
+    escolhidos = np.empty(n_pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    a = 0
+    for i in range(baldes):
+        inicio, fim = limites[i], limites[i + 1]
+        if i < baldes - 1:
+            cx, cy = media_x[i + 1], media_y[i + 1]
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - cx) * (y[inicio:fim] - y[a]) - (x[a] - x[inicio:fim]) * (cy - y[a]))
+        a = inicio + int(np.argmax(area))
+        escolhidos[i + 1] = a
+    return escolhidos
+
+def min_max(y, n_pontos):
+    """
+    Mantém o mínimo e o máximo de cada um dos n_pontos / 2 baldes (e as extremidades), sem laço
+    em Python: `reduceat` dá os extremos de todos os baldes e uma busca acha a posição de cada um.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    baldes = n_pontos // 2
+    if n_pontos >= n or baldes < 1:
+        return np.arange(n)
+
+    limites = np.linspace(0, n, baldes + 1).astype(np.int64)
+    inicios, tamanhos = limites[:-1], np.diff(limites)
+    indices = [[0, n - 1]]
+    for extremo in (np.minimum, np.maximum):
+        valores = np.repeat(extremo.reduceat(y, inicios), tamanhos)
+        posicoes = np.flatnonzero(y == valores)
+        indices.append(posicoes[np.searchsorted(posicoes, inicios)]) # primeira ocorrência em cada balde
+    return np.unique(np.concatenate(indices))
+
+def reduzir_serie(serie, n_pontos=LARGURA_GRAFICO_PX, metodo='lttb'):
+    """Reduz uma pd.Series indexada por data/hora (em ordem) a no máximo ~n_pontos pontos."""
+    if len(serie) <= n_pontos:
+        return serie
+    if metodo == 'lttb':
+        indices = lttb(serie.index.values, serie.values, n_pontos)
+    elif metodo == 'minmax':
+        indices = min_max(serie.values, n_pontos)
+    else:
+        raise ValueError(f"Método de redução desconhecido: '{metodo}'")
+    return serie.iloc[indices]
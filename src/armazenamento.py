@@ -0,0 +1,276 @@
+"""
+Backends de armazenamento embarcados, para rodar perto dos sensores sem um servidor MySQL.
+
+    FARMTECH_BACKEND=mysql      (padrão) servidor MySQL configurado em banco_dados.DB_CONFIG
+    FARMTECH_BACKEND=sqlite     arquivo SQLite local em modo WAL (FARMTECH_SQLITE_ARQUIVO),
+                                bom para ingestão: escritas sequenciais e leituras simultâneas
+    FARMTECH_ANALITICO=duckdb   com o SQLite, as consultas de leitura do dashboard passam pelo
+                                DuckDB (colunar e vetorizado) lendo o mesmo arquivo
+
+O restante do código continua escrevendo SQL no dialeto do MySQL com parâmetros %s: as conexões
+embarcadas traduzem as poucas construções específicas usadas fora das migrações e convertem os
+erros do driver em mysql.connector.Error, para que os tratamentos de erro existentes continuem valendo.
+"""
+import datetime
+import functools
+import os
+import re
+import sqlite3
+import threading
+
+import mysql.connector
+
+BACKEND = os.environ.get('FARMTECH_BACKEND', 'mysql').lower()
+ANALITICO = os.environ.get('FARMTECH_ANALITICO', '').lower()
+ARQUIVO_SQLITE = os.environ.get('FARMTECH_SQLITE_ARQUIVO', os.path.join('dados', 'farmtech.db'))
+TIMEOUT_SQLITE = 10.0 # segundos esperando outro processo liberar a escrita
+
+# Esquema completo (equivalente ao MySQL após todas as migrações, sem partições)
+ESQUEMA_SQLITE = [
+    """CREATE TABLE IF NOT EXISTS Plantacao (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome VARCHAR(255) NOT NULL,
+        localizacao VARCHAR(255) NOT NULL,
+        umidade_ideal FLOAT DEFAULT 60.0,
+        ph_ideal_min FLOAT DEFAULT 6.0,
+        ph_ideal_max FLOAT DEFAULT 7.0
+    )""",
+    """CREATE TABLE IF NOT EXISTS Sensor (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo VARCHAR(50) NOT NULL,
+        id_plantacao INTEGER NOT NULL REFERENCES Plantacao(id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS TipoSensor (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome VARCHAR(50) NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS Leitura (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_sensor INTEGER NOT NULL REFERENCES Sensor(id) ON DELETE CASCADE,
+        id_tipo INTEGER NOT NULL REFERENCES TipoSensor(id),
+        data_hora DATETIME NOT NULL,
+        valor FLOAT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_leitura_sensor_data ON Leitura (id_sensor, data_hora)",
+    "CREATE INDEX IF NOT EXISTS idx_leitura_data ON Leitura (data_hora, id)"
+] + [
+    f"""CREATE TABLE IF NOT EXISTS {tabela} (
+        id_sensor INTEGER NOT NULL REFERENCES Sensor(id) ON DELETE CASCADE,
+        inicio DATETIME NOT NULL,
+        id_tipo INTEGER NOT NULL,
+        minimo FLOAT NOT NULL,
+        maximo FLOAT NOT NULL,
+        soma DOUBLE NOT NULL,
+        quantidade INTEGER NOT NULL,
+        ultimo_valor FLOAT NOT NULL,
+        ultima_data DATETIME NOT NULL,
+        PRIMARY KEY (id_sensor, inicio)
+    ) WITHOUT ROWID"""
+    for tabela in ('LeituraHora', 'LeituraDia')
+] + [
+    f"CREATE INDEX IF NOT EXISTS idx_{tabela.lower()}_inicio ON {tabela} (inicio)"
+    for tabela in ('LeituraHora', 'LeituraDia')
+] + [
+    """CREATE TABLE IF NOT EXISTS Alerta (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_sensor INTEGER NOT NULL REFERENCES Sensor(id) ON DELETE CASCADE,
+        id_plantacao INTEGER NOT NULL,
+        situacao VARCHAR(10) NOT NULL,
+        valor FLOAT NOT NULL,
+        limite FLOAT NOT NULL,
+        data_hora DATETIME NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_alerta_data ON Alerta (data_hora)",
+    "CREATE TABLE IF NOT EXISTS MetadadosVersao (id INTEGER PRIMARY KEY, versao INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO MetadadosVersao (id, versao) VALUES (1, 0)"
+]
+
+# Construções do MySQL usadas nas consultas comuns -> equivalente em cada dialeto
+_UNIDADES = {'DAY': ('days', 'to_days'), 'HOUR': ('hours', 'to_hours')}
+_REGRAS = {
+    'sqlite': [
+        (re.compile(r"DATE\(NOW\(\) - INTERVAL %s DAY\)"), lambda m: "date('now', 'localtime', '-' || %s || ' days')"),
+        (re.compile(r"NOW\(\) - INTERVAL %s (DAY|HOUR)"),
+         lambda m: f"datetime('now', 'localtime', '-' || %s || ' {_UNIDADES[m.group(1)][0]}')"),
+        (re.compile(r"\bINSERT IGNORE\b"), lambda m: "INSERT OR IGNORE")
+    ],
+    'duckdb': [
+        (re.compile(r"DATE\(NOW\(\) - INTERVAL %s DAY\)"),
+         lambda m: "CAST(CAST(current_localtimestamp() AS TIMESTAMP) - to_days(CAST(%s AS INTEGER)) AS DATE)"),
+        (re.compile(r"NOW\(\) - INTERVAL %s (DAY|HOUR)"),
+         lambda m: f"CAST(current_localtimestamp() AS TIMESTAMP) - {_UNIDADES[m.group(1)][1]}(CAST(%s AS INTEGER))"),
+        (re.compile(r"\bINSERT IGNORE\b"), lambda m: "INSERT OR IGNORE")
+    ]
+}
+
+def dialeto(conn):
+    """'mysql' para conexões do mysql.connector; 'sqlite' ou 'duckdb' para as embarcadas."""
+    return getattr(conn, 'dialeto', 'mysql')
+
+@functools.lru_cache(maxsize=512)
+def traduzir_sql(sql, dialeto):
+    """Reescreve uma consulta no dialeto do MySQL (parâmetros %s) para o dialeto embarcado (parâmetros ?)."""
+    for padrao, substituto in _REGRAS[dialeto]:
+        sql = padrao.sub(substituto, sql)
+    return re.sub(r"%[s%]", lambda m: '?' if m.group() == '%s' else '%', sql)
+
+def _parametro(valor):
+    # datetime (inclusive pd.Timestamp) vira texto ISO, como o SQLite compara datas; escalares NumPy viram nativos
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=' ', timespec='seconds')
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+def _converter_erro(erro):
+    nome = type(erro).__name__
+    if 'Integrity' in nome or 'Constraint' in nome:
+        return mysql.connector.errors.IntegrityError(msg=str(erro))
+    return mysql.connector.errors.DatabaseError(msg=str(erro))
+
+class _CursorEmbarcado:
+    """Cursor com a interface usada do mysql.connector sobre um cursor SQLite/DuckDB."""
+
+    def __init__(self, cursor, dialeto, erros):
+        self._cursor = cursor
+        self.dialeto = dialeto
+        self._erros = erros
+
+    def execute(self, sql, params=()):
+        try:
+            self._cursor.execute(traduzir_sql(sql, self.dialeto), tuple(_parametro(p) for p in params or ()))
+        except self._erros as erro:
+            raise _converter_erro(erro) from erro
+        return self
+
+    def executemany(self, sql, linhas):
+        try:
+            self._cursor.executemany(traduzir_sql(sql, self.dialeto), [tuple(_parametro(p) for p in linha) for linha in linhas])
+        except self._erros as erro:
+            raise _converter_erro(erro) from erro
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, tamanho=1):
+        return self._cursor.fetchmany(tamanho)
+
+    def __iter__(self):
+        return iter(self._cursor.fetchone, None)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return getattr(self._cursor, 'lastrowid', None)
+
+    def close(self):
+        self._cursor.close()
+
+class ConexaoEmbarcada:
+    """Conexão SQLite/DuckDB com a interface usada do mysql.connector (cursor, commit, rollback, close)."""
+
+    def __init__(self, conn, dialeto, erros):
+        self._conn = conn
+        self.dialeto = dialeto
+        self._erros = erros
+
+    def cursor(self, *args, **kwargs):
+        return _CursorEmbarcado(self._conn.cursor(), self.dialeto, self._erros)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def get_server_info(self):
+        return f"{self.dialeto} {sqlite3.sqlite_version if self.dialeto == 'sqlite' else ''}".strip()
+
+sqlite3.register_converter('DATETIME', lambda texto: datetime.datetime.fromisoformat(texto.decode()))
+
+_esquema_criado = False
+_esquema_lock = threading.Lock()
+
+def criar_esquema_embarcado(conn):
+    """Cria as tabelas e índices do backend embarcado, se ainda não existirem."""
+    cursor = conn.cursor()
+    try:
+        for ddl in ESQUEMA_SQLITE:
+            cursor.execute(ddl)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def conectar_sqlite(arquivo=ARQUIVO_SQLITE):
+    """
+    Abre o arquivo SQLite em modo WAL: leitores (dashboard) não bloqueiam o escritor (ingestão)
+    e cada commit é um append no log. synchronous=NORMAL dispensa o fsync por commit; uma queda
+    de energia pode perder as últimas transações, mas nunca corrompe o arquivo.
+    Cria o esquema na primeira conexão do processo.
+    """
+    global _esquema_criado
+    pasta = os.path.dirname(arquivo)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    try:
+        bruta = sqlite3.connect(arquivo, timeout=TIMEOUT_SQLITE, detect_types=sqlite3.PARSE_DECLTYPES)
+        bruta.execute("PRAGMA journal_mode=WAL")
+        bruta.execute("PRAGMA synchronous=NORMAL")
+        bruta.execute("PRAGMA foreign_keys=ON")
+    except sqlite3.Error as erro:
+        raise _converter_erro(erro) from erro
+    conn = ConexaoEmbarcada(bruta, 'sqlite', (sqlite3.Error,))
+    if not _esquema_criado:
+        with _esquema_lock:
+            if not _esquema_criado:
+                criar_esquema_embarcado(conn)
+                _esquema_criado = True
+    return conn
+
+_duckdb = None # conexão compartilhada; False se o DuckDB não pôde ser usado
+_duckdb_lock = threading.Lock()
+
+def conectar_duckdb(arquivo=ARQUIVO_SQLITE):
+    """
+    Conexão DuckDB (somente leitura) ao arquivo SQLite, para as consultas analíticas do dashboard.
+    Retorna None se o pacote duckdb (opcional) não estiver instalado ou a extensão sqlite não carregar.
+    """
+    global _duckdb
+    try:
+        import duckdb
+    except ImportError:
+        return None
+    with _duckdb_lock:
+        if _duckdb is False:
+            return None
+        if _duckdb is None:
+            try:
+                banco = duckdb.connect()
+                try:
+                    banco.execute("LOAD sqlite")
+                except duckdb.Error:
+                    banco.execute("INSTALL sqlite")
+                    banco.execute("LOAD sqlite")
+                caminho = os.path.abspath(arquivo).replace("'", "''")
+                banco.execute(f"ATTACH '{caminho}' AS farmtech (TYPE sqlite, READ_ONLY)")
+                banco.execute("USE farmtech")
+            except duckdb.Error as erro:
+                print(f"⚠️ DuckDB indisponível, consultas seguem pelo SQLite: {erro}")
+                _duckdb = False
+                return None
+            _duckdb = banco
+    # Cada chamada recebe um cursor próprio (conexão duplicada), seguro para uso em outra thread
+    return ConexaoEmbarcada(_duckdb.cursor(), 'duckdb', (duckdb.Error,))
@@ -0,0 +1,357 @@
+"""
+Arquivo colunar das leituras em arquivos Arrow IPC (padrão) ou Parquet, um por plantação e dia:
+
+    dados/arquivo/plantacao=3/2025-05-20.arrow
+
+Cada dia completo é exportado (id, id_sensor, tipo_sensor, data_hora, valor em colunas, com o
+tipo do sensor em dicionário) e o manifesto registra até quando o arquivo vai (`corte`) e o maior
+id de Leitura existente na última exportação (`id_maximo`): o arquivo tem exatamente as leituras
+anteriores ao corte com id até esse valor. As leituras antes do corte podem então sair do MySQL
+pela retenção de src/particoes.py sem perder o histórico bruto, e as consultas de leituras do
+dashboard (src/consultas.py) juntam o arquivo com as linhas do banco depois do corte e com as
+gravadas depois da exportação com data antiga (cargas retroativas, reenvio do spool), que a
+próxima execução anexa aos arquivos dos seus dias.
+
+Remoções de leituras pelo banco_dados, src/lote.py e src/populate_db.py também as retiram do
+arquivo (`remover_do_arquivo`, `apagar_arquivo`), para que o dashboard não as mostre de volta.
+
+Arquivos Arrow são lidos com memory map: as colunas apontam para as páginas do arquivo, sem
+cópia nem decodificação, e só os trechos usados são lidos do disco. Parquet ocupa menos espaço
+(compressão) mas precisa ser decodificado na leitura. Análises longas podem usar `ler_tabela`
+diretamente (pyarrow.compute, numpy) sem passar pelo banco.
+
+Requer o pacote pyarrow (opcional); sem ele, o arquivo é ignorado e tudo vem do banco.
+
+    python -m src.arquivamento                         # arquiva os dias completos ainda não arquivados
+    python -m src.arquivamento --ate 2025-01-01 --formato parquet
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import shutil
+import time
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+from src.banco_dados import conexao
+from src.metricas import medido
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow é opcional
+    pa = None
+
+DIRETORIO_ARQUIVO = os.environ.get('FARMTECH_ARQUIVO_DIR', os.path.join('dados', 'arquivo'))
+FORMATOS = {'arrow': '.arrow', 'parquet': '.parquet'}
+MARGEM_DIAS = 1 # dias recentes não arquivados por padrão: leituras atrasadas ainda podem chegar
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+if pa is not None:
+    ESQUEMA = pa.schema([
+        ('id', pa.int64()),
+        ('id_sensor', pa.int32()),
+        ('tipo_sensor', pa.dictionary(pa.int8(), pa.string())),
+        ('data_hora', pa.timestamp('us')),
+        ('valor', pa.float32()) # Leitura.valor é FLOAT
+    ])
+
+def pyarrow_disponivel():
+    return pa is not None
+
+def _caminho(diretorio, id_plantacao, dia, formato):
+    return os.path.join(diretorio, f"plantacao={id_plantacao}", f"{dia:%Y-%m-%d}{FORMATOS[formato]}")
+
+def ler_manifesto(diretorio=DIRETORIO_ARQUIVO):
+    """Dict com `corte` (ISO; leituras anteriores estão arquivadas) e `formato`, ou None se não há arquivo."""
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+def _salvar_manifesto(diretorio, manifesto):
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo)
+    os.replace(caminho + '.tmp', caminho)
+
+def corte_arquivo(diretorio=DIRETORIO_ARQUIVO):
+    """Data (datetime) antes da qual as leituras estão no arquivo, ou None (sem arquivo ou sem pyarrow)."""
+    return limites_arquivo(diretorio)[0]
+
+def limites_arquivo(diretorio=DIRETORIO_ARQUIVO):
+    """
+    (corte, id_maximo): o arquivo tem as leituras anteriores ao corte com id até id_maximo; as
+    demais estão só no banco. (None, None) sem arquivo ou sem pyarrow; id_maximo é None em arquivos
+    gravados antes de ele ser registrado (tudo antes do corte é considerado arquivado).
+    """
+    if pa is None:
+        return None, None
+    manifesto = ler_manifesto(diretorio)
+    if not manifesto or not manifesto.get('corte'):
+        return None, None
+    return datetime.datetime.fromisoformat(manifesto['corte']), manifesto.get('id_maximo')
+
+def _gravar(tabela, caminho, formato):
+    """Grava a tabela no arquivo de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    if formato == 'parquet':
+        pq.write_table(tabela, temporario, compression='zstd')
+    else:
+        # IPC sem compressão: é o que permite ler as colunas direto das páginas mapeadas
+        with pa.OSFile(temporario, 'wb') as destino, pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+def _ordenar(tabela):
+    # Junta os blocos (e os dicionários de tipo de cada um) antes de ordenar por data
+    return tabela.unify_dictionaries().combine_chunks().sort_by([('data_hora', 'ascending'), ('id', 'ascending')])
+
+@medido('arquivamento.arquivar_dia', linhas=int)
+def arquivar_dia(conn, dia, diretorio=DIRETORIO_ARQUIVO, formato='arrow', id_maximo=None, apos_id=None):
+    """
+    Exporta as leituras do dia com id até `id_maximo` (um arquivo por plantação, substituindo o
+    existente). Com `apos_id`, exporta só as de id maior e as anexa aos arquivos já gravados do dia.
+    Retorna quantas leituras foram exportadas.
+    """
+    filtro, params = "", ()
+    if id_maximo is not None:
+        filtro += " AND L.id <= %s"
+        params += (id_maximo,)
+    if apos_id is not None:
+        filtro += " AND L.id > %s"
+        params += (apos_id,)
+    cursor = conn.cursor()
+    try:
+        # Uma consulta por dia: o intervalo de data_hora lê uma única partição de Leitura
+        cursor.execute(f"""
+            SELECT S.id_plantacao, L.id, L.id_sensor, T.nome, L.data_hora, L.valor
+            FROM Leitura L
+            JOIN Sensor S ON L.id_sensor = S.id
+            JOIN TipoSensor T ON L.id_tipo = T.id
+            WHERE L.data_hora >= %s AND L.data_hora < %s{filtro}
+            ORDER BY S.id_plantacao, L.data_hora, L.id
+        """, (dia, dia + datetime.timedelta(days=1)) + params)
+        linhas = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not linhas:
+        return 0
+
+    plantacoes, ids, sensores, tipos, datas, valores = zip(*linhas)
+    tabela = pa.table([
+        pa.array(ids, pa.int64()),
+        pa.array(sensores, pa.int32()),
+        pa.array(tipos, pa.string()).dictionary_encode().cast(ESQUEMA.field('tipo_sensor').type),
+        pa.array(pd.to_datetime(pd.Series(datas)), pa.timestamp('us')),
+        pa.array(valores, pa.float32())
+    ], schema=ESQUEMA)
+    # Linhas já ordenadas por plantação: cada plantação é uma fatia contígua (slice não copia)
+    plantacoes = np.asarray(plantacoes)
+    inicios = np.concatenate(([0], np.flatnonzero(plantacoes[1:] != plantacoes[:-1]) + 1))
+    fins = np.append(inicios[1:], len(plantacoes))
+    for inicio, fim in zip(inicios, fins):
+        caminho = _caminho(diretorio, int(plantacoes[inicio]), dia, formato)
+        fatia = tabela.slice(inicio, fim - inicio)
+        if apos_id is not None and os.path.exists(caminho):
+            # Descarta o que uma execução interrompida já tinha anexado: reexecutar não duplica
+            existente = _ler_arquivo(caminho)
+            existente = existente.filter(pc.less_equal(existente['id'], pa.scalar(apos_id, pa.int64())))
+            fatia = _ordenar(pa.concat_tables([existente, fatia]))
+        _gravar(fatia, caminho, formato)
+    return len(linhas)
+
+def _dias_com_leituras_novas(conn, corte, apos_id, id_maximo):
+    """Dias antes do corte com leituras gravadas depois da última exportação (id em (apos_id, id_maximo])."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT DISTINCT DATE(data_hora) FROM Leitura WHERE id > %s AND id <= %s AND data_hora < %s",
+            (apos_id, id_maximo, corte)
+        )
+        dias = [datetime.date.fromisoformat(str(dia)) for (dia,) in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return [datetime.datetime.combine(dia, datetime.time()) for dia in sorted(dias)]
+
+def arquivar(conn, ate=None, diretorio=DIRETORIO_ARQUIVO, formato='arrow'):
+    """
+    Arquiva os dias completos desde o último corte (ou desde a leitura mais antiga) até `ate`
+    (padrão: hoje menos MARGEM_DIAS), avançando o corte do manifesto a cada dia gravado: uma
+    interrupção retoma do dia seguinte ao último arquivado. Retorna o número de leituras arquivadas.
+    """
+    if pa is None:
+        print("⚠️ O arquivo colunar requer o pacote pyarrow (pip install pyarrow).")
+        return 0
+    hoje = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    ate = datetime.datetime.combine(ate, datetime.time()) if ate else hoje - datetime.timedelta(days=MARGEM_DIAS)
+    manifesto = ler_manifesto(diretorio) or {'corte': None, 'formato': formato}
+    if manifesto['corte'] and manifesto['formato'] != formato:
+        print(f"⚠️ O arquivo em {diretorio} usa o formato {manifesto['formato']}; mantendo-o.")
+        formato = manifesto['formato']
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(data_hora), MAX(id) FROM Leitura")
+        primeira, id_maximo = cursor.fetchone()
+    finally:
+        cursor.close()
+    if id_maximo is None:
+        print("Nenhuma leitura para arquivar.")
+        return 0
+
+    os.makedirs(diretorio, exist_ok=True)
+    total = 0
+    inicio = time.perf_counter()
+    if manifesto['corte']:
+        dia = datetime.datetime.fromisoformat(manifesto['corte'])
+        anterior = manifesto.get('id_maximo')
+        if anterior is None: # arquivo gravado antes do id_maximo ser registrado
+            anterior = _maior_id_arquivado(diretorio)
+            manifesto['id_maximo'] = anterior
+            _salvar_manifesto(diretorio, manifesto)
+        if anterior < id_maximo:
+            # Leituras com data já arquivada gravadas depois da última exportação: anexa aos dias delas
+            for dia_antigo in _dias_com_leituras_novas(conn, dia, anterior, id_maximo):
+                total += arquivar_dia(conn, dia_antigo, diretorio, formato, id_maximo, apos_id=anterior)
+    else:
+        primeira = pd.Timestamp(primeira).to_pydatetime()
+        dia = datetime.datetime.combine(primeira.date(), datetime.time())
+
+    # Enquanto o id_maximo do manifesto não sobe, a leitura ignora no arquivo as linhas acima dele
+    # (que ainda vêm do banco): uma interrupção aqui não esconde nem duplica leituras
+    manifesto.setdefault('id_maximo', 0)
+    while dia < ate:
+        total += arquivar_dia(conn, dia, diretorio, formato, id_maximo)
+        dia += datetime.timedelta(days=1)
+        manifesto.update(corte=dia.isoformat(sep=' '), formato=formato)
+        _salvar_manifesto(diretorio, manifesto)
+    manifesto.update(corte=dia.isoformat(sep=' '), formato=formato, id_maximo=id_maximo)
+    _salvar_manifesto(diretorio, manifesto)
+    print(f"📦 {total} leituras arquivadas em {time.perf_counter() - inicio:.1f}s; arquivo até {dia:%Y-%m-%d}.")
+    return total
+
+def _arquivos(diretorio, id_plantacao='*'):
+    """Arquivos de dia gravados (sem os .tmp de uma gravação interrompida), em ordem de data."""
+    return [caminho for caminho in sorted(glob.glob(os.path.join(diretorio, f"plantacao={id_plantacao}", '*')))
+            if os.path.splitext(caminho)[1] in FORMATOS.values()]
+
+def _maior_id_arquivado(diretorio):
+    maior = 0
+    for caminho in _arquivos(diretorio):
+        tabela = _ler_arquivo(caminho)
+        if tabela.num_rows:
+            maior = max(maior, pc.max(tabela['id']).as_py())
+    return maior
+
+def _ler_arquivo(caminho):
+    if caminho.endswith(FORMATOS['parquet']):
+        return pq.read_table(caminho, memory_map=True)
+    # Memory map: a tabela referencia as páginas do arquivo, sem copiar os dados para a memória do processo
+    with pa.memory_map(caminho, 'r') as origem:
+        return pa.ipc.open_file(origem).read_all()
+
+def ler_tabela(id_plantacao, desde=None, ate=None, diretorio=DIRETORIO_ARQUIVO, tipos=None):
+    """
+    Tabela pyarrow com as leituras arquivadas da plantação em [desde, ate), em ordem de data,
+    opcionalmente só dos `tipos` de sensor. Só os arquivos dos dias do intervalo são abertos;
+    sem filtro de tipos, apenas os dias das pontas são filtrados (cópia), os demais entram como estão.
+    """
+    if pa is None:
+        return None
+    primeiro = desde.date() if desde is not None else None
+    ultimo = ate.date() if ate is not None else None
+    id_maximo = limites_arquivo(diretorio)[1]
+    partes = []
+    for caminho in _arquivos(diretorio, id_plantacao):
+        dia = datetime.date.fromisoformat(os.path.splitext(os.path.basename(caminho))[0])
+        if (primeiro is not None and dia < primeiro) or (ultimo is not None and dia > ultimo):
+            continue
+        tabela = _ler_arquivo(caminho)
+        if id_maximo is not None and tabela.num_rows and pc.max(tabela['id']).as_py() > id_maximo:
+            # Linhas de uma exportação ainda não concluída: até ela terminar, vêm do banco
+            tabela = tabela.filter(pc.less_equal(tabela['id'], pa.scalar(id_maximo, pa.int64())))
+        if desde is not None and dia == primeiro:
+            tabela = tabela.filter(pc.greater_equal(tabela['data_hora'], pa.scalar(desde, pa.timestamp('us'))))
+        if ate is not None and dia == ultimo:
+            tabela = tabela.filter(pc.less(tabela['data_hora'], pa.scalar(ate, pa.timestamp('us'))))
+        if tipos:
+            tabela = tabela.filter(pc.is_in(tabela['tipo_sensor'], value_set=pa.array(list(tipos), pa.string())))
+        partes.append(tabela)
+    if not partes:
+        return ESQUEMA.empty_table()
+    return pa.concat_tables(partes) # junta as fatias sem copiá-las
+
+@medido('arquivamento.ler_leituras', linhas=len)
+def ler_leituras(id_plantacao, desde=None, ate=None, diretorio=DIRETORIO_ARQUIVO, tipos=None):
+    """Leituras arquivadas no formato de consultas.consultar_leituras (fonte Leitura), ou None sem pyarrow."""
+    tabela = ler_tabela(id_plantacao, desde, ate, diretorio, tipos)
+    if tabela is None:
+        return None
+    df = tabela.select(['id', 'data_hora', 'valor', 'tipo_sensor']).to_pandas(split_blocks=True)
+    df['valor'] = df['valor'].astype('float64')
+    df['tipo_sensor'] = df['tipo_sensor'].astype(str) # mesmo tipo das colunas de texto do read_sql_query
+    return df
+
+def remover_do_arquivo(ids_sensores=None, ids_leituras=None, ate=None, dias=None, diretorio=DIRETORIO_ARQUIVO):
+    """
+    Retira do arquivo as leituras dos `ids_sensores` (só as anteriores a `ate`, se dado) ou com os
+    `ids_leituras`, removidas do banco, regravando só os arquivos que as contêm; arquivos que ficam
+    vazios são apagados. `dias` (datas) limita os arquivos examinados. Retorna quantas foram retiradas.
+    """
+    if pa is None or ler_manifesto(diretorio) is None or (not ids_sensores and not ids_leituras):
+        return 0
+    if ids_sensores:
+        coluna, valores = 'id_sensor', pa.array(sorted(set(ids_sensores)), pa.int32())
+    else:
+        coluna, valores = 'id', pa.array(sorted(set(ids_leituras)), pa.int64())
+    nomes_dias = {f"{dia:%Y-%m-%d}" for dia in dias} if dias is not None else None
+    retiradas = 0
+    for caminho in _arquivos(diretorio):
+        nome, extensao = os.path.splitext(os.path.basename(caminho))
+        if nomes_dias is not None and nome not in nomes_dias:
+            continue
+        tabela = _ler_arquivo(caminho)
+        removidas = pc.is_in(tabela[coluna], value_set=valores)
+        if ate is not None:
+            removidas = pc.and_(removidas, pc.less(tabela['data_hora'], pa.scalar(ate, pa.timestamp('us'))))
+        quantidade = pc.sum(removidas).as_py() or 0
+        if not quantidade:
+            continue
+        retiradas += quantidade
+        if quantidade == tabela.num_rows:
+            os.remove(caminho)
+        else:
+            _gravar(tabela.filter(pc.invert(removidas)), caminho, 'parquet' if extensao == FORMATOS['parquet'] else 'arrow')
+    return retiradas
+
+def apagar_arquivo(diretorio=DIRETORIO_ARQUIVO):
+    """Apaga todo o arquivo (dias e manifesto), ex: quando o banco é esvaziado."""
+    if os.path.isdir(diretorio):
+        shutil.rmtree(diretorio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquiva as leituras em arquivos colunares por plantação e dia.")
+    parser.add_argument('--ate', type=datetime.date.fromisoformat, help="Arquiva os dias antes desta data (AAAA-MM-DD)")
+    parser.add_argument('--formato', choices=list(FORMATOS), default='arrow')
+    parser.add_argument('--diretorio', default=DIRETORIO_ARQUIVO)
+    args = parser.parse_args()
+
+    with conexao() as conn:
+        if not conn:
+            return
+        try:
+            arquivar(conn, args.ate, args.diretorio, args.formato)
+        except mysql.connector.Error as err:
+            print(f"Erro ao arquivar leituras: {err}")
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,74 @@
 import mysql.connector
-from mysql.connector import errorcode
+from mysql.connector import errorcode, pooling
+from contextlib import contextmanager
+import csv
 import datetime
-
+import os
+import sys
+import tempfile
+import threading
+import time
+from src.agregados import atualizar_agregados, recalcular_agregados
+from src.armazenamento import ANALITICO, BACKEND, conectar_duckdb, conectar_sqlite, criar_esquema_embarcado, dialeto
+from src.metadados import atualizar_metadados, obter_plantacao, obter_sensor, registrar_alteracao, sensores_da_plantacao
+from src.metricas import medido, medir_conexao
+from src.migracoes import aplicar_migracoes
+from src.particoes import garantir_particoes_futuras
+
+# As variáveis FARMTECH_DB_* permitem apontar para outro MySQL (ex: um servidor local fora do docker-compose)
 DB_CONFIG = {
-    'user': 'farmtech_user',
-    'password': 'password',
-    'host': 'db',  #'db' é o nome do serviço no docker-compose.yml
-    'database': 'farmtech_db',
-    'port': 3306
+    'user': os.environ.get('FARMTECH_DB_USER', 'farmtech_user'),
+    'password': os.environ.get('FARMTECH_DB_PASSWORD', 'password'),
+    'host': os.environ.get('FARMTECH_DB_HOST', 'db'),  #'db' é o nome do serviço no docker-compose.yml
+    'database': os.environ.get('FARMTECH_DB_NAME', 'farmtech_db'),
+    'port': int(os.environ.get('FARMTECH_DB_PORT', 3306))
+}
+
+# Pool de conexões compartilhado por banco_dados, populate_db e dashboard.
+# O tamanho deve ficar bem abaixo do max_connections do MySQL (padrão 151) e o conector limita a 32.
+POOL_CONFIG = {
+    'pool_name': 'farmtech_pool',
+    'pool_size': int(os.environ.get('FARMTECH_POOL_SIZE', 5)),
+    'pool_reset_session': True
 }
+POOL_TIMEOUT = float(os.environ.get('FARMTECH_POOL_TIMEOUT', 10)) # segundos esperando uma conexão livre
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool():
+    """
+    Cria o pool de conexões na primeira chamada e o reutiliza nas seguintes.
+    O próprio pool verifica a conexão (ping) ao entregá-la e reconecta se ela tiver caído.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(**POOL_CONFIG, **DB_CONFIG)
+                print(f"Conexão com o banco de dados estabelecida (pool de {POOL_CONFIG['pool_size']} conexões).")
+    return _pool
 
 def criar_conexao():
-    """Cria e retorna uma conexão com o banco de dados MySQL."""
+    """
+    Retorna uma conexão do pool compartilhado; `conn.close()` a devolve ao pool.
+    Se todas estiverem em uso, espera até POOL_TIMEOUT segundos por uma conexão livre.
+    Com FARMTECH_BACKEND=sqlite, abre uma conexão ao arquivo local (ver src/armazenamento.py).
+    Os comandos da conexão são medidos por src/metricas.py.
+    """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        print("Conexão com o banco de dados estabelecida.")
-        return conn
+        if BACKEND == 'sqlite':
+            return medir_conexao(conectar_sqlite())
+        pool = obter_pool()
+        limite = time.monotonic() + POOL_TIMEOUT
+        while True:
+            try:
+                return medir_conexao(pool.get_connection())
+            except mysql.connector.errors.PoolError:
+                if time.monotonic() >= limite:
+                    print("Erro ao conectar ao banco de dados: todas as conexões do pool estão em uso.")
+                    return None
+                time.sleep(0.05)
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             print("Erro de acesso: verifique usuário e senha.")
@@ -25,10 +78,41 @@ def criar_conexao():
             print(f"Erro ao conectar ao banco de dados: {err}")
         return None
 
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool (ou None, se indisponível) e a devolve ao sair do bloco `with`."""
+    conn = criar_conexao()
+    try:
+        yield conn
+    finally:
+        if conn:
+            conn.close()
+
+@contextmanager
+def conexao_analitica():
+    """
+    Conexão para consultas somente de leitura (dashboard). Com o SQLite e FARMTECH_ANALITICO=duckdb,
+    as consultas rodam no DuckDB sobre o mesmo arquivo; nos demais casos é a conexão normal.
+    """
+    conn = medir_conexao(conectar_duckdb()) if BACKEND == 'sqlite' and ANALITICO == 'duckdb' else None
+    if conn is None:
+        with conexao() as conn:
+            yield conn
+        return
+    try:
+        yield conn
+    finally:
+        conn.close()
+
 def criar_tabelas(conn):
     """Cria as tabelas no banco de dados se não existirem."""
+    if dialeto(conn) != 'mysql':
+        criar_esquema_embarcado(conn) # esquema completo de uma vez: sem migrações nem partições
+        return
+
     cursor = conn.cursor()
     
+    # Esquema da versão 1; as alterações posteriores ficam em src/migracoes.py
     tabelas = {
         'Plantacao': (
             "CREATE TABLE IF NOT EXISTS `Plantacao` ("
@@ -69,6 +153,55 @@ def criar_tabelas(conn):
             print(f"Erro ao criar tabela {nome_tabela}: {err.msg}")
             
     cursor.close()
+    aplicar_migracoes(conn) # leva o esquema da versão 1 acima até a versão mais recente
+    try:
+        garantir_particoes_futuras(conn)
+    except mysql.connector.Error as err:
+        print(f"Erro ao criar partições futuras de Leitura: {err}")
+
+_codigos_tipo_sensor = {} # nome do tipo -> TipoSensor.id; códigos nunca mudam depois de criados
+
+def codigo_tipo_sensor(nome, conn=None):
+    """
+    Retorna o código compacto (TipoSensor.id) gravado em Leitura.id_tipo para o tipo de sensor.
+    Tipos ainda fora do cache são lidos (e, se novos, cadastrados) na conexão de quem chama,
+    dentro da transação dela: não se toma outra conexão do pool com uma já emprestada. Sem
+    `conn`, uma conexão é emprestada só para isso.
+    Quem desfaz uma transação que pode ter cadastrado tipos chama `esquecer_codigos_tipo_sensor`.
+    """
+    nome = nome.strip().lower()
+    codigo = _codigos_tipo_sensor.get(nome)
+    if codigo is not None:
+        return codigo
+
+    if conn is None:
+        with conexao() as propria:
+            if not propria:
+                raise mysql.connector.Error("Sem conexão para consultar os tipos de sensor.")
+            codigo = codigo_tipo_sensor(nome, propria)
+            propria.commit()
+            return codigo
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT IGNORE INTO TipoSensor (nome) VALUES (%s)", (nome,))
+        cursor.execute("SELECT id, nome FROM TipoSensor")
+        _codigos_tipo_sensor.update({n: i for i, n in cursor.fetchall()})
+    finally:
+        cursor.close()
+    if nome not in _codigos_tipo_sensor:
+        # INSERT IGNORE não cadastra com os 255 códigos de TipoSensor.id (TINYINT UNSIGNED) em uso
+        raise mysql.connector.Error(f"Tipo de sensor '{nome}' não cadastrado: TipoSensor não tem mais códigos livres.")
+    return _codigos_tipo_sensor[nome]
+
+def esquecer_codigos_tipo_sensor():
+    """Descarta o cache de códigos (ex: a transação que cadastrou um tipo foi desfeita); a próxima consulta o relê."""
+    _codigos_tipo_sensor.clear()
+
+QUERY_INSERIR_LEITURA = """
+    INSERT INTO Leitura (id_sensor, id_tipo, data_hora, valor)
+    VALUES (%s, %s, %s, %s)
+"""
 
 def inserir_plantacao():
     conn = criar_conexao()
@@ -87,6 +220,7 @@ def inserir_plantacao():
             VALUES (%s, %s, %s, %s, %s)
         """
         cursor.execute(query, (nome, local, umidade, ph_min, ph_max))
+        registrar_alteracao(cursor)
         conn.commit()
         print("🌱 Plantação cadastrada com sucesso!")
     except ValueError:
@@ -103,13 +237,12 @@ def inserir_sensor():
     cursor = conn.cursor()
 
     try:
-        listar_plantacoes_simples() # Lista as plantações sem abrir nova conexão
+        listar_plantacoes_simples(conn) # Lista as plantações sem abrir nova conexão
         id_plantacao = int(input("ID da plantação à qual o sensor pertence: "))
         tipo = input("Tipo do sensor (ex: Umidade, pH, Temperatura): ")
         
-        # Verificar se a plantação existe
-        cursor.execute("SELECT id FROM Plantacao WHERE id = %s", (id_plantacao,))
-        if not cursor.fetchone():
+        # Verificar se a plantação existe (cache de metadados, sem consulta por busca)
+        if obter_plantacao(conn, id_plantacao) is None:
             print("⚠️ Plantação não encontrada!")
             return
 
@@ -118,6 +251,7 @@ def inserir_sensor():
             VALUES (%s, %s)
         """
         cursor.execute(query, (tipo, id_plantacao))
+        registrar_alteracao(cursor)
         conn.commit()
         print("📡 Sensor cadastrado com sucesso!")
     except ValueError:
@@ -134,34 +268,145 @@ def inserir_leitura():
     cursor = conn.cursor()
 
     try:
-        listar_sensores_simples() # Lista os sensores sem abrir nova conexão
+        listar_sensores_simples(conn) # Lista os sensores sem abrir nova conexão
         id_sensor = int(input("ID do sensor: "))
         
-        cursor.execute('SELECT tipo FROM Sensor WHERE id = %s', (id_sensor,))
-        resultado = cursor.fetchone()
-        if not resultado:
+        sensor = obter_sensor(conn, id_sensor)
+        if not sensor:
             print("⚠️ Sensor não encontrado!")
             return
-        tipo_sensor = resultado[0]
+        tipo_sensor = sensor[0]
 
         valor = float(input(f"Valor da leitura para o sensor de '{tipo_sensor}': "))
         data_hora = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        query = """
-            INSERT INTO Leitura (id_sensor, tipo_sensor, data_hora, valor) 
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(query, (id_sensor, tipo_sensor, data_hora, valor))
+        linha = (id_sensor, codigo_tipo_sensor(tipo_sensor, conn), data_hora, valor)
+        cursor.execute(QUERY_INSERIR_LEITURA, linha)
+        atualizar_agregados(conn, [linha])
         conn.commit()
         print("📊 Leitura registrada com sucesso!")
     except ValueError:
         print("⚠️ Entrada inválida. Certifique-se de inserir números para o ID do sensor e o valor da leitura.")
     except mysql.connector.Error as err:
         print(f"Erro ao inserir leitura: {err}")
+        esquecer_codigos_tipo_sensor() # a transação é descartada ao fechar: um tipo cadastrado nela também
     finally:
         cursor.close()
         conn.close()
 
+
+def _normalizar_leituras(leituras, conn):
+    """
+    Aceita tuplas (id_sensor, tipo_sensor, data_hora, valor), dicts com essas chaves
+    (formato de dataset_mock.gerar_leituras_mock) ou listas (lotes) desses itens,
+    e os devolve como linhas de Leitura (id_sensor, id_tipo, data_hora, valor).
+    """
+    for item in leituras:
+        if isinstance(item, list):
+            yield from _normalizar_leituras(item, conn)
+            continue
+        if isinstance(item, dict):
+            item = (item['id_sensor'], item['tipo_sensor'], item['data_hora'], item['valor'])
+        id_sensor, tipo_sensor, data_hora, valor = item
+        yield (id_sensor, codigo_tipo_sensor(tipo_sensor, conn), data_hora, valor)
+
+def _carregar_arquivo_leituras(conn, lote):
+    """Grava o lote num CSV temporário e o envia com LOAD DATA LOCAL INFILE."""
+    with tempfile.NamedTemporaryFile('w', newline='', suffix='.csv', delete=False) as arquivo:
+        csv.writer(arquivo).writerows(lote)
+        caminho = arquivo.name
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s INTO TABLE Leitura "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\r\\n' "
+            "(id_sensor, id_tipo, data_hora, valor)",
+            (caminho,)
+        )
+        cursor.close()
+    finally:
+        os.remove(caminho)
+
+@medido('banco_dados.inserir_leituras_em_lote', linhas=int)
+def inserir_leituras_em_lote(leituras, tamanho_lote=1000, linhas_por_commit=10000, usar_load_data=False, conn=None):
+    """
+    Insere muitas leituras de uma vez, sem interação com o usuário.
+
+    - tamanho_lote: linhas por INSERT multi-linha (executemany) ou por arquivo do LOAD DATA.
+    - linhas_por_commit: a cada quantas linhas a transação é confirmada.
+    - usar_load_data: usa LOAD DATA LOCAL INFILE, o caminho mais rápido para cargas históricas grandes
+      (exige `local_infile=1` no servidor; abre uma conexão dedicada com `allow_local_infile`).
+    - conn: conexão a reutilizar; se omitida, uma conexão é obtida e devolvida ao final.
+      Em caso de erro, só as linhas desta chamada ainda não confirmadas são desfeitas (até um
+      SAVEPOINT); o que o chamador já tinha na transação fica para ele confirmar ou desfazer.
+
+    Retorna o número de leituras inseridas (as já confirmadas, em caso de erro).
+    """
+    propria = conn is None
+    if usar_load_data and BACKEND != 'mysql':
+        usar_load_data = False # LOAD DATA é do MySQL; no SQLite o executemany já é o caminho rápido
+    if usar_load_data:
+        try:
+            conn = medir_conexao(mysql.connector.connect(**DB_CONFIG, allow_local_infile=True))
+        except mysql.connector.Error as err:
+            print(f"Erro ao abrir conexão para LOAD DATA: {err}")
+            return 0
+        propria = True
+    elif propria:
+        conn = criar_conexao()
+        if not conn: return 0
+    cursor = conn.cursor()
+
+    inseridas = 0
+    pendentes = 0
+    lote = []
+
+    def marcar():
+        if not propria:
+            cursor.execute("SAVEPOINT inserir_leituras") # o commit libera o anterior: marca de novo depois de cada um
+
+    def gravar():
+        nonlocal inseridas, pendentes
+        if usar_load_data:
+            _carregar_arquivo_leituras(conn, lote)
+        else:
+            cursor.executemany(QUERY_INSERIR_LEITURA, lote)
+        atualizar_agregados(conn, lote) # na mesma transação das leituras
+        pendentes += len(lote)
+        lote.clear()
+        if pendentes >= linhas_por_commit:
+            conn.commit()
+            inseridas += pendentes
+            pendentes = 0
+            marcar()
+
+    try:
+        marcar()
+        for leitura in _normalizar_leituras(leituras, conn):
+            lote.append(leitura)
+            if len(lote) >= tamanho_lote:
+                gravar()
+        if lote:
+            gravar()
+        conn.commit()
+        inseridas += pendentes
+    except mysql.connector.Error as err:
+        print(f"Erro ao inserir leituras em lote ({inseridas} confirmadas): {err}")
+        try:
+            if propria:
+                conn.rollback()
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT inserir_leituras")
+        except mysql.connector.Error:
+            pass # conexão perdida ou transação já desfeita pelo servidor (ex: deadlock)
+        esquecer_codigos_tipo_sensor() # um tipo cadastrado no trecho desfeito não existe mais
+    finally:
+        cursor.close()
+        if propria:
+            conn.close()
+    return inseridas
+
 def listar_plantacoes():
     conn = criar_conexao()
     if not conn: return
@@ -185,10 +430,12 @@ def listar_plantacoes():
         cursor.close()
         conn.close()
 
-def listar_plantacoes_simples():
-    """Lista as plantações sem abrir e fechar conexão, útil para ser chamada dentro de outras funções."""
-    conn = criar_conexao()
-    if not conn: return
+def listar_plantacoes_simples(conn=None):
+    """Lista as plantações reutilizando `conn` quando fornecida, útil para ser chamada dentro de outras funções."""
+    propria = conn is None
+    if propria:
+        conn = criar_conexao()
+        if not conn: return
     cursor = conn.cursor()
 
     try:
@@ -207,7 +454,8 @@ def listar_plantacoes_simples():
         print(f"Erro ao listar plantações (simples): {err}")
     finally:
         cursor.close()
-        conn.close()
+        if propria:
+            conn.close()
 
 def listar_sensores():
     conn = criar_conexao()
@@ -236,10 +484,12 @@ def listar_sensores():
         cursor.close()
         conn.close()
 
-def listar_sensores_simples():
-    """Lista os sensores sem abrir e fechar conexão, útil para ser chamada dentro de outras funções."""
-    conn = criar_conexao()
-    if not conn: return
+def listar_sensores_simples(conn=None):
+    """Lista os sensores reutilizando `conn` quando fornecida, útil para ser chamada dentro de outras funções."""
+    propria = conn is None
+    if propria:
+        conn = criar_conexao()
+        if not conn: return
     cursor = conn.cursor()
 
     try:
@@ -258,36 +508,97 @@ def listar_sensores_simples():
         print(f"Erro ao listar sensores (simples): {err}")
     finally:
         cursor.close()
-        conn.close()
-
-def listar_leituras():
-    conn = criar_conexao()
-    if not conn: return
-    cursor = conn.cursor()
-
+        if propria:
+            conn.close()
+
+TAMANHO_PAGINA_LEITURAS = 20
+
+@medido('banco_dados.paginar_leituras', linhas=len)
+def paginar_leituras(conn, id_plantacao=None, id_sensor=None, desde=None, ate=None, apos=None, tamanho_pagina=TAMANHO_PAGINA_LEITURAS):
+    """
+    Retorna uma página de leituras, da mais recente para a mais antiga, como tuplas
+    (id, id_sensor, tipo_sensor, data_hora, valor, plantacao_nome).
+
+    A paginação é por chave (keyset): `apos` é o par (data_hora, id) da última linha da
+    página anterior, e a consulta continua a partir dele pelo índice (data_hora, id), sem
+    OFFSET. Cada página custa o mesmo, qualquer que seja o tamanho da tabela. `desde`/`ate`
+    limitam o período e permitem ao MySQL ler apenas as partições envolvidas.
+    """
+    filtros = []
+    params = []
+    if id_plantacao is not None:
+        filtros.append("s.id_plantacao = %s")
+        params.append(id_plantacao)
+    if id_sensor is not None:
+        filtros.append("l.id_sensor = %s")
+        params.append(id_sensor)
+    if desde is not None:
+        filtros.append("l.data_hora >= %s")
+        params.append(desde)
+    if ate is not None:
+        filtros.append("l.data_hora < %s")
+        params.append(ate)
+    if apos is not None:
+        filtros.append("(l.data_hora < %s OR (l.data_hora = %s AND l.id < %s))")
+        params.extend([apos[0], apos[0], apos[1]])
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    cursor = conn.cursor() # cursor sem buffer: as linhas são lidas do servidor conforme iteradas
     try:
-        cursor.execute("""
-            SELECT l.id, l.id_sensor, l.tipo_sensor, l.data_hora, l.valor, p.nome AS plantacao_nome
+        cursor.execute(f"""
+            SELECT l.id, l.id_sensor, t.nome AS tipo_sensor, l.data_hora, l.valor, p.nome AS plantacao_nome
             FROM Leitura l
+            JOIN TipoSensor t ON l.id_tipo = t.id
             JOIN Sensor s ON l.id_sensor = s.id
             JOIN Plantacao p ON s.id_plantacao = p.id
-            ORDER BY l.data_hora DESC
-        """)
-        leituras = cursor.fetchall()
-        
-        if not leituras:
-            print("Nenhuma leitura registrada.")
+            {where}
+            ORDER BY l.data_hora DESC, l.id DESC
+            LIMIT %s
+        """, tuple(params) + (tamanho_pagina,))
+        return [linha for linha in cursor]
+    finally:
+        cursor.close()
+
+def iterar_leituras(conn, id_plantacao=None, id_sensor=None, desde=None, ate=None, tamanho_pagina=1000):
+    """Percorre todas as leituras que atendem aos filtros, página a página, com memória constante."""
+    apos = None
+    while True:
+        pagina = paginar_leituras(conn, id_plantacao, id_sensor, desde, ate, apos, tamanho_pagina)
+        yield from pagina
+        if len(pagina) < tamanho_pagina:
             return
+        apos = (pagina[-1][3], pagina[-1][0])
+
+def listar_leituras(conn=None):
+    """Lista as leituras em páginas, da mais recente para a mais antiga; reutiliza `conn` quando fornecida."""
+    propria = conn is None
+    if propria:
+        conn = criar_conexao()
+        if not conn: return
 
+    try:
+        apos = None
         print("\n--- Histórico de Leituras ---")
-        for l in leituras:
-            print(f"ID: {l[0]}, Sensor ID: {l[1]} ({l[2]}), Plantação: {l[5]}, Data/Hora: {l[3]}, Valor: {l[4]}")
+        while True:
+            leituras = paginar_leituras(conn, apos=apos)
+            if not leituras:
+                if apos is None:
+                    print("Nenhuma leitura registrada.")
+                break
+
+            for l in leituras:
+                print(f"ID: {l[0]}, Sensor ID: {l[1]} ({l[2]}), Plantação: {l[5]}, Data/Hora: {l[3]}, Valor: {l[4]}")
+            if len(leituras) < TAMANHO_PAGINA_LEITURAS:
+                break
+            apos = (leituras[-1][3], leituras[-1][0])
+            if input("Enter para a próxima página, 0 para parar: ") == '0':
+                break
         print("----------------------------")
     except mysql.connector.Error as err:
         print(f"Erro ao listar leituras: {err}")
     finally:
-        cursor.close()
-        conn.close()
+        if propria:
+            conn.close()
 
 def atualizar_plantacao():
     conn = criar_conexao()
@@ -295,12 +606,11 @@ def atualizar_plantacao():
     cursor = conn.cursor()
 
     try:
-        listar_plantacoes_simples()
+        listar_plantacoes_simples(conn)
         idp = int(input("ID da plantação a atualizar: "))
         
         # Verificar se a plantação existe
-        cursor.execute("SELECT id FROM Plantacao WHERE id = %s", (idp,))
-        if not cursor.fetchone():
+        if obter_plantacao(conn, idp) is None:
             print("⚠️ Plantação não encontrada!")
             return
 
@@ -349,8 +659,10 @@ def atualizar_plantacao():
         params.append(idp)
         
         cursor.execute(query, tuple(params))
+        alteradas = cursor.rowcount
+        registrar_alteracao(cursor)
         conn.commit()
-        if cursor.rowcount > 0:
+        if alteradas > 0:
             print("✅ Plantação atualizada com sucesso!")
         else:
             print("Nenhuma alteração foi aplicada (talvez o ID não exista).")
@@ -362,24 +674,116 @@ def atualizar_plantacao():
         cursor.close()
         conn.close()
 
+TAMANHO_LOTE_PURGA = 20000 # leituras por transação ao remover em massa
+
+def _limites_purga(cursor, id_sensor, ate, tamanho_lote):
+    """
+    Datas que dividem as leituras do sensor em fatias de ~tamanho_lote linhas, estimadas pelas
+    contagens de LeituraHora (a granularidade é de uma hora).
+    """
+    filtro, params = (" AND inicio < %s", (ate,)) if ate is not None else ("", ())
+    cursor.execute(f"SELECT inicio, quantidade FROM LeituraHora WHERE id_sensor = %s{filtro} ORDER BY inicio", (id_sensor,) + params)
+    limites = []
+    acumulado = 0
+    for inicio, quantidade in cursor.fetchall():
+        if acumulado and acumulado + quantidade > tamanho_lote:
+            limites.append(inicio)
+            acumulado = 0
+        acumulado += quantidade
+    return limites
+
+def fatias_purga(conn, ids_sensores, tamanho_lote=TAMANHO_LOTE_PURGA):
+    """
+    Limites das fatias de `purgar_leituras` por sensor ({id_sensor: datas}), lidos de LeituraHora.
+    Para calcular antes de remover os sensores, cujos agregados saem com eles em cascata.
+    """
+    cursor = conn.cursor()
+    try:
+        return {id_sensor: _limites_purga(cursor, id_sensor, None, tamanho_lote) for id_sensor in ids_sensores}
+    finally:
+        cursor.close()
+
+@medido('banco_dados.purgar_leituras', linhas=int)
+def purgar_leituras(conn, ids_sensores, ate=None, tamanho_lote=TAMANHO_LOTE_PURGA, pausa=0.0, fatias=None):
+    """
+    Remove as leituras dos sensores (todas, ou só as anteriores a `ate`) em fatias por sensor e
+    intervalo de data, com um commit por fatia. Cada DELETE percorre um trecho do índice
+    (id_sensor, data_hora) e só as partições do intervalo, então as travas duram pouco e o undo
+    log não cresce com o tamanho da remoção. `pausa` (segundos) espaça as fatias para dar fôlego
+    à ingestão e à replicação. Os agregados dos sensores são ajustados ao final. `fatias` traz
+    limites já calculados por `fatias_purga` (sensores já removidos não têm mais agregados).
+
+    As mesmas leituras saem também do arquivo colunar (src/arquivamento.py), se houver.
+
+    Retorna o número de leituras removidas.
+    """
+    from src.arquivamento import remover_do_arquivo # import local: src.arquivamento depende deste módulo
+
+    cursor = conn.cursor()
+    total = 0
+    inicio = ultimo_aviso = time.monotonic()
+    try:
+        for id_sensor in ids_sensores:
+            # A primeira e a última fatias são abertas: cobrem também leituras fora dos agregados
+            if fatias is not None and id_sensor in fatias:
+                limites = [None] + fatias[id_sensor] + [ate]
+            else:
+                limites = [None] + _limites_purga(cursor, id_sensor, ate, tamanho_lote) + [ate]
+            for de, ate_fatia in zip(limites[:-1], limites[1:]):
+                filtro, params = "", ()
+                if de is not None:
+                    filtro += " AND data_hora >= %s"
+                    params += (de,)
+                if ate_fatia is not None:
+                    filtro += " AND data_hora < %s"
+                    params += (ate_fatia,)
+                cursor.execute(f"DELETE FROM Leitura WHERE id_sensor = %s{filtro}", (id_sensor,) + params)
+                conn.commit()
+                total += max(cursor.rowcount, 0)
+                if time.monotonic() - ultimo_aviso >= 2:
+                    ultimo_aviso = time.monotonic()
+                    print(f"🧹 {total} leituras removidas ({total / (ultimo_aviso - inicio):,.0f}/s)...")
+                if pausa:
+                    time.sleep(pausa)
+
+            if ate is None:
+                cursor.execute("DELETE FROM LeituraHora WHERE id_sensor = %s", (id_sensor,))
+                cursor.execute("DELETE FROM LeituraDia WHERE id_sensor = %s", (id_sensor,))
+                conn.commit()
+            else:
+                # Dias inteiros antes de `ate` saem dos agregados; o dia de `ate` é recalculado
+                dia = ate.replace(hour=0, minute=0, second=0, microsecond=0)
+                cursor.execute("DELETE FROM LeituraHora WHERE id_sensor = %s AND inicio < %s", (id_sensor, dia))
+                cursor.execute("DELETE FROM LeituraDia WHERE id_sensor = %s AND inicio < %s", (id_sensor, dia))
+                conn.commit()
+                recalcular_agregados(conn, dia, dia + datetime.timedelta(days=1), id_sensor)
+        remover_do_arquivo(ids_sensores=ids_sensores, ate=ate)
+    finally:
+        cursor.close()
+    return total
+
 def remover_plantacao():
     conn = criar_conexao()
     if not conn: return
     cursor = conn.cursor()
 
     try:
-        listar_plantacoes_simples()
+        listar_plantacoes_simples(conn)
         idp = int(input("ID da plantação a remover: "))
         
-        # Verificar se a plantação existe antes de tentar remover
-        cursor.execute("SELECT id FROM Plantacao WHERE id = %s", (idp,))
-        if not cursor.fetchone():
+        # Remoção: confere a versão dos metadados antes, para não deixar de fora um sensor recém-cadastrado
+        atualizar_metadados(conn, forcar=True)
+        if obter_plantacao(conn, idp) is None:
             print("⚠️ Plantação não encontrada!")
             return
 
+        # Leitura é particionada e não tem chave estrangeira: suas linhas não são removidas em cascata
+        purgar_leituras(conn, sensores_da_plantacao(conn, idp))
         cursor.execute('DELETE FROM Plantacao WHERE id=%s', (idp,))
+        removidas = cursor.rowcount
+        registrar_alteracao(cursor)
         conn.commit()
-        if cursor.rowcount > 0:
+        if removidas > 0:
             print("🗑️ Plantação removida com sucesso!")
         else:
             print("Nenhuma plantação foi removida (ID não encontrado).")
@@ -397,18 +801,21 @@ def remover_sensor():
     cursor = conn.cursor()
 
     try:
-        listar_sensores_simples()
+        listar_sensores_simples(conn)
         ids = int(input("ID do sensor a remover: "))
         
         # Verificar se o sensor existe
-        cursor.execute("SELECT id FROM Sensor WHERE id = %s", (ids,))
-        if not cursor.fetchone():
+        if obter_sensor(conn, ids) is None:
             print("⚠️ Sensor não encontrado!")
             return
 
+        # Leitura é particionada e não tem chave estrangeira: suas linhas não são removidas em cascata
+        purgar_leituras(conn, [ids])
         cursor.execute('DELETE FROM Sensor WHERE id=%s', (ids,))
+        removidos = cursor.rowcount
+        registrar_alteracao(cursor)
         conn.commit()
-        if cursor.rowcount > 0:
+        if removidos > 0:
             print("🗑️ Sensor removido com sucesso!")
         else:
             print("Nenhum sensor foi removido (ID não encontrado).")
@@ -426,18 +833,25 @@ def remover_leitura():
     cursor = conn.cursor()
 
     try:
-        listar_leituras()
+        listar_leituras(conn)
         idl = int(input("ID da leitura a remover: "))
         
         # Verificar se a leitura existe
-        cursor.execute("SELECT id FROM Leitura WHERE id = %s", (idl,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT id_sensor, data_hora FROM Leitura WHERE id = %s", (idl,))
+        leitura = cursor.fetchone()
+        if not leitura:
             print("⚠️ Leitura não encontrada!")
             return
 
         cursor.execute('DELETE FROM Leitura WHERE id=%s', (idl,))
         conn.commit()
         if cursor.rowcount > 0:
+            # Mínimo/máximo não podem ser descontados: recalcula o dia da leitura a partir de Leitura
+            id_sensor, data_hora = leitura
+            dia = data_hora.replace(hour=0, minute=0, second=0, microsecond=0)
+            recalcular_agregados(conn, dia, dia + datetime.timedelta(days=1), id_sensor)
+            from src.arquivamento import remover_do_arquivo # import local: src.arquivamento depende deste módulo
+            remover_do_arquivo(ids_leituras=[idl], dias=[dia])
             print("🗑️ Leitura removida com sucesso!")
         else:
             print("Nenhuma leitura foi removida (ID não encontrado).")
@@ -505,4 +919,8 @@ def menu():
             print("⚠️ Opção inválida!")
 
 if __name__ == '__main__':
-    menu()
+    if len(sys.argv) > 1:
+        from src.lote import main # operações em massa por arquivo (import local: src.lote depende deste módulo)
+        main()
+    else:
+        menu()
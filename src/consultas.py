@@ -0,0 +1,169 @@
+"""
+Consultas de leituras usadas pelo dashboard, sem dependência do Streamlit (também usadas
+pelo benchmark em scripts/benchmark.py).
+
+Filtros e agregações ficam no SQL: o período (`dias` relativos a agora ou o intervalo
+[`desde`, `ate`)), os tipos de sensor exibidos (`tipos`) e, em `resumo_por_tipo`, o último
+valor e a contagem de cada tipo. Só sai do banco o que cada elemento da tela mostra.
+"""
+import datetime
+
+import pandas as pd
+
+from src.arquivamento import limites_arquivo, ler_leituras
+
+LIMITE_PONTOS = 5000 # acima disso o período é lido dos agregados por hora ou por dia
+
+def _filtro_periodo(coluna, dias=None, desde=None, ate=None, por_dia=False):
+    # por_dia: a coluna é o início do dia (LeituraDia), então o dia em que a janela começa entra inteiro
+    filtro, params = "", ()
+    if dias:
+        filtro += f" AND {coluna} >= DATE(NOW() - INTERVAL %s DAY)" if por_dia else f" AND {coluna} >= NOW() - INTERVAL %s DAY"
+        params += (dias,)
+    if desde is not None:
+        filtro += f" AND {coluna} >= %s"
+        params += (desde,)
+    if ate is not None:
+        filtro += f" AND {coluna} < %s"
+        params += (ate,)
+    return filtro, params
+
+def _filtro_tipos(tipos):
+    if not tipos:
+        return "", ()
+    return f" AND T.nome IN ({', '.join(['%s'] * len(tipos))})", tuple(tipos)
+
+def escolher_fonte(conn, id_plantacao, dias, desde=None, ate=None, tipos=None):
+    """
+    Usa os agregados diários (poucas linhas) para estimar o volume do período e escolhe
+    a fonte mais detalhada que não passe de LIMITE_PONTOS: Leitura, LeituraHora ou LeituraDia.
+    """
+    filtro, params = _filtro_periodo("A.inicio", dias, desde, ate, por_dia=True)
+    filtro_tipos, params_tipos = _filtro_tipos(tipos)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(A.quantidade), 0), COUNT(DISTINCT A.inicio), COUNT(DISTINCT A.id_sensor)
+            FROM LeituraDia A
+            JOIN Sensor S ON A.id_sensor = S.id
+            JOIN TipoSensor T ON A.id_tipo = T.id
+            WHERE S.id_plantacao = %s{filtro}{filtro_tipos}
+        """, (id_plantacao,) + params + params_tipos)
+        leituras, dias_com_dados, sensores = cursor.fetchone()
+    finally:
+        cursor.close()
+    if leituras <= LIMITE_PONTOS:
+        return 'Leitura'
+    if dias_com_dados * 24 * sensores <= LIMITE_PONTOS:
+        return 'LeituraHora'
+    return 'LeituraDia'
+
+def resumo_agregados_por_tipo(conn, id_plantacao, desde=None, ate=None, tipos=None):
+    """
+    {tipo: (quantidade, última data, soma)} das leituras da plantação em [desde, ate), lidos dos
+    agregados diários: muda quando entram ou saem leituras e custa O(dias x sensores), não O(leituras).
+    """
+    filtro, params = _filtro_periodo("A.inicio", None, desde, ate)
+    filtro_tipos, params_tipos = _filtro_tipos(tipos)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT T.nome, SUM(A.quantidade), MAX(A.ultima_data), SUM(A.soma)
+            FROM LeituraDia A
+            JOIN Sensor S ON A.id_sensor = S.id
+            JOIN TipoSensor T ON A.id_tipo = T.id
+            WHERE S.id_plantacao = %s{filtro}{filtro_tipos}
+            GROUP BY T.nome
+        """, (id_plantacao,) + params + params_tipos)
+        return {tipo: (int(quantidade), ultima, float(soma)) for tipo, quantidade, ultima, soma in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+def consultar_leituras(conn, id_plantacao, dias, fonte, apos_id=None, desde_inicio=None, desde=None, ate=None, tipos=None):
+    """
+    Lê as leituras (id, data_hora, valor, tipo_sensor) da plantação na fonte escolhida; nos
+    agregados, `valor` é a média do intervalo. Para deltas, `apos_id` traz só as leituras com id
+    acima dele (inclusive as que chegam com data atrasada) e `desde_inicio`
+    relê os intervalos agregados a partir do último, que ainda pode estar mudando.
+
+    Leituras brutas anteriores ao corte do arquivo colunar (src/arquivamento.py) vêm dos arquivos,
+    mapeados em memória; do banco vêm as posteriores ao corte e as gravadas depois da exportação
+    com data anterior a ele (id acima do id_maximo do arquivo).
+    """
+    arquivadas = None
+    filtro_tipos, params_tipos = _filtro_tipos(tipos)
+    if fonte == 'Leitura':
+        filtro, params = _filtro_periodo("L.data_hora", dias, desde, ate)
+        if apos_id is not None:
+            filtro += " AND L.id > %s"
+            params += (apos_id,)
+        partes = [(filtro, params)]
+        corte, id_arquivado = limites_arquivo()
+        if corte is not None:
+            inicio = datetime.datetime.now() - datetime.timedelta(days=dias) if dias else None
+            if desde is not None:
+                inicio = max(inicio, desde) if inicio else desde
+            if apos_id is None and (inicio is None or inicio < corte):
+                arquivadas = ler_leituras(id_plantacao, inicio, min(corte, ate) if ate else corte, tipos=tipos)
+            partes = [(filtro + " AND L.data_hora >= %s", params + (corte,))]
+            if id_arquivado is not None:
+                # Duas consultas (UNION ALL) em vez de um OR: cada uma usa a poda de partições ou o índice de id
+                partes.append((filtro + " AND L.data_hora < %s AND L.id > %s", params + (corte, id_arquivado)))
+        query = " UNION ALL ".join(f"""
+        SELECT L.id AS id, L.data_hora AS data_hora, L.valor AS valor, T.nome AS tipo_sensor
+        FROM Leitura L
+        JOIN Sensor S ON L.id_sensor = S.id
+        JOIN TipoSensor T ON L.id_tipo = T.id
+        WHERE S.id_plantacao = %s{filtro_parte}{filtro_tipos}
+        """ for filtro_parte, _ in partes) + " ORDER BY data_hora, id"
+        params = ()
+        for _, params_parte in partes:
+            params += (id_plantacao,) + params_parte + params_tipos
+    else:
+        filtro, params = _filtro_periodo("A.inicio", dias, desde, ate)
+        if desde_inicio is not None:
+            filtro += " AND A.inicio >= %s"
+            params += (desde_inicio,)
+        query = f"""
+        SELECT A.inicio AS data_hora, A.soma / A.quantidade AS valor, T.nome AS tipo_sensor
+        FROM {fonte} A
+        JOIN Sensor S ON A.id_sensor = S.id
+        JOIN TipoSensor T ON A.id_tipo = T.id
+        WHERE S.id_plantacao = %s{filtro}{filtro_tipos}
+        ORDER BY A.inicio
+        """
+        params = (id_plantacao,) + params + params_tipos
+    df = pd.read_sql_query(query, conn, params=params)
+    df['data_hora'] = pd.to_datetime(df['data_hora'])
+    if arquivadas is not None and not arquivadas.empty:
+        # As leituras atrasadas do banco podem ser anteriores às do arquivo: reordena
+        df = pd.concat([arquivadas, df], ignore_index=True).sort_values(['data_hora', 'id'], ignore_index=True)
+    return df
+
+def resumo_por_tipo(conn, id_plantacao, dias=None, desde=None, ate=None, tipos=None):
+    """
+    Por tipo de sensor da plantação no período: último valor, data dele e número de leituras,
+    calculados no banco sobre os agregados (uma linha por tipo). Com o período em dias inteiros
+    (todo o histórico ou datas sem hora) usa LeituraDia; senão LeituraHora, com precisão de uma hora.
+    """
+    dia_inteiro = not dias and all(d is None or d == d.replace(hour=0, minute=0, second=0, microsecond=0) for d in (desde, ate))
+    tabela = 'LeituraDia' if dia_inteiro else 'LeituraHora'
+    filtro, params = _filtro_periodo("A.inicio", dias, desde, ate)
+    filtro_tipos, params_tipos = _filtro_tipos(tipos)
+    query = f"""
+    SELECT tipo_sensor, ultimo_valor, ultima_data, quantidade
+    FROM (
+        SELECT T.nome AS tipo_sensor, A.ultimo_valor, A.ultima_data,
+               SUM(A.quantidade) OVER (PARTITION BY A.id_tipo) AS quantidade,
+               ROW_NUMBER() OVER (PARTITION BY A.id_tipo ORDER BY A.ultima_data DESC) AS ordem
+        FROM {tabela} A
+        JOIN Sensor S ON A.id_sensor = S.id
+        JOIN TipoSensor T ON A.id_tipo = T.id
+        WHERE S.id_plantacao = %s{filtro}{filtro_tipos}
+    ) R
+    WHERE ordem = 1
+    """
+    df = pd.read_sql_query(query, conn, params=(id_plantacao,) + params + params_tipos)
+    df['ultima_data'] = pd.to_datetime(df['ultima_data'])
+    df['quantidade'] = df['quantidade'].astype('int64')
+    return df.set_index('tipo_sensor')
@@ -1,136 +1,469 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+try:
+    from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+except ImportError: # Streamlit < 1.37
+    from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
 import pandas as pd
-import mysql.connector
-from sklearn.linear_model import LinearRegression
 import numpy as np
+import collections
+import concurrent.futures
+import datetime
+import os
+import sys
+import threading
+import time
+
+# `streamlit run src/dashboard.py` só coloca a pasta src/ no sys.path; a raiz é necessária para `import src.*`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.alertas import TOLERANCIA_UMIDADE
+from src.amostragem import reduzir_serie
+from src.banco_dados import POOL_CONFIG, conexao, conexao_analitica
+from src.consultas import LIMITE_PONTOS, consultar_leituras, escolher_fonte, resumo_agregados_por_tipo, resumo_por_tipo
+from src.metadados import COLUNAS_PLANTACAO, metadados_vencidos, obter_plantacoes
+from src.metricas import iniciar_exportacao, medido, medir
+from src.modelos import apagar_modelo, marca_dagua, obter_modelo, podar_modelos
+# src.previsao (modelos de previsão) só é importado quando uma previsão é pedida
 
 st.set_page_config(
     page_title="FarmTech Dashboard",
     page_icon="🌱",
     layout="wide"
 )
+iniciar_exportacao('dashboard') # tempos das consultas, também na página Administracao
 
 # --- Conexão com o Banco de Dados MySQL ---
-# st.cache_resource: Cacheia a conexão para não reabrir a cada interação
+# As conexões vêm do pool compartilhado em banco_dados.py: cada consulta empresta uma conexão
+# e a devolve ao final, então sessões simultâneas não disputam o mesmo cursor.
+# No backend embarcado (FARMTECH_BACKEND=sqlite) as consultas podem rodar no DuckDB (ver src/armazenamento.py).
+
+# Consultas independentes de uma página rodam ao mesmo tempo num pool de threads do processo,
+# limitado ao tamanho do pool de conexões menos uma (a da thread da sessão, que também consulta):
+# com muitas sessões abertas, as consultas esperam por uma thread em vez de disputar (e esgotar) as conexões.
+CONSULTAS_SIMULTANEAS = int(os.environ.get('FARMTECH_CONSULTAS_SIMULTANEAS', max(POOL_CONFIG['pool_size'] - 1, 1)))
+
 @st.cache_resource
-def get_db_connection():
+def _executor_consultas():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=CONSULTAS_SIMULTANEAS, thread_name_prefix='consultas')
+
+def em_paralelo(*funcoes):
+    """Executa as funções (sem argumentos) ao mesmo tempo no pool de consultas; retorna os resultados na ordem."""
+    contexto = get_script_run_ctx()
+
+    def executar(funcao):
+        # Contexto da sessão que pediu: st.error e os caches do Streamlit funcionam na thread do pool
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, contexto)
+        try:
+            return funcao()
+        finally:
+            # A thread volta ao pool: sem isso, ela guardaria a sessão (e a escreveria) na próxima tarefa
+            if hasattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME):
+                delattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME)
+
+    futuros = [_executor_consultas().submit(executar, funcao) for funcao in funcoes]
+    return [futuro.result() for futuro in futuros]
+
+@medido('dashboard.carregar_plantacoes')
+def carregar_plantacoes():
     """
-    Cria e retorna uma conexão com o banco de dados MySQL.
-    As credenciais são as mesmas configuradas no seu docker-compose.yml.
+    Plantações cadastradas (id -> dict), do cache de metadados do processo (src/metadados.py):
+    a tabela só é relida quando algum processo altera Plantacao ou Sensor, então plantações
+    novas aparecem sem reiniciar o dashboard.
     """
-    try:
-        conn = mysql.connector.connect(
-            host='db', #'db' é o nome do serviço do MySQL no docker-compose.yml
-            user='farmtech_user',
-            password='password',
-            database='farmtech_db',
-            port=3306
-        )
-        # st.success("Conectado ao banco de dados MySQL com sucesso!")
-        return conn
-    except mysql.connector.Error as err:
-        if err.errno == mysql.connector.errorcode.ER_ACCESS_DENIED_ERROR:
-            st.error("Erro de acesso ao MySQL: verifique usuário e senha.")
-        elif err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
-            st.error("O banco de dados 'farmtech_db' não existe.")
-        else:
-            st.error(f"Erro ao conectar ao banco de dados MySQL: {err}")
-        return None
-
-
-@st.cache_data
-def carregar_plantacoes():
+    if not metadados_vencidos():
+        return obter_plantacoes() # cache conferido há pouco: nem empresta uma conexão do pool
+    with conexao() as conn:
+        if conn is None:
+            st.error("Erro ao conectar ao banco de dados MySQL.")
+            return {}
+        return obter_plantacoes(conn)
+
+# Períodos do seletor, em dias (None = todo o histórico; 'intervalo' = datas escolhidas pelo usuário)
+PERIODOS = {
+    "Todo o histórico": None,
+    "Últimas 24 horas": 1,
+    "Últimos 7 dias": 7,
+    "Últimos 30 dias": 30,
+    "Último ano": 365,
+    "Intervalo de datas": 'intervalo'
+}
+TIPOS_GRAFICOS = ('umidade', 'ph') # tipos de sensor com gráfico: só as leituras deles saem do banco
+JANELA_MAX_LINHAS = int(os.environ.get('FARMTECH_JANELA_MAX_LINHAS', 200000)) # linhas mantidas em memória por frame
+FRAMES_MAX = int(os.environ.get('FARMTECH_FRAMES_MAX', 32)) # frames em memória; os menos usados saem primeiro
+# Ids são reservados no INSERT e visíveis só no commit: um lote longo pode aparecer depois de ids
+# maiores. O delta relê os ids acima do maior id conhecido há SOBREPOSICAO_SEGUNDOS (logo após
+# uma carga completa, os SOBREPOSICAO_IDS últimos) e ignora os que já leu nessa faixa.
+SOBREPOSICAO_SEGUNDOS = float(os.environ.get('FARMTECH_SOBREPOSICAO_SEGUNDOS', 60))
+SOBREPOSICAO_IDS = int(os.environ.get('FARMTECH_SOBREPOSICAO_IDS', 10000))
+
+@st.cache_resource
+def _frames_em_memoria():
     """
-    Carrega todas as plantações do banco de dados MySQL.
+    Frames de leituras por (plantação, período), compartilhados entre sessões e atualizados por
+    delta, do menos ao mais usado. Na criação, poda os modelos gravados há muito sem uso.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
-    try:
-        df = pd.read_sql_query("SELECT * FROM Plantacao", conn)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar plantações: {e}")
-        return pd.DataFrame()
-    finally:
-        # Não fechamos a conexão aqui porque ela é gerenciada pelo st.cache_resource
-        pass 
-
-@st.cache_data
-def carregar_leituras(id_plantacao):
+    podar_modelos()
+    return collections.OrderedDict(), threading.Lock()
+
+def descartar_frames():
+    """Esquece os frames em memória; a próxima leitura recarrega tudo (ex: após remover leituras)."""
+    frames, trava = _frames_em_memoria()
+    with trava:
+        frames.clear()
+
+def _estado_frame(id_plantacao, dias, desde, ate):
+    chave = (id_plantacao, dias, desde, ate)
+    frames, trava = _frames_em_memoria()
+    with trava:
+        estado = frames.get(chave)
+        if estado is None:
+            estado = frames[chave] = {'trava': threading.Lock(), 'df': None, 'fonte': None, 'previsores': {}, 'marcas': {}}
+        frames.move_to_end(chave)
+        descartados = [frames.popitem(last=False) for _ in range(len(frames) - FRAMES_MAX)]
+    for chave_descartada, antigo in descartados:
+        # Intervalos de datas escolhidos à mão raramente se repetem: seus modelos saem do registro junto
+        if chave_descartada[2] is not None or chave_descartada[3] is not None:
+            for tipo in list(antigo['marcas']):
+                apagar_modelo(chave_descartada + (tipo,))
+    return estado
+
+def _iniciar_sobreposicao(estado, df):
+    # Depois de uma carga completa da fonte Leitura: marcos (instante, id) e ids já lidos na faixa relida
+    estado['ultimo_id'] = int(df['id'].max()) if not df.empty else 0
+    limite = max(estado['ultimo_id'] - SOBREPOSICAO_IDS, 0)
+    estado['marcos'] = collections.deque([(time.monotonic(), limite)])
+    estado['ids_recentes'] = set(df['id'][df['id'] > limite].tolist())
+
+def _limite_sobreposicao(estado):
+    """Id a partir do qual o delta relê: o maior id conhecido no marco mais recente com SOBREPOSICAO_SEGUNDOS."""
+    marcos, agora = estado['marcos'], time.monotonic()
+    avancou = False
+    while len(marcos) > 1 and marcos[1][0] <= agora - SOBREPOSICAO_SEGUNDOS:
+        marcos.popleft()
+        avancou = True
+    limite = marcos[0][1]
+    if avancou: # os ids abaixo do novo limite não serão relidos
+        estado['ids_recentes'] = {i for i in estado['ids_recentes'] if i > limite}
+    return limite
+
+def _ajustar_previsor(leituras):
+    from src.previsao import RegressaoIncremental, para_segundos
+    previsor = RegressaoIncremental()
+    previsor.adicionar(para_segundos(leituras['data_hora']), leituras['valor'].to_numpy())
+    return previsor
+
+def _marcas_do_periodo(conn, id_plantacao, fonte, desde, ate):
+    # Marca d'água de cada tipo, dos agregados diários: não depende do frame, que nem precisa estar carregado
+    return {
+        tipo: marca_dagua(fonte, *resumo)
+        for tipo, resumo in resumo_agregados_por_tipo(conn, id_plantacao, desde, ate, TIPOS_GRAFICOS).items()
+    }
+
+@medido('dashboard.carregar_previsores')
+def _previsores_do_registro(estado, chave, df, marcas):
+    """
+    Previsor de cada tipo de sensor do frame recém-carregado: o do registro em disco se ajustado
+    em leituras com a mesma marca d'água, senão um novo (gravado no registro). Sem `marcas`
+    (janela relativa, ou leituras que mudaram durante a carga) o previsor só fica em memória.
+    """
+    estado['previsores'], estado['marcas'] = {}, marcas or {}
+    for tipo in df['tipo_sensor'].unique():
+        ajustar = lambda tipo=tipo: _ajustar_previsor(df[df['tipo_sensor'] == tipo])
+        estado['previsores'][tipo] = obter_modelo(chave + (tipo,), marcas[tipo], ajustar) if marcas and tipo in marcas else ajustar()
+
+@medido('dashboard.atualizar_previsores')
+def _sincronizar_previsores(previsores, adicionadas, removidas):
+    """Soma ao previsor de cada tipo de sensor as linhas que entraram no frame e retira as que saíram."""
+    from src.previsao import RegressaoIncremental, para_segundos
+    for linhas, entrando in [(adicionadas, True)] + [(r, False) for r in removidas]:
+        for tipo, grupo in linhas.groupby('tipo_sensor'):
+            previsor = previsores.setdefault(tipo, RegressaoIncremental())
+            t, y = para_segundos(grupo['data_hora']), grupo['valor'].to_numpy()
+            if entrando:
+                previsor.adicionar(t, y)
+            else:
+                previsor.remover(t, y)
+
+def obter_previsor(id_plantacao, tipo_sensor, dias=None, desde=None, ate=None):
+    """Previsor incremental das leituras do tipo no frame carregado por `carregar_leituras`, ou None."""
+    return _estado_frame(id_plantacao, dias, desde, ate)['previsores'].get(tipo_sensor)
+
+@medido('dashboard.carregar_leituras', linhas=len)
+def carregar_leituras(id_plantacao, dias=None, desde=None, ate=None):
     """
-    Carrega as leituras de sensores para uma plantação específica do banco de dados MySQL.
-    Utiliza %s como placeholder para o parâmetro id_plantacao.
+    Carrega as leituras dos sensores com gráfico (TIPOS_GRAFICOS) de uma plantação, nos últimos
+    `dias` ou no intervalo [desde, ate). Períodos largos vêm dos agregados: `valor` é então a
+    média do intervalo.
+
+    A primeira chamada lê o período inteiro; as seguintes buscam só o que é novo, anexam ao
+    frame em memória e descartam o que saiu da janela, então cada atualização custa
+    O(leituras novas), não O(histórico). Os previsores de cada tipo acompanham o frame; nos
+    períodos fixos (todo o histórico ou intervalo de datas) eles vêm do registro de modelos
+    (src/modelos.py) na carga completa: com a mesma marca d'água dos agregados, outro processo ou
+    um reinício reaproveita o modelo gravado em vez de reajustá-lo. Deltas não regravam o registro.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
+    estado = _estado_frame(id_plantacao, dias, desde, ate)
+    chave = (id_plantacao, dias, desde, ate)
+    periodo = {'desde': desde, 'ate': ate, 'tipos': TIPOS_GRAFICOS}
+
+    with estado['trava'], conexao_analitica() as conn:
+        if conn is None:
+            st.error("Erro ao conectar ao banco de dados MySQL.")
+            return estado['df'] if estado['df'] is not None else pd.DataFrame()
+
+        try:
+            df = estado['df']
+            removidas = []
+            recarregado = df is None or (estado['fonte'] == 'Leitura' and len(df) > LIMITE_PONTOS)
+            # Frame bruto que cresceu demais: recarrega para que a fonte seja reavaliada (agregados)
+            if recarregado:
+                estado['fonte'] = escolher_fonte(conn, id_plantacao, dias, **periodo)
+                # Janela relativa muda a cada atualização: o registro só vale para períodos fixos
+                marcas = None if dias else _marcas_do_periodo(conn, id_plantacao, estado['fonte'], desde, ate)
+                df = adicionadas = consultar_leituras(conn, id_plantacao, dias, estado['fonte'], **periodo)
+                if marcas is not None and marcas != _marcas_do_periodo(conn, id_plantacao, estado['fonte'], desde, ate):
+                    marcas = None # leituras gravadas durante a carga: a marca não descreveria o frame
+            elif estado['fonte'] == 'Leitura':
+                adicionadas = consultar_leituras(conn, id_plantacao, dias, 'Leitura', apos_id=_limite_sobreposicao(estado), **periodo)
+                # Só as linhas da faixa relida são comparadas, não o frame inteiro
+                adicionadas = adicionadas[~adicionadas['id'].isin(estado['ids_recentes'])].reset_index(drop=True)
+                if not adicionadas.empty:
+                    estado['ids_recentes'].update(adicionadas['id'].tolist())
+                    estado['ultimo_id'] = max(estado['ultimo_id'], int(adicionadas['id'].max()))
+                estado['marcos'].append((time.monotonic(), estado['ultimo_id']))
+                if not adicionadas.empty:
+                    atrasadas = not df.empty and adicionadas['data_hora'].min() < df['data_hora'].iloc[-1]
+                    df = pd.concat([df, adicionadas], ignore_index=True)
+                    if atrasadas:
+                        df = df.sort_values(['data_hora', 'id'], ignore_index=True)
+            else:
+                ultimo_inicio = df['data_hora'].max() if not df.empty else None
+                adicionadas = consultar_leituras(conn, id_plantacao, dias, estado['fonte'], desde_inicio=ultimo_inicio, **periodo)
+                if ultimo_inicio is not None:
+                    removidas.append(df[df['data_hora'] >= ultimo_inicio]) # intervalos relidos
+                    df = df[df['data_hora'] < ultimo_inicio]
+                df = pd.concat([df, adicionadas], ignore_index=True)
+
+            if dias and not df.empty:
+                # O frame está em ordem de data_hora: o corte da janela é uma busca binária
+                corte = df['data_hora'].searchsorted(pd.Timestamp(datetime.datetime.now() - datetime.timedelta(days=dias)))
+                removidas.append(df.iloc[:corte])
+                df = df.iloc[corte:]
+            if len(df) > JANELA_MAX_LINHAS:
+                removidas.append(df.head(len(df) - JANELA_MAX_LINHAS))
+                df = df.tail(JANELA_MAX_LINHAS)
+
+            df = df.reset_index(drop=True)
+            if recarregado:
+                if estado['fonte'] == 'Leitura':
+                    _iniciar_sobreposicao(estado, df)
+                _previsores_do_registro(estado, chave, df, marcas)
+            elif not adicionadas.empty or any(not r.empty for r in removidas):
+                _sincronizar_previsores(estado['previsores'], adicionadas, removidas)
+            estado['df'] = df
+            return estado['df']
+        except Exception as e:
+            st.error(f"Erro ao carregar leituras para a plantação ID {id_plantacao}: {e}")
+            return pd.DataFrame()
+
+@medido('dashboard.carregar_resumo_tipos')
+def carregar_resumo_tipos(id_plantacao, dias=None, desde=None, ate=None):
+    """Último valor, data e contagem de leituras de cada tipo de sensor no período, agregados no banco."""
+    with conexao_analitica() as conn:
+        if conn is None:
+            return pd.DataFrame(columns=['ultimo_valor', 'ultima_data', 'quantidade'])
+        try:
+            return resumo_por_tipo(conn, id_plantacao, dias, desde, ate)
+        except Exception as e:
+            st.error(f"Erro ao carregar o resumo da plantação ID {id_plantacao}: {e}")
+            return pd.DataFrame(columns=['ultimo_valor', 'ultima_data', 'quantidade'])
+
+JANELA_VISAO_GERAL_HORAS = 48 # histórico (agregados por hora) usado na visão geral
 
+@st.cache_data(ttl=60)
+@medido('dashboard.carregar_resumo_frota', linhas=len)
+def carregar_resumo_frota(horas=JANELA_VISAO_GERAL_HORAS):
+    """
+    Uma única consulta traz os agregados por hora recentes de todos os sensores, já com
+    plantação, tipo e limites ideais. O resumo de cada sensor (último valor, previsão para
+    a próxima hora e situação em relação aos limites) sai de operações agrupadas no pandas,
+    sem consulta ou ajuste de modelo por plantação.
+    """
     query = """
-    SELECT L.data_hora, L.valor, L.tipo_sensor
-    FROM Leitura L
-    JOIN Sensor S ON L.id_sensor = S.id
-    WHERE S.id_plantacao = %s
-    ORDER BY L.data_hora
+    SELECT P.id AS id_plantacao, P.nome AS plantacao, P.umidade_ideal, P.ph_ideal_min, P.ph_ideal_max,
+           A.id_sensor, T.nome AS tipo_sensor, A.inicio AS data_hora, A.soma / A.quantidade AS valor,
+           A.ultimo_valor, A.ultima_data
+    FROM LeituraHora A
+    JOIN Sensor S ON A.id_sensor = S.id
+    JOIN Plantacao P ON S.id_plantacao = P.id
+    JOIN TipoSensor T ON A.id_tipo = T.id
+    WHERE A.inicio >= NOW() - INTERVAL %s HOUR
     """
-    try:
-        df = pd.read_sql_query(query, conn, params=(id_plantacao,))
-        if not df.empty:
-            df['data_hora'] = pd.to_datetime(df['data_hora'])
+    with conexao_analitica() as conn:
+        if conn is None:
+            st.error("Erro ao conectar ao banco de dados MySQL.")
+            return pd.DataFrame()
+        try:
+            df = pd.read_sql_query(query, conn, params=(horas,))
+        except Exception as e:
+            st.error(f"Erro ao carregar o resumo das plantações: {e}")
+            return pd.DataFrame()
+    if df.empty:
         return df
-    except Exception as e:
-        st.error(f"Erro ao carregar leituras para a plantação ID {id_plantacao}: {e}")
-        return pd.DataFrame()
-    finally:
-        # Não fechamos a conexão aqui porque ela é gerenciada pelo st.cache_resource
-        pass
+
+    df['data_hora'] = pd.to_datetime(df['data_hora'])
+    chaves = ['id_plantacao', 'id_sensor']
+    ultimos = df.sort_values('ultima_data').groupby(chaves).tail(1).set_index(chaves)
+    with medir('dashboard.previsao_frota'):
+        from src.previsao import regressao_por_grupo
+        previsoes = regressao_por_grupo(df, chaves)[['previsao']]
+    resumo = ultimos[['plantacao', 'tipo_sensor', 'ultimo_valor', 'ultima_data',
+                      'umidade_ideal', 'ph_ideal_min', 'ph_ideal_max']].join(previsoes)
+
+    umidade = resumo['tipo_sensor'] == 'umidade'
+    ph = resumo['tipo_sensor'] == 'ph'
+    resumo['desvio'] = np.select(
+        [umidade, ph],
+        [
+            resumo['ultimo_valor'] - resumo['umidade_ideal'],
+            np.where(resumo['ultimo_valor'] < resumo['ph_ideal_min'], resumo['ultimo_valor'] - resumo['ph_ideal_min'],
+                     np.where(resumo['ultimo_valor'] > resumo['ph_ideal_max'], resumo['ultimo_valor'] - resumo['ph_ideal_max'], 0.0))
+        ],
+        default=np.nan
+    )
+    fora = (umidade & (resumo['desvio'].abs() > TOLERANCIA_UMIDADE)) | (ph & (resumo['desvio'] != 0))
+    resumo['situacao'] = np.where(fora, "⚠️ Fora da faixa", np.where(umidade | ph, "✅ Ok", "—"))
+    resumo['fora_da_faixa'] = fora
+    # Sensores fora da faixa primeiro
+    return resumo.reset_index().sort_values(['fora_da_faixa', 'plantacao', 'tipo_sensor'], ascending=[False, True, True])
+
+@st.cache_data(ttl=60)
+@medido('dashboard.carregar_alertas_recentes', linhas=len)
+def carregar_alertas_recentes(limite=20):
+    """Últimos alertas gravados pelo motor de alertas da ingestão (src/alertas.py)."""
+    query = """
+    SELECT A.data_hora, P.nome AS plantacao, A.id_sensor, S.tipo AS tipo_sensor, A.situacao, A.valor, A.limite
+    FROM Alerta A
+    JOIN Sensor S ON S.id = A.id_sensor
+    JOIN Plantacao P ON P.id = A.id_plantacao
+    ORDER BY A.data_hora DESC
+    LIMIT %s
+    """
+    with conexao_analitica() as conn:
+        if conn is None:
+            return pd.DataFrame()
+        try:
+            return pd.read_sql_query(query, conn, params=(limite,))
+        except Exception:
+            return pd.DataFrame() # banco ainda sem a tabela Alerta (migração 5 não aplicada)
 
 st.title("🌱 FarmTech Solutions - Dashboard de Monitoramento")
 st.markdown("Visualize dados em tempo real e previsões para otimizar sua plantação.")
 
 st.sidebar.header("Filtros")
-plantacoes_df = carregar_plantacoes()
+plantacoes = carregar_plantacoes()
 
-if plantacoes_df.empty:
+if not plantacoes:
     st.warning("Nenhuma plantação cadastrada ou erro de conexão com o banco de dados. Por favor, certifique-se de que o MySQL está rodando no Docker e que o script `banco_dados.py` foi executado para adicionar dados.")
     st.stop()
 
-lista_plantacoes = ["Visão Geral"] + plantacoes_df['nome'].tolist()
-plantacao_selecionada_nome = st.sidebar.selectbox("Selecione uma Plantação", lista_plantacoes)
+# Seleção pelo id (None = Visão Geral): nomes repetidos não se confundem e não há busca por nome
+id_plantacao_selecionada = st.sidebar.selectbox(
+    "Selecione uma Plantação",
+    [None] + list(plantacoes),
+    format_func=lambda id_plantacao: "Visão Geral" if id_plantacao is None else plantacoes[id_plantacao]['nome']
+)
 
-if plantacao_selecionada_nome == "Visão Geral":
+if id_plantacao_selecionada is None:
     st.header("🌾 Visão Geral de Todas as Plantações")
-    st.dataframe(plantacoes_df, use_container_width=True)
+
+    resumo_df, alertas_df = em_paralelo(carregar_resumo_frota, carregar_alertas_recentes)
+    if resumo_df.empty:
+        st.info(f"Nenhuma leitura nas últimas {JANELA_VISAO_GERAL_HORAS} horas.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Plantações com leituras", f"{resumo_df['id_plantacao'].nunique()} / {len(plantacoes)}")
+        col2.metric("Sensores ativos", f"{len(resumo_df)}")
+        col3.metric("Sensores fora da faixa ideal", f"{int(resumo_df['fora_da_faixa'].sum())}")
+
+        st.subheader("📋 Situação por Sensor")
+        st.dataframe(
+            resumo_df[['plantacao', 'id_sensor', 'tipo_sensor', 'ultimo_valor', 'ultima_data', 'previsao', 'desvio', 'situacao']]
+            .rename(columns={
+                'plantacao': 'Plantação', 'id_sensor': 'Sensor', 'tipo_sensor': 'Tipo',
+                'ultimo_valor': 'Última leitura', 'ultima_data': 'Data/Hora', 'previsao': 'Previsão (1h)',
+                'desvio': 'Desvio do ideal', 'situacao': 'Situação'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Previsões por regressão linear sobre as médias horárias das últimas {JANELA_VISAO_GERAL_HORAS} horas.")
+
+    if not alertas_df.empty:
+        st.subheader("🚨 Alertas Recentes")
+        alertas_df['situacao'] = alertas_df['situacao'].map({
+            'baixo': "⬇️ Abaixo do ideal", 'alto': "⬆️ Acima do ideal", 'ok': "✅ Normalizado"
+        })
+        st.dataframe(
+            alertas_df.rename(columns={
+                'data_hora': 'Data/Hora', 'plantacao': 'Plantação', 'id_sensor': 'Sensor', 'tipo_sensor': 'Tipo',
+                'situacao': 'Situação', 'valor': 'Valor', 'limite': 'Limite'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    st.subheader("🌱 Plantações Cadastradas")
+    st.dataframe(pd.DataFrame(list(plantacoes.values()), columns=COLUNAS_PLANTACAO), use_container_width=True, hide_index=True)
     st.markdown("""
     Esta seção apresenta uma visão consolidada de todas as plantações cadastradas.
     Para análises detalhadas e previsões, selecione uma plantação específica no menu lateral.
     """)
 
 else:
-    id_plantacao_selecionada = int(plantacoes_df[plantacoes_df['nome'] == plantacao_selecionada_nome]['id'].iloc[0])
-    info_plantacao = plantacoes_df[plantacoes_df['id'] == id_plantacao_selecionada].iloc[0]
+    info_plantacao = plantacoes[id_plantacao_selecionada]
 
     st.header(f"📍 Plantação: {info_plantacao['nome']}")
     st.write(f"**Localização:** {info_plantacao['localizacao']}")
     st.markdown(f"**Umidade Ideal:** `{info_plantacao['umidade_ideal']:.1f}%`")
     st.markdown(f"**pH Ideal do Solo:** `{info_plantacao['ph_ideal_min']:.1f}` a `{info_plantacao['ph_ideal_max']:.1f}`")
     
-    leituras_df = carregar_leituras(id_plantacao_selecionada)
+    periodo_selecionado = st.sidebar.selectbox("Período", list(PERIODOS))
+    periodo = {'dias': PERIODOS[periodo_selecionado], 'desde': None, 'ate': None}
+    if periodo['dias'] == 'intervalo':
+        hoje = datetime.date.today()
+        datas = st.sidebar.date_input("De / até", (hoje - datetime.timedelta(days=7), hoje), max_value=hoje)
+        if len(datas) < 2:
+            st.info("Escolha a data final do intervalo no menu lateral.")
+            st.stop()
+        # [desde, ate) em dias inteiros: o dia final entra completo
+        periodo = {
+            'dias': None,
+            'desde': datetime.datetime.combine(datas[0], datetime.time()),
+            'ate': datetime.datetime.combine(datas[1] + datetime.timedelta(days=1), datetime.time())
+        }
+    if st.sidebar.button("🔄 Recarregar dados"):
+        descartar_frames()
+    # Série dos gráficos e métricas (último valor e contagem, agregados no banco) ao mesmo tempo
+    leituras_df, resumo_tipos = em_paralelo(
+        lambda: carregar_leituras(id_plantacao_selecionada, **periodo),
+        lambda: carregar_resumo_tipos(id_plantacao_selecionada, **periodo)
+    )
 
-    if leituras_df.empty:
+    if leituras_df.empty and resumo_tipos.empty:
         st.info("Ainda não há leituras para esta plantação. Por favor, adicione leituras usando o script de gerenciamento do banco de dados.")
         st.stop()
 
     st.subheader("📊 Métricas em Tempo Real (Última Leitura)")
     col1, col2, col3 = st.columns(3)
 
-    # Filtrar e obter a última leitura para Umidade e pH
-    df_umidade_sensor = leituras_df[leituras_df['tipo_sensor'] == 'umidade']
-    df_ph_sensor = leituras_df[leituras_df['tipo_sensor'] == 'ph']
-    
-    ultima_umidade = df_umidade_sensor['valor'].iloc[-1] if not df_umidade_sensor.empty else "N/A"
-    ultima_ph = df_ph_sensor['valor'].iloc[-1] if not df_ph_sensor.empty else "N/A"
+    # Séries de Umidade e pH (o frame só traz os tipos com gráfico); última leitura do resumo do banco
+    df_umidade_sensor = leituras_df[leituras_df['tipo_sensor'] == 'umidade'] if not leituras_df.empty else leituras_df
+    df_ph_sensor = leituras_df[leituras_df['tipo_sensor'] == 'ph'] if not leituras_df.empty else leituras_df
+
+    ultima_umidade = resumo_tipos['ultimo_valor'].get('umidade', "N/A")
+    ultima_ph = resumo_tipos['ultimo_valor'].get('ph', "N/A")
     
     col1.metric(
         "Umidade Atual",
@@ -144,51 +477,44 @@ else:
     )
     col3.metric(
         "Total de Leituras Registradas",
-        f"{len(leituras_df)}"
+        f"{int(resumo_tipos['quantidade'].sum())}"
     )
 
     st.subheader("📈 Histórico de Leituras - Gráficos de Linha")
     
     if not df_umidade_sensor.empty:
         st.write("#### Variação da Umidade do Solo ao Longo do Tempo")
-        st.line_chart(df_umidade_sensor.set_index('data_hora')['valor'], use_container_width=True)
+        # Reduzida a ~1 ponto por pixel de largura, preservando os picos (LTTB)
+        st.line_chart(reduzir_serie(df_umidade_sensor.set_index('data_hora')['valor']), use_container_width=True)
         st.caption("Este gráfico mostra a variação da umidade do solo (%) ao longo do tempo para esta plantação.")
     else:
         st.info("Nenhum dado de umidade disponível para exibir gráfico.")
 
     if not df_ph_sensor.empty:
         st.write("#### Variação do pH do Solo ao Longo do Tempo")
-        st.line_chart(df_ph_sensor.set_index('data_hora')['valor'], use_container_width=True, color="#FFA500") # Exemplo de cor
+        st.line_chart(reduzir_serie(df_ph_sensor.set_index('data_hora')['valor']), use_container_width=True, color="#FFA500") # Exemplo de cor
         st.caption("Este gráfico mostra a variação do pH do solo ao longo do tempo para esta plantação.")
     else:
         st.info("Nenhum dado de pH disponível para exibir gráfico.")
 
-    # Predição com Scikit-learn
+    # Predição por Regressão Linear incremental (src/previsao.py)
     st.subheader("🤖 Previsão de Umidade com Machine Learning")
 
-    if len(df_umidade_sensor) < 2:
+    previsor = obter_previsor(id_plantacao_selecionada, 'umidade', **periodo)
+    previsoes = {}
+    if previsor is not None and not df_umidade_sensor.empty:
+        # O modelo já está atualizado com as leituras do frame: prever não percorre o histórico
+        with medir('dashboard.previsao'):
+            from src.previsao import HORIZONTES_PADRAO, para_segundos
+            previsoes = previsor.prever_horizontes(para_segundos(df_umidade_sensor['data_hora'].iloc[-1]), HORIZONTES_PADRAO)
+
+    if len(df_umidade_sensor) < 2 or not previsoes:
         st.warning("É necessário ter pelo menos 2 leituras de umidade para esta plantação para fazer uma previsão. Adicione mais dados para ativar a previsão.")
     else:
-        # Preparando os dados para o modelo de Regressão Linear
-        # Convertendo datetime para timestamp (número de segundos desde a Época)
-        df_modelo = df_umidade_sensor.copy()
-        df_modelo['timestamp'] = df_modelo['data_hora'].apply(lambda x: x.timestamp())
-        
-        X = df_modelo[['timestamp']] # Feature: o tempo em timestamp
-        y = df_modelo['valor']      # Target: o valor da umidade
-
-        # Treinando o modelo de Regressão Linear
-        modelo = LinearRegression()
-        modelo.fit(X, y)
-
-        # Fazer a previsão para 1 hora no futuro (3600 segundos)
-        ultimo_timestamp = X['timestamp'].iloc[-1]
-        proximo_timestamp = ultimo_timestamp + 3600
-        
-        # A previsão precisa de um array 2D, por isso np.array([[...]])
-        previsao = modelo.predict(np.array([[proximo_timestamp]]))
-        
-        st.success(f"**Previsão de umidade para a próxima hora: {previsao[0]:.2f} %**")
+        st.success(f"**Previsão de umidade para a próxima hora: {previsoes['próxima hora']:.2f} %**")
+        colunas_previsao = st.columns(len(previsoes))
+        for coluna, (horizonte, valor_previsto) in zip(colunas_previsao, previsoes.items()):
+            coluna.metric(f"Umidade prevista ({horizonte})", f"{valor_previsto:.2f} %")
         st.markdown("""
         Este modelo de **Regressão Linear** simples usa o histórico de tempo e umidade para prever a tendência futura. 
         Com mais dados e uma frequência de leituras maior, o modelo tende a se tornar mais preciso e pode ajudar a 
@@ -1,4 +1,9 @@
+import argparse
+import csv
 import datetime
+import sys
+
+import numpy as np
 
 # Dados Mockados para Plantações
 plantacoes_mock = [
@@ -67,3 +72,161 @@ def gerar_leituras_mock(sensor_id_umidade, sensor_id_ph, sensor_id_temperatura,
             "valor": temperatura_valor
         })
     return leituras
+
+# Carga sintética em escala (testes de capacidade)
+#
+# As leituras abaixo são geradas com NumPy, em blocos de colunas, para N plantações × M sensores
+# em qualquer período e frequência. Cada valor vem de um hash da semente, do sensor e do instante
+# (e não de um gerador sequencial), então a mesma semente produz exatamente as mesmas leituras
+# independentemente do tamanho dos blocos ou de onde a geração é retomada.
+
+PREFIXO_SINTETICO = "Carga Sintética"
+TIPOS_SINTETICOS = ['umidade', 'ph', 'temperatura']
+
+# tipo: (base mín., base máx., amplitude do ciclo diário, hora do pico, ruído (desvio), deriva lenta, mínimo, máximo)
+PERFIS_SENSOR = {
+    'umidade':     (45.0, 75.0, 6.0, 6.0, 1.5, 8.0, 0.0, 100.0),   # mais úmido de madrugada
+    'ph':          (5.8, 6.8, 0.05, 14.0, 0.05, 0.3, 0.0, 14.0),
+    'temperatura': (18.0, 26.0, 5.0, 15.0, 0.4, 3.0, -10.0, 50.0)  # pico no meio da tarde
+}
+PERIODO_DERIVA_DIAS = 9.0 # período da variação lenta (chuva/irrigação, frentes frias)
+HORAS_POR_INTERRUPCAO = 6 # duração das janelas em que um sensor pode ficar fora do ar
+
+def _misturar(x):
+    """splitmix64 vetorizado: espalha cada uint64 de entrada num uint64 pseudoaleatório."""
+    with np.errstate(over='ignore'):
+        z = x + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+def _uniforme(semente, *chaves):
+    """Uniforme em (0, 1] a partir de chaves inteiras (escalares ou arrays que se combinam por broadcast)."""
+    h = _misturar(np.full((), semente, dtype=np.uint64))
+    for chave in chaves:
+        h = _misturar(h ^ np.asarray(chave).astype(np.uint64))
+    return ((h >> np.uint64(11)).astype(np.float64) + 1.0) / 2.0 ** 53
+
+def _normal(semente, *chaves):
+    """Normal padrão (Box-Muller) a partir das mesmas chaves de `_uniforme`."""
+    u1 = _uniforme(semente, *chaves, 1)
+    u2 = _uniforme(semente, *chaves, 2)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+def sensores_sinteticos(num_plantacoes, sensores_por_plantacao, primeiro_id=1):
+    """Lista (id_sensor, tipo) para uma carga sem banco, com os tipos de TIPOS_SINTETICOS em rodízio."""
+    total = num_plantacoes * sensores_por_plantacao
+    return [(primeiro_id + i, TIPOS_SINTETICOS[i % sensores_por_plantacao % len(TIPOS_SINTETICOS)]) for i in range(total)]
+
+def gerar_plantacoes_sinteticas(num_plantacoes, semente=42):
+    """Plantações no formato de `plantacoes_mock`, com limites ideais variados."""
+    indices = np.arange(num_plantacoes)
+    umidade = np.round(50.0 + 20.0 * _uniforme(semente, indices, 10), 1)
+    ph_min = np.round(5.5 + 1.0 * _uniforme(semente, indices, 11), 1)
+    return [
+        {
+            "nome": f"{PREFIXO_SINTETICO} {i}",
+            "localizacao": f"Setor {i % 26 + 1}",
+            "umidade_ideal": float(umidade[i]),
+            "ph_ideal_min": float(ph_min[i]),
+            "ph_ideal_max": round(float(ph_min[i]) + 0.6, 1)
+        }
+        for i in range(num_plantacoes)
+    ]
+
+def gerar_blocos_sinteticos(sensores, inicio, fim, intervalo_segundos=60, semente=42,
+                            taxa_falhas=0.01, taxa_interrupcoes=0.002, linhas_por_bloco=1_000_000):
+    """
+    Gera as leituras de `sensores` (lista de (id_sensor, tipo)) entre `inicio` e `fim`, uma a cada
+    `intervalo_segundos` por sensor, em blocos de até `linhas_por_bloco` linhas em ordem cronológica.
+
+    Cada valor soma a base do sensor, um ciclo diário, uma deriva lenta e ruído gaussiano,
+    limitados à faixa física do tipo. Há dois tipos de falha: leituras perdidas isoladas
+    (`taxa_falhas`, por leitura) e sensores fora do ar por janelas de HORAS_POR_INTERRUPCAO horas
+    (`taxa_interrupcoes`, por janela).
+
+    Cada bloco é um dict de arrays NumPy: id_sensor, tipo_sensor, data_hora (datetime64[s]) e valor.
+    Use `linhas_do_bloco` para convertê-lo em tuplas para `inserir_leituras_em_lote`.
+    """
+    ids = np.array([id_sensor for id_sensor, _ in sensores], dtype=np.int64)
+    tipos = np.array([tipo for _, tipo in sensores], dtype=object)
+    perfis = np.array([PERFIS_SENSOR.get(tipo, PERFIS_SENSOR['umidade']) for tipo in tipos], dtype=np.float64).reshape(-1, 8)
+    base_min, base_max, amplitude, pico, ruido, deriva, minimo, maximo = perfis.T
+
+    # Características fixas de cada sensor
+    base = base_min + (base_max - base_min) * _uniforme(semente, ids, 20)
+    fase = 2.0 * np.pi * _uniforme(semente, ids, 21)
+
+    t0 = np.datetime64(inicio, 's').astype(np.int64)
+    total_passos = max(0, int((np.datetime64(fim, 's').astype(np.int64) - t0) // intervalo_segundos))
+    passos_por_bloco = max(1, linhas_por_bloco // max(1, len(ids)))
+
+    for primeiro in range(0, total_passos, passos_por_bloco):
+        passos = np.arange(primeiro, min(primeiro + passos_por_bloco, total_passos), dtype=np.int64)
+        t = (t0 + passos * intervalo_segundos)[:, None] # (passos, 1) contra (sensores,)
+        hora_do_dia = (t % 86400) / 3600.0
+
+        valor = (
+            base
+            + amplitude * np.cos(2.0 * np.pi * (hora_do_dia - pico) / 24.0)
+            + deriva * np.sin(2.0 * np.pi * t / (PERIODO_DERIVA_DIAS * 86400.0) + fase)
+            + ruido * _normal(semente, ids, t)
+        )
+        valor = np.round(np.clip(valor, minimo, maximo), 2)
+
+        presente = _uniforme(semente, ids, t, 3) > taxa_falhas
+        janela = t // (HORAS_POR_INTERRUPCAO * 3600)
+        presente &= _uniforme(semente, ids, janela, 4) > taxa_interrupcoes
+
+        linhas, colunas = np.nonzero(presente)
+        yield {
+            'id_sensor': ids[colunas],
+            'tipo_sensor': tipos[colunas],
+            'data_hora': t[linhas, 0].astype('datetime64[s]'),
+            'valor': valor[linhas, colunas]
+        }
+
+def linhas_do_bloco(bloco):
+    """Converte um bloco de `gerar_blocos_sinteticos` em tuplas (id_sensor, tipo_sensor, data_hora, valor)."""
+    return list(zip(
+        bloco['id_sensor'].tolist(),
+        bloco['tipo_sensor'].tolist(),
+        bloco['data_hora'].tolist(),
+        bloco['valor'].tolist()
+    ))
+
+def main():
+    """Grava uma carga sintética em CSV (id_sensor,tipo_sensor,data_hora,valor), sem precisar do banco."""
+    parser = argparse.ArgumentParser(description="Gera leituras sintéticas em CSV para testes de carga.")
+    parser.add_argument('--plantacoes', type=int, default=10)
+    parser.add_argument('--sensores', type=int, default=3, help="Sensores por plantação")
+    parser.add_argument('--dias', type=float, default=30)
+    parser.add_argument('--intervalo', type=int, default=60, help="Segundos entre leituras de um sensor")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='-', help="Arquivo CSV de saída ('-' para a saída padrão)")
+    args = parser.parse_args()
+
+    fim = datetime.datetime.now().replace(microsecond=0)
+    inicio = fim - datetime.timedelta(days=args.dias)
+    sensores = sensores_sinteticos(args.plantacoes, args.sensores)
+
+    arquivo = sys.stdout if args.saida == '-' else open(args.saida, 'w', newline='')
+    try:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['id_sensor', 'tipo_sensor', 'data_hora', 'valor'])
+        total = 0
+        for bloco in gerar_blocos_sinteticos(sensores, inicio, fim, args.intervalo, args.semente):
+            escritor.writerows(zip(
+                bloco['id_sensor'].tolist(),
+                bloco['tipo_sensor'].tolist(),
+                np.char.replace(bloco['data_hora'].astype(str), 'T', ' ').tolist(),
+                bloco['valor'].tolist()
+            ))
+            total += len(bloco['valor'])
+    finally:
+        if arquivo is not sys.stdout:
+            arquivo.close()
+    print(f"📊 {total} leituras sintéticas geradas.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+"""
+Serviço HTTP de ingestão de leituras (asyncio, sem dependências externas).
+
+Os dispositivos enviam leituras avulsas ou em lote; cada requisição entra numa fila em memória
+e uma única tarefa de escrita agrupa as requisições pendentes num lote gravado de uma vez
+(inserir_leituras_em_lote, numa thread à parte para não travar o laço de eventos). A resposta
+só sai depois do commit do lote que contém as leituras da requisição: 200 significa gravado.
+
+    POST /leituras   JSON: {"id_sensor": 1, "valor": 55.2} ou uma lista desses objetos;
+                     Campos opcionais: "tipo_sensor" (se enviado, deve ser o tipo cadastrado do sensor)
+                     e "data_hora" (ISO 8601 ou segundos desde a Época; padrão: agora).
+    GET  /saude      leituras pendentes, gravadas, lotes e falhas.
+    GET  /metricas   chamadas, linhas e latência (p50/p95/p99) por operação (src/metricas.py).
+
+Com --spool, um lote que o banco não aceitar vai para o spool em disco (src/spool.py) e as
+requisições recebem 202: as leituras estão guardadas e serão gravadas quando o banco voltar.
+Com --alertas, cada lote aceito passa pelo motor de alertas (src/alertas.py).
+
+Uso:
+    python -m src.ingestao_http --porta 8080 --tamanho-lote 2000
+    curl -X POST localhost:8080/leituras -d '{"id_sensor": 1, "valor": 55.2}'
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import functools
+import json
+import signal
+import time
+
+from src.alertas import MotorAlertas
+from src.banco_dados import conexao, inserir_leituras_em_lote
+from src.metadados import atualizar_metadados, metadados_vencidos, sensor_em_cache
+from src.metricas import iniciar_exportacao, medir, registrar, resumo
+from src.spool import SpoolLeituras
+
+TAMANHO_MAX_CORPO = 8 * 1024 * 1024 # bytes por requisição
+INTERVALO_RECARGA_SENSORES = 1.0 # segundos mínimos entre verificações do cadastro de sensores
+INTERVALO_OCIOSO = 1.0 # segundos sem requisições antes de adiantar o reenvio do spool e a gravação dos alertas
+
+_STATUS = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+    413: 'Payload Too Large', 422: 'Unprocessable Entity', 503: 'Service Unavailable'
+}
+
+class ErroRequisicao(Exception):
+    """Requisição rejeitada antes de entrar na fila; `status` é o código HTTP da resposta."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+def _data_hora(valor):
+    if valor is None:
+        return datetime.datetime.now()
+    if isinstance(valor, (int, float)):
+        return datetime.datetime.fromtimestamp(valor)
+    return datetime.datetime.fromisoformat(valor)
+
+def interpretar_corpo(corpo, tipo_conteudo):
+    """Converte o corpo da requisição (JSON ou NDJSON) numa lista de dicts de leitura."""
+    try:
+        texto = corpo.decode('utf-8')
+        if 'ndjson' in tipo_conteudo:
+            itens = [json.loads(linha) for linha in texto.splitlines() if linha.strip()]
+        else:
+            itens = json.loads(texto)
+    except (UnicodeDecodeError, ValueError) as err:
+        raise ErroRequisicao(400, f"Corpo inválido: {err}")
+    if isinstance(itens, dict):
+        itens = [itens]
+    if not isinstance(itens, list) or not all(isinstance(item, dict) for item in itens):
+        raise ErroRequisicao(400, "Envie um objeto de leitura ou uma lista de objetos.")
+    return itens
+
+class IngestaoHTTP:
+    """Servidor HTTP com fila em memória e escrita em lote confirmada antes da resposta."""
+
+    def __init__(self, host='0.0.0.0', porta=8080, tamanho_lote=2000, intervalo_flush=0.0, tamanho_fila=100000, spool=None, alertas=None):
+        self.host = host
+        self.porta = porta
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.tamanho_fila = tamanho_fila # leituras aguardando gravação antes de responder 503
+        self.spool = spool # SpoolLeituras opcional
+        self.alertas = alertas # MotorAlertas opcional, usado só na thread de escrita
+        self.total_spool = 0
+        self.pendentes = 0
+        self.total_gravadas = 0
+        self.lotes = 0
+        self.falhas = 0
+        self._clientes = set() # conexões abertas, fechadas no encerramento
+        self._ultima_recarga = 0.0
+        self._recarga = None # verificação dos metadados em andamento, compartilhada
+        # Uma única thread grava no banco: os lotes saem em ordem e sem disputar conexões
+        self._escritor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='gravacao')
+
+    def _verificar_metadados(self, forcar):
+        with conexao() as conn:
+            return conn is not None and atualizar_metadados(conn, forcar=forcar)
+
+    def _verificacao(self, forcar=False):
+        """Verificação do cache de metadados em andamento (no máximo uma por segundo), compartilhada pelas requisições."""
+        if self._recarga is None or (self._recarga.done() and time.monotonic() - self._ultima_recarga >= INTERVALO_RECARGA_SENSORES):
+            self._ultima_recarga = time.monotonic()
+            self._recarga = asyncio.get_running_loop().run_in_executor(None, self._verificar_metadados, forcar)
+        return asyncio.shield(self._recarga)
+
+    async def _tipo_sensor(self, id_sensor):
+        sensor = sensor_em_cache(id_sensor)
+        if sensor is not None:
+            if metadados_vencidos():
+                self._verificacao() # confere a versão em segundo plano, sem atrasar a requisição
+            return sensor[0]
+        # Sensor desconhecido: pode ter sido cadastrado por outro processo desde a última verificação
+        if not await self._verificacao(forcar=True):
+            raise ErroRequisicao(503, "Banco de dados indisponível.")
+        sensor = sensor_em_cache(id_sensor)
+        return sensor[0] if sensor else None
+
+    async def _validar(self, itens):
+        """Converte os dicts em tuplas (id_sensor, tipo_sensor, data_hora, valor) para inserir_leituras_em_lote."""
+        linhas = []
+        for posicao, item in enumerate(itens):
+            try:
+                id_sensor = int(item['id_sensor'])
+                valor = float(item['valor'])
+                data_hora = _data_hora(item.get('data_hora'))
+            except (KeyError, TypeError, ValueError, OverflowError, OSError) as err:
+                raise ErroRequisicao(422, f"Leitura {posicao} inválida: {err!r}")
+            tipo = await self._tipo_sensor(id_sensor)
+            if tipo is None:
+                raise ErroRequisicao(422, f"Leitura {posicao}: sensor {id_sensor} não cadastrado.")
+            # O tipo gravado é sempre o do cadastro do sensor: o cliente não cria tipos novos em TipoSensor
+            informado = item.get('tipo_sensor')
+            if informado and str(informado).strip().lower() != tipo.strip().lower():
+                raise ErroRequisicao(422, f"Leitura {posicao}: o sensor {id_sensor} é do tipo '{tipo}', não '{informado}'.")
+            linhas.append((id_sensor, tipo, data_hora, valor))
+        return linhas
+
+    async def _receber_leituras(self, cabecalhos, corpo):
+        linhas = await self._validar(interpretar_corpo(corpo, cabecalhos.get('content-type', '')))
+        if not linhas:
+            return 200, {'gravadas': 0}
+        if self.pendentes + len(linhas) > self.tamanho_fila:
+            raise ErroRequisicao(503, "Fila de gravação cheia; tente novamente.")
+        confirmacao = asyncio.get_running_loop().create_future()
+        self.pendentes += len(linhas)
+        self.fila.put_nowait((linhas, confirmacao))
+        try:
+            destino = await confirmacao
+        except RuntimeError as err:
+            raise ErroRequisicao(503, str(err))
+        if destino == 'spool':
+            return 202, {'gravadas': 0, 'spool': len(linhas)}
+        return 200, {'gravadas': len(linhas)}
+
+    async def _rotear(self, metodo, caminho, cabecalhos, corpo):
+        caminho = caminho.split('?', 1)[0]
+        if caminho == '/leituras':
+            if metodo != 'POST':
+                raise ErroRequisicao(405, "Use POST.")
+            # Da chegada à resposta, inclusive a espera pelo commit do lote
+            inicio = time.perf_counter()
+            try:
+                status, resposta = await self._receber_leituras(cabecalhos, corpo)
+            except ErroRequisicao:
+                registrar('http POST /leituras', time.perf_counter() - inicio, erro=True)
+                raise
+            registrar('http POST /leituras', time.perf_counter() - inicio, resposta['gravadas'] + resposta.get('spool', 0))
+            return status, resposta
+        if caminho == '/saude':
+            saude = {
+                'pendentes': self.pendentes, 'gravadas': self.total_gravadas, 'lotes': self.lotes, 'falhas': self.falhas
+            }
+            if self.spool is not None:
+                saude.update(spool=self.total_spool, spool_bytes=self.spool.bytes_pendentes())
+            return 200, saude
+        if caminho == '/metricas':
+            return 200, {'operacoes': resumo()}
+        raise ErroRequisicao(404, f"Caminho desconhecido: {caminho}")
+
+    async def _atender(self, reader, writer):
+        """Atende as requisições de uma conexão (HTTP/1.1 com keep-alive) até o cliente fechá-la."""
+        self._clientes.add(writer)
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, caminho, versao = linha.decode('latin-1').split()
+                except ValueError:
+                    self._responder(writer, 400, {'erro': "Linha de requisição inválida."}, False)
+                    break
+                cabecalhos = {}
+                while True:
+                    cabecalho = await reader.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                manter = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+
+                try:
+                    if 'transfer-encoding' in cabecalhos:
+                        manter = False
+                        raise ErroRequisicao(411, "Envie o corpo com Content-Length.")
+                    tamanho = int(cabecalhos.get('content-length', 0))
+                    if tamanho > TAMANHO_MAX_CORPO:
+                        manter = False
+                        raise ErroRequisicao(413, f"Corpo maior que {TAMANHO_MAX_CORPO} bytes.")
+                    corpo = await reader.readexactly(tamanho) if tamanho else b''
+                    status, resposta = await self._rotear(metodo, caminho, cabecalhos, corpo)
+                except ErroRequisicao as err:
+                    status, resposta = err.status, {'erro': str(err)}
+                self._responder(writer, status, resposta, manter)
+                await writer.drain()
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # cliente desconectou no meio da requisição
+        finally:
+            self._clientes.discard(writer)
+            writer.close()
+
+    def _responder(self, writer, status, resposta, manter):
+        corpo = json.dumps(resposta, ensure_ascii=False).encode('utf-8')
+        cabecalhos = [
+            f"HTTP/1.1 {status} {_STATUS[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(corpo)}",
+            f"Connection: {'keep-alive' if manter else 'close'}"
+        ]
+        if status == 503:
+            cabecalhos.append("Retry-After: 1")
+        writer.write(("\r\n".join(cabecalhos) + "\r\n\r\n").encode('latin-1') + corpo)
+
+    def _inserir(self, lote):
+        """Retorna (gravadas no banco, guardadas no spool)."""
+        with medir('ingestao_http.gravar_lote') as medicao:
+            medicao.linhas = len(lote)
+            if self.spool is not None:
+                gravadas, no_spool = self.spool.gravar(lote)
+            else:
+                # Um único commit por lote: ou todas as requisições do lote são confirmadas, ou nenhuma
+                gravadas, no_spool = inserir_leituras_em_lote(lote, tamanho_lote=1000, linhas_por_commit=len(lote)), 0
+        if self.alertas is not None and gravadas + no_spool == len(lote):
+            self.alertas.avaliar(lote) # lotes recusados serão reenviados pelos clientes e avaliados então
+        return gravadas, no_spool
+
+    def _tarefas_ociosas(self):
+        if self.spool is not None and self.spool.pendente:
+            self.spool.drenar(max_lotes=1)
+        if self.alertas is not None:
+            self.alertas.persistir()
+
+    async def _gravar(self, pedidos):
+        lote = [linha for linhas, _ in pedidos for linha in linhas]
+        try:
+            gravadas, no_spool = await asyncio.get_running_loop().run_in_executor(self._escritor, self._inserir, lote)
+        except Exception as err: # a tarefa de escrita não pode morrer: as requisições ficariam sem resposta
+            print(f"Erro ao gravar lote de leituras: {err}")
+            gravadas, no_spool = 0, 0
+        self.pendentes -= len(lote)
+        self.lotes += 1
+        sucesso = gravadas + no_spool == len(lote)
+        self.total_gravadas += gravadas
+        self.total_spool += no_spool
+        if not sucesso or no_spool:
+            self.falhas += 1
+        for _, confirmacao in pedidos:
+            if confirmacao.done():
+                continue # cliente já desconectou
+            if sucesso:
+                confirmacao.set_result('spool' if no_spool else 'banco')
+            else:
+                confirmacao.set_exception(RuntimeError("Falha ao gravar as leituras no banco de dados."))
+
+    async def _escrever(self):
+        """
+        Commit em grupo: assim que fica livre, a tarefa grava num único lote todas as requisições
+        já enfileiradas (até `tamanho_lote` leituras); enquanto um lote é gravado, as novas se
+        acumulam para o próximo. Com `intervalo_flush` > 0, espera até esse tempo por mais
+        requisições antes de gravar um lote incompleto (menos commits, mais latência).
+        """
+        loop = asyncio.get_running_loop()
+        encerrar = False
+        while not encerrar:
+            if self.fila.empty() and (self.alertas is not None or (self.spool is not None and self.spool.pendente)):
+                try:
+                    pedido = await asyncio.wait_for(self.fila.get(), INTERVALO_OCIOSO)
+                except asyncio.TimeoutError:
+                    # Sem requisições: adianta o reenvio do spool (um lote por vez) e grava os alertas vencidos
+                    await loop.run_in_executor(self._escritor, self._tarefas_ociosas)
+                    continue
+            else:
+                pedido = await self.fila.get()
+            if pedido is None:
+                break
+            pedidos = [pedido]
+            leituras = len(pedido[0])
+            limite = loop.time() + self.intervalo_flush
+            while leituras < self.tamanho_lote:
+                if not self.fila.empty():
+                    pedido = self.fila.get_nowait()
+                else:
+                    restante = limite - loop.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        pedido = await asyncio.wait_for(self.fila.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                if pedido is None:
+                    encerrar = True
+                    break
+                pedidos.append(pedido)
+                leituras += len(pedido[0])
+            await self._gravar(pedidos)
+
+    async def _servir(self):
+        self.fila = asyncio.Queue()
+        parar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sinal, parar.set)
+            except (NotImplementedError, RuntimeError):
+                pass # Windows ou fora da thread principal: Ctrl+C encerra sem o flush final
+
+        servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        escritor = asyncio.create_task(self._escrever())
+        print(f"🌐 Ingestão HTTP em http://{self.host}:{self.porta}/leituras "
+              f"(lote de até {self.tamanho_lote} leituras, espera de {self.intervalo_flush}s).")
+        async with servidor:
+            await parar.wait()
+            print("\nEncerrando ingestão...")
+            servidor.close() # para de aceitar conexões
+            self.fila.put_nowait(None) # o escritor grava o que já está na fila e termina
+            await escritor
+            for cliente in list(self._clientes):
+                cliente.close()
+            await asyncio.sleep(0.1) # deixa as conexões abertas terminarem
+        if self.alertas is not None:
+            await loop.run_in_executor(self._escritor, functools.partial(self.alertas.persistir, forcar=True))
+        self._escritor.shutdown()
+        print(f"📊 {self.total_gravadas} leituras gravadas em {self.lotes} lote(s).")
+        if self.spool is not None:
+            self.spool.fechar()
+            if self.spool.pendente:
+                print(f"📦 {self.spool.bytes_pendentes()} bytes no spool, reenviados na próxima execução (ou com python -m src.spool --drenar).")
+        return self.total_gravadas
+
+    def executar(self):
+        """Atende até Ctrl+C/SIGTERM e grava as leituras pendentes antes de sair."""
+        return asyncio.run(self._servir())
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de ingestão de leituras com gravação em lote.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--tamanho-lote', type=int, default=2000, help="Leituras por lote gravado")
+    parser.add_argument('--intervalo-flush', type=float, default=0.0, help="Segundos de espera por mais requisições antes de gravar um lote incompleto")
+    parser.add_argument('--tamanho-fila', type=int, default=100000, help="Leituras pendentes antes de responder 503")
+    parser.add_argument('--spool', metavar='PASTA', help="Guarda em disco os lotes que o banco não aceitar e responde 202")
+    parser.add_argument('--spool-fsync', action='store_true', help="fsync a cada anexação ao spool (resiste a queda de energia)")
+    parser.add_argument('--alertas', action='store_true', help="Avalia as leituras contra os limites das plantações e grava os alertas")
+    args = parser.parse_args()
+
+    iniciar_exportacao('ingestao_http')
+    IngestaoHTTP(
+        host=args.host,
+        porta=args.porta,
+        tamanho_lote=args.tamanho_lote,
+        intervalo_flush=args.intervalo_flush,
+        tamanho_fila=args.tamanho_fila,
+        spool=SpoolLeituras(args.spool, sincronizar=args.spool_fsync) if args.spool else None,
+        alertas=MotorAlertas() if args.alertas else None
+    ).executar()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Daemon de ingestão das leituras enviadas pelo ESP32 (src/prog1.ino) pela porta serial.
+
+Cada dispositivo é lido por uma thread própria, que interpreta as linhas do firmware e
+coloca as leituras numa fila limitada. Uma única thread de escrita esvazia a fila e grava
+as leituras em lote no MySQL, sem uma ida ao banco por linha. Quando o banco fica para trás
+a fila enche e os leitores bloqueiam (backpressure), mantendo a memória limitada.
+Sem --spool, um lote que o banco não aceitar (queda, conexão perdida) fica em memória, até
+MAX_LEITURAS_RETIDAS leituras, e é regravado depois de reconectar; o excedente (as mais antigas)
+e o que ainda estiver retido ao encerrar se perdem. Com --spool, os leitores nunca bloqueiam:
+o excesso da fila e os lotes que o banco não aceitar vão para o spool em disco (src/spool.py)
+e são reenviados quando o banco voltar. Com --alertas, cada lote gravado passa pelo motor de alertas (src/alertas.py).
+
+Uso:
+    python -m src.ingestao_serial /dev/ttyUSB0:umidade=1,ph=2,temperatura=3
+    python -m src.ingestao_serial --replay captura.txt:umidade=1,ph=2
+    python -m src.ingestao_serial --spool dados/spool /dev/ttyUSB0:umidade=1
+"""
+import argparse
+import datetime
+import queue
+import re
+import threading
+import time
+
+from src.alertas import MotorAlertas
+from src.banco_dados import criar_conexao, inserir_leituras_em_lote
+from src.metricas import iniciar_exportacao, medido
+from src.spool import SpoolLeituras
+
+try:
+    import serial # pyserial, necessário apenas para portas seriais reais
+except ImportError:
+    serial = None
+
+BAUD_RATE = 115200 # mesmo valor de Serial.begin() no firmware
+MAX_LEITURAS_RETIDAS = 100000 # sem spool: leituras não gravadas mantidas em memória até o banco voltar
+INTERVALO_RECONEXAO = 5.0 # segundos entre tentativas de reconectar depois de uma falha
+TENTATIVAS_REGRAVACAO = 3 # recusas das mesmas leituras com o banco no ar antes de descartá-las
+
+# Formato das linhas impressas por prog1.ino
+_RE_NUMERO = re.compile(r'^-?\d+(\.\d+)?$')
+_RE_PH = re.compile(r'^pH:\s*(-?\d+(\.\d+)?)$')
+_RE_TEMPERATURA = re.compile(r'^Temp:\s*(-?\d+(\.\d+)?)$')
+_NUTRIENTES = {
+    'Fosforo presente': 'fosforo',
+    'Potassio presente': 'potassio'
+}
+
+def interpretar_linha(linha):
+    """
+    Converte uma linha do firmware em (tipo_sensor, valor), ou None se a linha não for uma leitura.
+    Um número solto é a umidade (saída do Serial Plotter); nutrientes presentes valem 1.0.
+    """
+    linha = linha.strip()
+    if not linha:
+        return None
+    if _RE_NUMERO.match(linha):
+        return ('umidade', float(linha))
+    m = _RE_PH.match(linha)
+    if m:
+        return ('ph', float(m.group(1)))
+    m = _RE_TEMPERATURA.match(linha)
+    if m:
+        return ('temperatura', float(m.group(1)))
+    if linha in _NUTRIENTES:
+        return (_NUTRIENTES[linha], 1.0)
+    return None # mensagens de erro e outras saídas de depuração são ignoradas
+
+def interpretar_dispositivo(especificacao):
+    """Interpreta 'PORTA:tipo=id_sensor,tipo=id_sensor' em (porta, {tipo: id_sensor})."""
+    porta, _, mapeamento = especificacao.rpartition(':')
+    if not porta or not mapeamento:
+        raise ValueError(f"Dispositivo inválido: '{especificacao}'. Use PORTA:tipo=id,tipo=id")
+    sensores = {}
+    for par in mapeamento.split(','):
+        tipo, _, id_sensor = par.partition('=')
+        sensores[tipo.strip()] = int(id_sensor)
+    return porta, sensores
+
+def _abrir_fluxo(porta, replay):
+    """Abre a porta serial (pyserial) ou, em modo replay ou sem pyserial, um arquivo/pty comum."""
+    if replay or serial is None:
+        return open(porta, 'rb')
+    return serial.Serial(porta, BAUD_RATE, timeout=1)
+
+class IngestaoSerial:
+    """Coordena as threads de leitura dos dispositivos e a thread de escrita em lote."""
+
+    def __init__(self, dispositivos, tamanho_lote=500, intervalo_flush=2.0, tamanho_fila=10000, replay=False, spool=None, alertas=None):
+        self.dispositivos = dispositivos # [(porta, {tipo: id_sensor})]
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.replay = replay
+        self.spool = spool # SpoolLeituras opcional
+        self.alertas = alertas # MotorAlertas opcional, usado só na thread de escrita
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.parar = threading.Event()
+        self.total_gravadas = 0
+        self.total_descartadas = 0
+        self.conn = None # sem spool: conexão de longa duração, refeita depois de uma falha
+        self._retidas = [] # sem spool: leituras de lotes que falharam, regravadas antes das novas
+        self._reconectar_em = 0.0
+        self._recusas = 0
+        self._leitores_ativos = 0
+        self._lock = threading.Lock()
+
+    def _ler_dispositivo(self, porta, sensores):
+        # O contador de leitores é decrementado em qualquer saída, inclusive se a abertura falhar:
+        # a thread de escrita espera ele chegar a zero para terminar
+        fluxo = None
+        try:
+            try:
+                fluxo = _abrir_fluxo(porta, self.replay)
+            except OSError as err:
+                print(f"Erro ao abrir o dispositivo {porta}: {err}")
+                return
+            while not self.parar.is_set():
+                bruta = fluxo.readline()
+                if not bruta:
+                    if self.replay:
+                        break # fim do arquivo de replay
+                    continue # timeout da porta serial sem dados
+                resultado = interpretar_linha(bruta.decode('utf-8', errors='ignore'))
+                if resultado is None:
+                    continue
+                tipo, valor = resultado
+                id_sensor = sensores.get(tipo)
+                if id_sensor is None:
+                    continue # tipo sem sensor cadastrado para este dispositivo
+                leitura = (id_sensor, tipo, datetime.datetime.now(), valor)
+                if self.spool is None:
+                    # put() bloqueia com a fila cheia: é o backpressure sobre os leitores
+                    self.fila.put(leitura)
+                    continue
+                try:
+                    self.fila.put_nowait(leitura)
+                except queue.Full:
+                    self.spool.adicionar([leitura]) # pico maior que a fila: transborda para o disco
+        finally:
+            if fluxo is not None:
+                fluxo.close()
+            with self._lock:
+                self._leitores_ativos -= 1
+
+    def _gravar_retendo(self, lote):
+        """Sem spool: grava as leituras retidas e o lote; o que não for confirmado fica retido para a próxima vez."""
+        retidas, self._retidas = self._retidas, []
+        conexao_nova = False
+        if self.conn is None and time.monotonic() >= self._reconectar_em:
+            self.conn = criar_conexao()
+            conexao_nova = self.conn is not None
+        gravadas = 0
+        # Retidas e lote novo em transações separadas: uma leitura recusada não prende as novas
+        for grupo in (retidas, lote):
+            if not grupo:
+                continue
+            confirmadas = inserir_leituras_em_lote(grupo, tamanho_lote=self.tamanho_lote, conn=self.conn) if self.conn else 0
+            gravadas += confirmadas
+            self._retidas.extend(grupo[confirmadas:]) # as confirmadas são as primeiras (commits em ordem)
+        if not self._retidas:
+            self._recusas = 0
+            return gravadas
+
+        if retidas and conexao_nova and len(self._retidas) >= len(retidas):
+            # Recusadas numa conexão recém-aberta: o banco está no ar e não aceita essas leituras
+            self._recusas += 1
+            if self._recusas >= TENTATIVAS_REGRAVACAO:
+                self.total_descartadas += len(retidas)
+                print(f"⚠️ {len(retidas)} leituras descartadas: recusadas {self._recusas} vezes pelo banco (sensor removido?).")
+                del self._retidas[:len(retidas)]
+                self._recusas = 0
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass # conexão já perdida
+            self.conn = None
+            self._reconectar_em = time.monotonic() + INTERVALO_RECONEXAO
+        excesso = len(self._retidas) - MAX_LEITURAS_RETIDAS
+        if excesso > 0:
+            del self._retidas[:excesso]
+            self.total_descartadas += excesso
+            print(f"⚠️ {excesso} leituras descartadas: mais de {MAX_LEITURAS_RETIDAS} aguardando o banco (use --spool).")
+        return gravadas
+
+    @medido('ingestao_serial.gravar_lote', linhas=len)
+    def _gravar_lote(self, lote, conn):
+        if self.spool is None:
+            gravadas = self._gravar_retendo(lote)
+        else:
+            gravadas, _ = self.spool.gravar(lote, conn)
+        self.total_gravadas += gravadas
+        if self.alertas is not None and lote:
+            self.alertas.avaliar(lote) # avalia mesmo sem gravar: o alerta de irrigação não pode esperar o banco
+
+    def _gravar(self, conn):
+        lote = []
+        ultimo_flush = time.monotonic()
+        while True:
+            with self._lock:
+                leitores_ativos = self._leitores_ativos
+            try:
+                lote.append(self.fila.get(timeout=0.2))
+            except queue.Empty:
+                if leitores_ativos <= 0:
+                    break
+                if not lote and self.spool is not None and self.spool.pendente:
+                    self.spool.drenar(conn, max_lotes=1) # ocioso: adianta o reenvio do spool
+                if not lote and self._retidas and time.monotonic() >= self._reconectar_em:
+                    self._gravar_lote([], conn) # ocioso: tenta de novo as leituras retidas
+                if self.alertas is not None:
+                    self.alertas.persistir() # grava os alertas que já esperaram INTERVALO_PERSISTENCIA
+            vencido = time.monotonic() - ultimo_flush >= self.intervalo_flush
+            if len(lote) >= self.tamanho_lote or (lote and vencido):
+                self._gravar_lote(lote, conn)
+                lote = []
+                ultimo_flush = time.monotonic()
+        if lote or self._retidas:
+            self._gravar_lote(lote, conn)
+
+    def executar(self):
+        """Lê todos os dispositivos até Ctrl+C (ou até o fim dos arquivos em modo replay)."""
+        conn = None # com spool, cada lote pega uma conexão do pool: o banco pode cair e voltar durante a ingestão
+        if self.spool is None:
+            self.conn = criar_conexao()
+            if not self.conn:
+                print("Não foi possível conectar ao banco de dados. Abortando ingestão.")
+                return 0
+
+        self._leitores_ativos = len(self.dispositivos)
+        leitores = [
+            threading.Thread(target=self._ler_dispositivo, args=(porta, sensores), daemon=True)
+            for porta, sensores in self.dispositivos
+        ]
+        for leitor in leitores:
+            leitor.start()
+        print(f"📡 Ingestão iniciada para {len(leitores)} dispositivo(s).")
+
+        try:
+            self._gravar(conn)
+        except KeyboardInterrupt:
+            print("\nEncerrando ingestão...")
+            self.parar.set()
+            with self._lock:
+                self._leitores_ativos = 0
+            self._gravar(conn) # grava o que já está na fila antes de sair
+        finally:
+            if self.conn:
+                self.conn.close()
+            if self.spool is not None:
+                self.spool.fechar()
+            if self.alertas is not None:
+                self.alertas.persistir(forcar=True)
+        print(f"📊 {self.total_gravadas} leituras gravadas.")
+        if self._retidas or self.total_descartadas:
+            print(f"⚠️ {len(self._retidas) + self.total_descartadas} leituras não gravadas (banco indisponível); use --spool para guardá-las em disco.")
+        if self.spool is not None and self.spool.pendente:
+            print(f"📦 {self.spool.bytes_pendentes()} bytes no spool, reenviados na próxima execução (ou com python -m src.spool --drenar).")
+        return self.total_gravadas
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão das leituras seriais do ESP32 no MySQL.")
+    parser.add_argument('dispositivos', nargs='+', help="PORTA:tipo=id_sensor,... (ex: /dev/ttyUSB0:umidade=1,ph=2)")
+    parser.add_argument('--replay', action='store_true', help="Lê arquivos/pty em vez de portas seriais (testes)")
+    parser.add_argument('--tamanho-lote', type=int, default=500)
+    parser.add_argument('--intervalo-flush', type=float, default=2.0, help="Segundos máximos entre gravações")
+    parser.add_argument('--tamanho-fila', type=int, default=10000, help="Leituras em memória antes de bloquear os leitores")
+    parser.add_argument('--spool', metavar='PASTA', help="Guarda em disco as leituras que o banco não aceitar e as reenvia depois")
+    parser.add_argument('--spool-fsync', action='store_true', help="fsync a cada anexação ao spool (resiste a queda de energia)")
+    parser.add_argument('--alertas', action='store_true', help="Avalia as leituras contra os limites das plantações e grava os alertas")
+    args = parser.parse_args()
+
+    try:
+        dispositivos = [interpretar_dispositivo(d) for d in args.dispositivos]
+    except ValueError as err:
+        print(f"⚠️ {err}")
+        return
+    iniciar_exportacao('ingestao_serial')
+    IngestaoSerial(
+        dispositivos,
+        tamanho_lote=args.tamanho_lote,
+        intervalo_flush=args.intervalo_flush,
+        tamanho_fila=args.tamanho_fila,
+        replay=args.replay,
+        spool=SpoolLeituras(args.spool, sincronizar=args.spool_fsync) if args.spool else None,
+        alertas=MotorAlertas() if args.alertas else None
+    ).executar()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Operações em massa, sem interação, sobre plantações, sensores e leituras a partir de arquivos
+CSV (com cabeçalho) ou JSONL (um objeto por linha; '-' lê da entrada padrão). É o caminho de
+`python -m src.banco_dados` com argumentos; sem argumentos ele continua abrindo o menu.
+
+    python -m src.banco_dados importar plantacoes plantacoes.csv
+    python -m src.banco_dados importar sensores sensores.csv --saida ids_sensores.csv
+    python -m src.banco_dados importar leituras leituras.jsonl --load-data
+    python -m src.banco_dados remover leituras ids.csv
+
+Campos de cada linha:
+
+    plantacoes: nome, localizacao, umidade_ideal, ph_ideal_min, ph_ideal_max
+    sensores:   tipo, id_plantacao
+    leituras:   id_sensor, valor, data_hora (opcional, AAAA-MM-DD HH:MM:SS; padrão: agora)
+    remover:    id
+
+Em plantacoes e sensores, uma linha com `id` atualiza o registro existente (só os campos
+presentes). Cada `--lote` linhas formam uma transação. Linhas inválidas (campo ausente, número
+mal formado, plantação ou sensor inexistente) são avisadas e puladas. Um erro do banco desfaz
+o lote em andamento e interrompe a operação; os lotes já confirmados ficam gravados.
+
+Em `remover plantacoes|sensores`, a transação do lote remove os registros (e, em cascata, os
+agregados e alertas dos sensores); as leituras deles saem depois, em fatias com um commit cada
+(`purgar_leituras`). Se a purga falhar, as leituras restantes ficam sem sensor, fora de qualquer
+consulta, e os ids impressos no erro as removem com `remover sensores`: nada se perde pela metade.
+"""
+import argparse
+import csv
+import datetime
+import json
+import sys
+import time
+
+import mysql.connector
+
+from src.agregados import recalcular_dias
+from src.arquivamento import remover_do_arquivo
+from src.banco_dados import conexao, criar_tabelas, fatias_purga, inserir_leituras_em_lote, purgar_leituras
+from src.metadados import atualizar_metadados, obter_plantacao, obter_sensor, obter_sensores, registrar_alteracao
+
+TAMANHO_LOTE = 5000 # linhas por transação
+INTERVALO_PROGRESSO = 2 # segundos entre avisos de progresso
+LIMITE_AVISOS = 20 # linhas inválidas listadas uma a uma; as demais só entram na contagem
+
+TABELAS = {'plantacoes': 'Plantacao', 'sensores': 'Sensor', 'leituras': 'Leitura'}
+CAMPOS = {
+    'plantacoes': {'nome': str, 'localizacao': str, 'umidade_ideal': float, 'ph_ideal_min': float, 'ph_ideal_max': float},
+    'sensores': {'tipo': str, 'id_plantacao': int}
+}
+
+class Progresso:
+    """Conta as linhas processadas e as inválidas e avisa o andamento a cada INTERVALO_PROGRESSO segundos."""
+
+    def __init__(self, descricao):
+        self.descricao = descricao
+        self.total = 0
+        self.invalidas = 0
+        self.inicio = self.ultimo_aviso = time.monotonic()
+
+    def avancar(self, quantidade=1):
+        self.total += quantidade
+        agora = time.monotonic()
+        if agora - self.ultimo_aviso >= INTERVALO_PROGRESSO:
+            self.ultimo_aviso = agora
+            print(f"⏳ {self.total} {self.descricao} ({self.total / (agora - self.inicio):,.0f}/s)...")
+
+    def invalida(self, numero, erro):
+        self.invalidas += 1
+        if self.invalidas <= LIMITE_AVISOS:
+            print(f"⚠️ Linha {numero} ignorada: {erro}")
+
+    def concluir(self, total=None):
+        total = self.total if total is None else total
+        invalidas = f"; {self.invalidas} linha(s) inválida(s) ignorada(s)" if self.invalidas else ""
+        print(f"✅ {total} {self.descricao} em {time.monotonic() - self.inicio:.1f}s{invalidas}.")
+
+def ler_registros(caminho, formato=None):
+    """
+    (número da linha, registro) de cada linha do arquivo. Registros CSV vêm como dict (campos
+    vazios omitidos); os JSONL vêm como texto e são decodificados por `_objeto`, para que uma
+    linha mal formada seja só mais uma linha inválida.
+    """
+    formato = formato or ('jsonl' if caminho.endswith(('.jsonl', '.ndjson')) else 'csv')
+    arquivo = sys.stdin if caminho == '-' else open(caminho, newline='', encoding='utf-8')
+    try:
+        if formato == 'jsonl':
+            for numero, linha in enumerate(arquivo, 1):
+                if linha.strip():
+                    yield numero, linha
+        else:
+            leitor = csv.DictReader(arquivo)
+            for registro in leitor:
+                yield leitor.line_num, {campo: valor for campo, valor in registro.items() if valor not in (None, '')}
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+
+def _objeto(registro):
+    if isinstance(registro, str):
+        registro = json.loads(registro) # json.JSONDecodeError é um ValueError
+        if not isinstance(registro, dict):
+            raise ValueError("a linha não é um objeto JSON")
+    return registro
+
+def _campo(registro, campo, tipo):
+    valor = registro.get(campo)
+    if valor is None or valor == '':
+        raise ValueError(f"campo '{campo}' ausente")
+    return tipo(valor)
+
+def importar_cadastros(conn, entidade, registros, tamanho_lote=TAMANHO_LOTE, saida=None):
+    """
+    Cadastra (linhas sem `id`) ou atualiza (linhas com `id`) plantações ou sensores, com um commit
+    a cada `tamanho_lote` linhas. `saida`, se dado, é um csv.writer que recebe (linha, id) de cada
+    cadastro confirmado. Retorna (cadastrados, atualizados) já confirmados.
+    """
+    tabela, campos = TABELAS[entidade], CAMPOS[entidade]
+    existe = obter_plantacao if entidade == 'plantacoes' else obter_sensor
+    progresso = Progresso(f"registros de {tabela} gravados")
+    cursor = conn.cursor()
+    cadastrados = atualizados = 0
+    novos, pendentes_atualizados = [], 0
+
+    def confirmar():
+        nonlocal cadastrados, atualizados, pendentes_atualizados
+        registrar_alteracao(cursor) # um aviso aos caches de metadados por transação, não por linha
+        conn.commit()
+        if saida is not None:
+            saida.writerows(novos)
+        cadastrados += len(novos)
+        atualizados += pendentes_atualizados
+        novos.clear()
+        pendentes_atualizados = 0
+
+    try:
+        for numero, registro in registros:
+            try:
+                registro = _objeto(registro)
+                id_registro = _campo(registro, 'id', int) if registro.get('id') not in (None, '') else None
+                if id_registro is None:
+                    valores = {campo: _campo(registro, campo, tipo) for campo, tipo in campos.items()}
+                else:
+                    valores = {campo: _campo(registro, campo, tipo) for campo, tipo in campos.items() if campo in registro}
+                    if not valores:
+                        raise ValueError("nenhum campo para atualizar")
+                    if existe(conn, id_registro) is None:
+                        raise ValueError(f"id {id_registro} não encontrado em {tabela}")
+                if 'id_plantacao' in valores and obter_plantacao(conn, valores['id_plantacao']) is None:
+                    raise ValueError(f"plantação {valores['id_plantacao']} não encontrada")
+            except (ValueError, TypeError) as e:
+                progresso.invalida(numero, e)
+                continue
+
+            if id_registro is None:
+                cursor.execute(
+                    f"INSERT INTO {tabela} ({', '.join(valores)}) VALUES ({', '.join(['%s'] * len(valores))})",
+                    tuple(valores.values())
+                )
+                novos.append((numero, cursor.lastrowid))
+            else:
+                cursor.execute(
+                    f"UPDATE {tabela} SET {', '.join(f'{campo}=%s' for campo in valores)} WHERE id=%s",
+                    tuple(valores.values()) + (id_registro,)
+                )
+                pendentes_atualizados += 1
+            progresso.avancar()
+            if len(novos) + pendentes_atualizados >= tamanho_lote:
+                confirmar()
+        confirmar()
+    except mysql.connector.Error as err:
+        print(f"Erro ao gravar {entidade}: {err}")
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass # conexão perdida: o servidor já descartou a transação
+    finally:
+        cursor.close()
+    progresso.concluir(cadastrados + atualizados)
+    return cadastrados, atualizados
+
+def importar_leituras(conn, registros, tamanho_lote=TAMANHO_LOTE, usar_load_data=False):
+    """
+    Insere as leituras do arquivo por `inserir_leituras_em_lote` (INSERT multi-linha ou LOAD DATA),
+    com um commit a cada `tamanho_lote` leituras. O tipo de cada leitura vem do cadastro do sensor.
+    Retorna o número de leituras inseridas.
+    """
+    progresso = Progresso("leituras inseridas")
+    agora = datetime.datetime.now().replace(microsecond=0)
+
+    def leituras():
+        for numero, registro in registros:
+            try:
+                registro = _objeto(registro)
+                id_sensor = _campo(registro, 'id_sensor', int)
+                valor = _campo(registro, 'valor', float)
+                data_hora = registro.get('data_hora')
+                data_hora = datetime.datetime.fromisoformat(str(data_hora)) if data_hora not in (None, '') else agora
+                sensor = obter_sensor(conn, id_sensor)
+                if sensor is None:
+                    raise ValueError(f"sensor {id_sensor} não encontrado")
+            except (ValueError, TypeError) as e:
+                progresso.invalida(numero, e)
+                continue
+            progresso.avancar()
+            yield (id_sensor, sensor[0], data_hora, valor)
+
+    inseridas = inserir_leituras_em_lote(
+        leituras(), tamanho_lote=min(tamanho_lote, 1000), linhas_por_commit=tamanho_lote,
+        usar_load_data=usar_load_data, conn=None if usar_load_data else conn
+    )
+    progresso.concluir(inseridas)
+    return inseridas
+
+def _lotes_de_ids(registros, tamanho_lote, progresso):
+    lote = []
+    for numero, registro in registros:
+        try:
+            lote.append(_campo(_objeto(registro), 'id', int))
+        except (ValueError, TypeError) as e:
+            progresso.invalida(numero, e)
+            continue
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def remover(conn, entidade, registros, tamanho_lote=TAMANHO_LOTE):
+    """
+    Remove os registros cujos ids estão no arquivo, uma transação por lote de `tamanho_lote` ids.
+    Plantações e sensores são removidos primeiro e suas leituras depois do commit (por
+    `purgar_leituras`, em fatias: ver o docstring do módulo); leituras saem também do arquivo
+    colunar e têm os agregados dos seus dias, por sensor, refeitos no commit do próprio lote.
+    Retorna quantos foram removidos.
+    """
+    tabela = TABELAS[entidade]
+    progresso = Progresso(f"registros de {tabela} removidos")
+    cursor = conn.cursor()
+    try:
+        if entidade != 'leituras':
+            # Confere a versão dos metadados antes, para não deixar de fora um sensor recém-cadastrado
+            atualizar_metadados(conn, forcar=True)
+        for ids in _lotes_de_ids(registros, tamanho_lote, progresso):
+            marcadores = ', '.join(['%s'] * len(ids))
+            dias_afetados = {} # id_sensor -> dias das leituras do lote
+            sensores = [] # sensores removidos pelo lote, cujas leituras são purgadas depois do commit
+            fatias = None
+            if entidade == 'leituras':
+                cursor.execute(f"SELECT id_sensor, data_hora FROM Leitura WHERE id IN ({marcadores})", tuple(ids))
+                for id_sensor, data_hora in cursor.fetchall():
+                    data_hora = datetime.datetime.fromisoformat(str(data_hora))
+                    dias_afetados.setdefault(id_sensor, set()).add(data_hora.replace(hour=0, minute=0, second=0, microsecond=0))
+            else:
+                # Leitura é particionada e não tem chave estrangeira: suas linhas não são removidas em cascata
+                if entidade == 'plantacoes':
+                    plantacoes = set(ids)
+                    sensores = [id_sensor for id_sensor, (_, id_plantacao) in obter_sensores(conn).items() if id_plantacao in plantacoes]
+                else:
+                    sensores = ids
+                # LeituraHora sai em cascata com os sensores: as fatias da purga são lidas antes
+                fatias = fatias_purga(conn, sensores)
+            cursor.execute(f"DELETE FROM {tabela} WHERE id IN ({marcadores})", tuple(ids))
+            removidos = max(cursor.rowcount, 0)
+            if entidade != 'leituras':
+                registrar_alteracao(cursor)
+            # Mínimo/máximo não podem ser descontados: os dias afetados são refeitos na mesma transação
+            recalcular_dias(conn, dias_afetados)
+            conn.commit()
+            if entidade == 'leituras':
+                # as que já estavam no arquivo colunar
+                remover_do_arquivo(ids_leituras=ids, dias=set().union(*dias_afetados.values()))
+            progresso.avancar(removidos)
+            if sensores:
+                try:
+                    purgar_leituras(conn, sensores, fatias=fatias)
+                except mysql.connector.Error:
+                    print(f"⚠️ Leituras dos sensores removidos não purgadas; repita com `remover sensores` e os ids: {sorted(sensores)}")
+                    raise
+    except mysql.connector.Error as err:
+        print(f"Erro ao remover {entidade}: {err}")
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass
+    finally:
+        cursor.close()
+    progresso.concluir()
+    return progresso.total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.banco_dados',
+        description="Operações em massa a partir de arquivos CSV ou JSONL (sem argumentos: menu interativo)."
+    )
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    importar = comandos.add_parser('importar', help="Cadastra ou atualiza plantações e sensores, ou insere leituras")
+    importar.add_argument('entidade', choices=list(TABELAS))
+    importar.add_argument('--load-data', action='store_true', help="Leituras: usa LOAD DATA LOCAL INFILE (MySQL)")
+    importar.add_argument('--saida', help="Plantações/sensores: grava em CSV a linha do arquivo e o id de cada cadastro")
+    excluir = comandos.add_parser(
+        'remover',
+        help="Remove os registros cujos ids (coluna id) estão no arquivo; as leituras de plantações e sensores saem depois, em fatias"
+    )
+    excluir.add_argument('entidade', choices=list(TABELAS))
+    for subcomando in (importar, excluir):
+        subcomando.add_argument('arquivo', help="Arquivo CSV (com cabeçalho) ou JSONL; '-' para a entrada padrão")
+        subcomando.add_argument('--formato', choices=['csv', 'jsonl'], help="Padrão: pela extensão do arquivo")
+        subcomando.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Linhas por transação")
+    args = parser.parse_args(argv)
+
+    with conexao() as conn:
+        if not conn:
+            return
+        criar_tabelas(conn)
+        registros = ler_registros(args.arquivo, args.formato)
+        if args.comando == 'remover':
+            remover(conn, args.entidade, registros, args.lote)
+        elif args.entidade == 'leituras':
+            importar_leituras(conn, registros, args.lote, args.load_data)
+        elif args.saida:
+            with open(args.saida, 'w', newline='', encoding='utf-8') as arquivo:
+                saida = csv.writer(arquivo)
+                saida.writerow(['linha', 'id'])
+                importar_cadastros(conn, args.entidade, registros, args.lote, saida)
+        else:
+            importar_cadastros(conn, args.entidade, registros, args.lote)
+
+if __name__ == '__main__':
+    main()
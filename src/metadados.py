@@ -0,0 +1,136 @@
+"""
+Cache, por processo, dos metadados de Sensor e Plantacao (tipo e plantação de cada sensor,
+nome e limites ideais de cada plantação).
+
+As duas tabelas são pequenas e mudam pouco: são carregadas inteiras e consultadas em memória,
+sem uma ida ao banco por busca. Toda alteração nelas (cadastro, atualização, remoção) chama
+`registrar_alteracao(cursor)` na mesma transação, incrementando o contador da tabela
+MetadadosVersao. Cada processo compara esse contador com o da sua carga no máximo a cada
+INTERVALO_VERIFICACAO segundos (uma consulta de uma linha) e recarrega tudo se ele mudou;
+no próprio processo, registrar_alteracao já força a verificação na próxima busca.
+
+Como agregados.py, as funções recebem a conexão em vez de abrir uma.
+"""
+import threading
+import time
+
+import mysql.connector
+
+INTERVALO_VERIFICACAO = 5.0 # segundos entre verificações da versão no banco
+INTERVALO_SEM_VERSAO = 30.0 # banco sem MetadadosVersao (migração 6 não aplicada): recarrega por tempo
+
+_lock = threading.Lock()
+_estado = {
+    'versao': None, # contador de MetadadosVersao na última carga
+    'verificado_em': None, # time.monotonic() da última verificação
+    'carregado_em': None,
+    'geracao': 0, # incrementado a cada recarga, para quem monta índices sobre o cache
+    'sensores': {}, # id -> (tipo, id_plantacao)
+    'plantacoes': {} # id -> dict com as colunas de Plantacao
+}
+
+COLUNAS_PLANTACAO = ('id', 'nome', 'localizacao', 'umidade_ideal', 'ph_ideal_min', 'ph_ideal_max')
+
+def registrar_alteracao(cursor):
+    """Marca Sensor/Plantacao como alterados; chame na mesma transação da alteração."""
+    try:
+        cursor.execute("UPDATE MetadadosVersao SET versao = versao + 1 WHERE id = 1")
+    except mysql.connector.Error:
+        pass # banco sem a migração 6: os outros processos recarregam por tempo (INTERVALO_SEM_VERSAO)
+    _estado['verificado_em'] = None
+
+def metadados_vencidos():
+    """True se a próxima busca precisará consultar o banco (cache vazio ou verificação vencida)."""
+    verificado_em = _estado['verificado_em']
+    return verificado_em is None or time.monotonic() - verificado_em >= INTERVALO_VERIFICACAO
+
+def _ler_versao(cursor):
+    try:
+        cursor.execute("SELECT versao FROM MetadadosVersao WHERE id = 1")
+        linha = cursor.fetchone()
+        return linha[0] if linha else None
+    except mysql.connector.Error:
+        return None
+
+def atualizar_metadados(conn, forcar=False):
+    """
+    Confere a versão no banco (se a última verificação venceu ou com `forcar`) e recarrega
+    sensores e plantações se ela mudou. Retorna False se o banco não pôde ser consultado.
+    """
+    if not forcar and not metadados_vencidos():
+        return True
+    with _lock:
+        if not forcar and not metadados_vencidos():
+            return True # outra thread acabou de verificar
+        agora = time.monotonic()
+        cursor = conn.cursor()
+        try:
+            versao = _ler_versao(cursor)
+            carregado_em = _estado['carregado_em']
+            if carregado_em is not None:
+                if versao is not None and versao == _estado['versao']:
+                    _estado['verificado_em'] = agora
+                    return True
+                if versao is None and agora - carregado_em < INTERVALO_SEM_VERSAO and not forcar:
+                    _estado['verificado_em'] = agora
+                    return True
+            cursor.execute("SELECT id, tipo, id_plantacao FROM Sensor")
+            sensores = {id_sensor: (tipo.strip().lower(), id_plantacao) for id_sensor, tipo, id_plantacao in cursor.fetchall()}
+            cursor.execute(f"SELECT {', '.join(COLUNAS_PLANTACAO)} FROM Plantacao ORDER BY id")
+            plantacoes = {linha[0]: dict(zip(COLUNAS_PLANTACAO, linha)) for linha in cursor.fetchall()}
+        except mysql.connector.Error as err:
+            print(f"Erro ao carregar sensores e plantações: {err}")
+            return False
+        finally:
+            cursor.close()
+        _estado.update(
+            versao=versao, verificado_em=agora, carregado_em=agora, geracao=_estado['geracao'] + 1,
+            sensores=sensores, plantacoes=plantacoes
+        )
+        return True
+
+def geracao_metadados():
+    """Muda a cada recarga do cache: índices derivados dele (ex: src/alertas.py) se reconstroem quando ela muda."""
+    return _estado['geracao']
+
+def sensor_em_cache(id_sensor):
+    """(tipo, id_plantacao) do sensor pelo cache atual, sem consultar o banco; None se desconhecido."""
+    return _estado['sensores'].get(id_sensor)
+
+def obter_sensor(conn, id_sensor):
+    """(tipo, id_plantacao) do sensor, ou None se ele não existe."""
+    atualizar_metadados(conn)
+    sensor = _estado['sensores'].get(id_sensor)
+    if sensor is None and atualizar_metadados(conn, forcar=True):
+        sensor = _estado['sensores'].get(id_sensor) # cadastrado por outro processo desde a última verificação
+    return sensor
+
+def obter_plantacao(conn, id_plantacao):
+    """Dict com as colunas da plantação, ou None se ela não existe."""
+    atualizar_metadados(conn)
+    plantacao = _estado['plantacoes'].get(id_plantacao)
+    if plantacao is None and atualizar_metadados(conn, forcar=True):
+        plantacao = _estado['plantacoes'].get(id_plantacao)
+    return plantacao
+
+def obter_sensores(conn=None):
+    """
+    Dict id -> (tipo, id_plantacao) de todos os sensores (não altere o dict retornado).
+    Sem `conn`, devolve o cache atual sem consultar o banco.
+    """
+    if conn is not None:
+        atualizar_metadados(conn)
+    return _estado['sensores']
+
+def obter_plantacoes(conn=None):
+    """
+    Dict id -> plantação de todas as plantações, em ordem de id (não altere o dict retornado).
+    Sem `conn`, devolve o cache atual sem consultar o banco.
+    """
+    if conn is not None:
+        atualizar_metadados(conn)
+    return _estado['plantacoes']
+
+def sensores_da_plantacao(conn, id_plantacao):
+    """Ids dos sensores da plantação."""
+    return [id_sensor for id_sensor, (_, id_dono) in obter_sensores(conn).items() if id_dono == id_plantacao]
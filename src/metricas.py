@@ -0,0 +1,369 @@
+"""
+Medição de tempo das operações de banco e de previsão, por rótulo, em memória no processo.
+
+Cada conexão entregue por banco_dados.criar_conexao passa por `medir_conexao`: todo comando
+(execute/executemany mais a leitura do resultado com fetch*) e todo commit vira uma amostra
+com rótulo "VERBO Tabela" (ex: "SELECT LeituraHora", "INSERT Leitura"). Operações maiores
+são marcadas com `medir(rotulo)` ou `@medido(rotulo)`; os comandos executados dentro delas levam
+o rótulo da operação como prefixo ("dashboard.carregar_leituras › SELECT Leitura").
+
+Por rótulo são guardados chamadas, erros, linhas e um histograma de latência com baldes em
+escala logarítmica (memória fixa, erro relativo de poucos por cento nos percentis), de onde
+saem p50, p95 e p99. Os processos de longa duração exportam o resumo periodicamente em JSON
+(`iniciar_exportacao`) para DIRETORIO_METRICAS, onde os arquivos de processos que não exportam
+há VALIDADE_EXPORTACOES_DIAS são apagados; o serviço HTTP também o expõe em GET /metricas
+e o dashboard tem a página "Administracao". Para ver os arquivos exportados:
+
+    python -m src.metricas              # resumo de todos os processos exportados
+
+Com FARMTECH_METRICAS=0 as conexões não são instrumentadas.
+"""
+import argparse
+import atexit
+import datetime
+import functools
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+ATIVO = os.environ.get('FARMTECH_METRICAS', '1') != '0'
+DIRETORIO_METRICAS = os.environ.get('FARMTECH_METRICAS_DIR', os.path.join('dados', 'metricas'))
+INTERVALO_EXPORTACAO = 60.0 # segundos entre exportações dos processos de longa duração
+VALIDADE_EXPORTACOES_DIAS = float(os.environ.get('FARMTECH_METRICAS_VALIDADE_DIAS', 7)) # arquivos de processos encerrados
+PERCENTIS = (50, 95, 99)
+
+# Baldes do histograma: o balde i > 0 cobre (MENOR * BASE^(i-1), MENOR * BASE^i] segundos
+_MENOR = 1e-6
+_BASE = 2 ** 0.25
+_LOG_BASE = math.log(_BASE)
+_BALDES = 128 # até ~1 hora; acima disso cai no último balde
+
+class Histograma:
+    """Contadores e distribuição de latência de um rótulo. Não é thread-safe: use via `registrar`."""
+
+    __slots__ = ('chamadas', 'erros', 'linhas', 'soma', 'minimo', 'maximo', 'baldes')
+
+    def __init__(self):
+        self.chamadas = self.erros = self.linhas = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+        self.baldes = [0] * _BALDES
+
+    def adicionar(self, segundos, linhas=0, erro=False):
+        self.chamadas += 1
+        self.erros += erro
+        self.linhas += linhas
+        self.soma += segundos
+        self.minimo = min(self.minimo, segundos)
+        self.maximo = max(self.maximo, segundos)
+        indice = 0 if segundos <= _MENOR else min(_BALDES - 1, int(math.log(segundos / _MENOR) / _LOG_BASE) + 1)
+        self.baldes[indice] += 1
+
+    def percentil(self, p):
+        """Latência (segundos) do percentil `p`, interpolada dentro do balde e limitada a [mínimo, máximo]."""
+        if not self.chamadas:
+            return 0.0
+        alvo = self.chamadas * p / 100
+        acumulado = 0
+        for indice, quantidade in enumerate(self.baldes):
+            if quantidade and acumulado + quantidade >= alvo:
+                inferior = 0.0 if indice == 0 else _MENOR * _BASE ** (indice - 1)
+                superior = _MENOR * _BASE ** indice
+                valor = inferior + (superior - inferior) * (alvo - acumulado) / quantidade
+                return min(max(valor, self.minimo), self.maximo)
+            acumulado += quantidade
+        return self.maximo
+
+    def resumo(self):
+        """Dict com os contadores e as latências em milissegundos."""
+        resumo = {
+            'chamadas': self.chamadas, 'erros': self.erros, 'linhas': self.linhas,
+            'total_s': round(self.soma, 6),
+            'media_ms': round(self.soma / self.chamadas * 1000, 3) if self.chamadas else 0.0
+        }
+        for p in PERCENTIS:
+            resumo[f'p{p}_ms'] = round(self.percentil(p) * 1000, 3)
+        resumo['max_ms'] = round(self.maximo * 1000, 3)
+        return resumo
+
+_lock = threading.Lock()
+_operacoes = {} # rótulo -> Histograma
+_contexto = threading.local() # pilha das operações em andamento na thread
+
+def registrar(rotulo, segundos, linhas=0, erro=False):
+    """Registra uma amostra de `segundos` para o rótulo."""
+    with _lock:
+        histograma = _operacoes.get(rotulo)
+        if histograma is None:
+            histograma = _operacoes[rotulo] = Histograma()
+        histograma.adicionar(segundos, linhas, erro)
+
+def _operacao_atual():
+    pilha = getattr(_contexto, 'pilha', None)
+    return pilha[-1] if pilha else None
+
+class _Medicao:
+    __slots__ = ('linhas',)
+
+    def __init__(self):
+        self.linhas = 0
+
+@contextmanager
+def medir(rotulo):
+    """
+    Mede o bloco `with` como uma amostra do rótulo; atribua `.linhas` ao objeto retornado para
+    contar linhas. Os comandos de banco executados no bloco (na mesma thread) levam o rótulo como
+    prefixo. Não use em corrotinas que se intercalam: para elas, chame `registrar` diretamente.
+    """
+    medicao = _Medicao()
+    pilha = getattr(_contexto, 'pilha', None)
+    if pilha is None:
+        pilha = _contexto.pilha = []
+    pilha.append(rotulo)
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield medicao
+    except BaseException:
+        erro = True
+        raise
+    finally:
+        pilha.pop()
+        registrar(rotulo, time.perf_counter() - inicio, medicao.linhas, erro)
+
+def medido(rotulo, linhas=None):
+    """
+    Decorador que mede cada chamada da função com `medir(rotulo)` (por convenção "módulo.função";
+    explícito porque módulos rodados com `python -m` se chamam __main__). `linhas` converte o
+    retorno no número de linhas (ex: len ou int).
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with medir(rotulo) as medicao:
+                resultado = funcao(*args, **kwargs)
+                if linhas is not None and resultado is not None:
+                    medicao.linhas = linhas(resultado)
+                return resultado
+        return medida
+    return decorador
+
+_TABELA = re.compile(
+    r"\b(?:INTO(?:\s+TABLE)?|FROM|UPDATE|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?|JOIN)\s+`?([\w.]+)", re.IGNORECASE
+)
+
+@functools.lru_cache(maxsize=1024)
+def rotulo_sql(sql):
+    """Rótulo curto de um comando SQL: verbo e primeira tabela (ex: "SELECT Leitura")."""
+    partes = sql.split(None, 1)
+    if not partes:
+        return '?'
+    tabela = _TABELA.search(sql)
+    return f"{partes[0].upper()} {tabela.group(1)}" if tabela else partes[0].upper()
+
+def _rotulo_comando(sql):
+    operacao = _operacao_atual()
+    return rotulo_sql(sql) if operacao is None else f"{operacao} › {rotulo_sql(sql)}"
+
+class _CursorMedido:
+    """
+    Cursor que mede cada comando como uma amostra: o execute/executemany mais a leitura do
+    resultado (fetch*), registrada no próximo comando ou no close.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._rotulo = None
+        self._segundos = 0.0
+        self._linhas = 0
+
+    def _encerrar(self):
+        if self._rotulo is not None:
+            registrar(self._rotulo, self._segundos, self._linhas)
+            self._rotulo = None
+
+    def _executar(self, metodo, sql, args, kwargs):
+        self._encerrar()
+        rotulo = _rotulo_comando(sql)
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(sql, *args, **kwargs)
+        except Exception:
+            registrar(rotulo, time.perf_counter() - inicio, erro=True)
+            raise
+        self._rotulo, self._segundos = rotulo, time.perf_counter() - inicio
+        # Comandos sem resultado (INSERT/UPDATE/DELETE) contam as linhas afetadas; consultas, as lidas
+        self._linhas = max(self._cursor.rowcount or 0, 0) if self._cursor.description is None else 0
+        return self if resultado is self._cursor else resultado
+
+    def execute(self, sql, *args, **kwargs):
+        return self._executar(self._cursor.execute, sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._executar(self._cursor.executemany, sql, args, kwargs)
+
+    def _ler(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        self._segundos += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        linha = self._ler(self._cursor.fetchone)
+        self._linhas += linha is not None
+        return linha
+
+    def fetchall(self):
+        linhas = self._ler(self._cursor.fetchall)
+        self._linhas += len(linhas)
+        return linhas
+
+    def fetchmany(self, *args):
+        linhas = self._ler(self._cursor.fetchmany, *args)
+        self._linhas += len(linhas)
+        return linhas
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._encerrar()
+        return self._cursor.close()
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome) # description, rowcount, lastrowid...
+
+class _ConexaoMedida:
+    """Conexão (mysql.connector ou embarcada) cujos cursores e commits são medidos."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _CursorMedido(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        rotulo = _rotulo_comando('COMMIT')
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return self._conn.commit()
+        except Exception:
+            erro = True
+            raise
+        finally:
+            registrar(rotulo, time.perf_counter() - inicio, erro=erro)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome) # rollback, close, dialeto, get_server_info...
+
+def medir_conexao(conn):
+    """Envolve a conexão para medir seus comandos (a própria conexão se desativado ou None)."""
+    if not ATIVO or conn is None:
+        return conn
+    return _ConexaoMedida(conn)
+
+def resumo():
+    """Lista de dicts (rótulo, contadores e latências em ms), do maior tempo total para o menor."""
+    with _lock:
+        linhas = [{'rotulo': rotulo, **histograma.resumo()} for rotulo, histograma in _operacoes.items()]
+    return sorted(linhas, key=lambda linha: linha['total_s'], reverse=True)
+
+def zerar():
+    """Descarta as medições do processo."""
+    with _lock:
+        _operacoes.clear()
+
+def exportar(nome, diretorio=DIRETORIO_METRICAS):
+    """Grava o resumo do processo em `diretorio`/`nome`-`pid`.json (substituição atômica). Retorna o caminho."""
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f"{nome}-{os.getpid()}.json")
+    dados = {
+        'processo': nome, 'pid': os.getpid(),
+        'gerado_em': datetime.datetime.now().isoformat(timespec='seconds'),
+        'operacoes': resumo()
+    }
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    os.replace(caminho + '.tmp', caminho)
+    return caminho
+
+def podar_exportacoes(validade_dias=VALIDADE_EXPORTACOES_DIAS, diretorio=DIRETORIO_METRICAS):
+    """
+    Apaga os arquivos exportados (e temporários) não regravados há `validade_dias` dias: os de
+    processos encerrados, já que cada pid grava o seu. Retorna quantos apagou.
+    """
+    limite = time.time() - validade_dias * 86400
+    apagados = 0
+    for caminho in glob.glob(os.path.join(diretorio, '*.json')) + glob.glob(os.path.join(diretorio, '*.json.tmp')):
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                apagados += 1
+        except OSError:
+            pass # apagado por outro processo
+    return apagados
+
+_exportacao = {'nome': None}
+
+def iniciar_exportacao(nome, intervalo=INTERVALO_EXPORTACAO, diretorio=DIRETORIO_METRICAS):
+    """
+    Exporta o resumo a cada `intervalo` segundos (thread daemon) e ao encerrar o processo,
+    depois de podar as exportações antigas. Chamadas repetidas no mesmo processo são ignoradas.
+    """
+    with _lock:
+        if _exportacao['nome'] is not None:
+            return
+        _exportacao['nome'] = nome
+    podar_exportacoes(diretorio=diretorio)
+
+    def exportar_sem_falhar():
+        try:
+            exportar(nome, diretorio)
+        except OSError as err:
+            print(f"Erro ao exportar métricas: {err}")
+
+    def laco():
+        while True:
+            time.sleep(intervalo)
+            exportar_sem_falhar()
+
+    threading.Thread(target=laco, name='metricas', daemon=True).start()
+    atexit.register(exportar_sem_falhar)
+
+def ler_exportacoes(diretorio=DIRETORIO_METRICAS):
+    """Resumos exportados pelos processos (dicts de `exportar`), do mais recente para o mais antigo."""
+    exportacoes = []
+    for caminho in glob.glob(os.path.join(diretorio, '*.json')):
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                exportacoes.append(json.load(arquivo))
+        except (OSError, ValueError):
+            pass # arquivo sendo substituído
+    return sorted(exportacoes, key=lambda dados: dados.get('gerado_em', ''), reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo das métricas exportadas pelos processos.")
+    parser.add_argument('--diretorio', default=DIRETORIO_METRICAS)
+    parser.add_argument('--limite', type=int, default=15, help="Operações mostradas por processo")
+    args = parser.parse_args()
+
+    exportacoes = ler_exportacoes(args.diretorio)
+    if not exportacoes:
+        print(f"Nenhuma métrica exportada em {args.diretorio}.")
+        return
+    for dados in exportacoes:
+        print(f"\n📊 {dados['processo']} (pid {dados['pid']}, {dados['gerado_em']})")
+        print(f"{'operação':<60} {'chamadas':>9} {'linhas':>10} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for linha in dados['operacoes'][:args.limite]:
+            print(f"{linha['rotulo'][:60]:<60} {linha['chamadas']:>9} {linha['linhas']:>10} {linha['total_s']:>9.2f} "
+                  f"{linha['p50_ms']:>9.2f} {linha['p95_ms']:>9.2f} {linha['p99_ms']:>9.2f}")
+
+if __name__ == '__main__':
+    main()
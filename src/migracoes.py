@@ -0,0 +1,256 @@
+"""
+Migrações versionadas do esquema do banco FarmTech.
+
+A versão 1 é o esquema criado por `banco_dados.criar_tabelas`. Cada migração seguinte é
+aplicada uma única vez, em ordem, e registrada na tabela `SchemaVersao`.
+"""
+import datetime
+import mysql.connector
+from src.agregados import TABELAS as TABELAS_AGREGADOS, ddl_agregado, recalcular_agregados
+from src.particoes import MESES_FUTUROS, definicao_particoes
+
+TAMANHO_LOTE_COPIA = 50000 # linhas copiadas por transação ao reconstruir tabelas grandes
+
+def _criar_tabela_versao(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS `SchemaVersao` ("
+        "  `versao` INT PRIMARY KEY,"
+        "  `descricao` VARCHAR(255) NOT NULL,"
+        "  `aplicada_em` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP"
+        ") ENGINE=InnoDB"
+    )
+    cursor.execute("INSERT IGNORE INTO SchemaVersao (versao, descricao) VALUES (1, 'Esquema inicial')")
+
+def versao_atual(conn):
+    """Retorna a maior versão de esquema já aplicada."""
+    cursor = conn.cursor()
+    try:
+        _criar_tabela_versao(cursor)
+        conn.commit()
+        cursor.execute("SELECT MAX(versao) FROM SchemaVersao")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def _tabela_existe(cursor, nome):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (nome,)
+    )
+    return cursor.fetchone()[0] > 0
+
+def _copiar_em_lotes(conn, cursor, sql_copia, de_id, ate_id):
+    """
+    Executa `sql_copia` (INSERT ... SELECT com `Leitura.id > %s AND Leitura.id <= %s`)
+    em faixas de id, confirmando cada lote. Sem aliases nas tabelas: a última cópia
+    roda sob LOCK TABLES, que exige os nomes bloqueados.
+    """
+    while de_id < ate_id:
+        limite = min(de_id + TAMANHO_LOTE_COPIA, ate_id)
+        cursor.execute(sql_copia, (de_id, limite))
+        conn.commit()
+        de_id = limite
+    return de_id
+
+def _descartar_removidas(conn, cursor, ate_id):
+    """
+    Tira de Leitura_nova as linhas já copiadas que saíram de Leitura durante a cópia (remoções da
+    aplicação ou em cascata, que não passariam por triggers). A contagem de cada faixa de id nas
+    duas tabelas é só uma leitura do índice primário; a anti-junção roda apenas nas faixas que divergem.
+    """
+    de_id = 0
+    while de_id < ate_id:
+        limite = min(de_id + TAMANHO_LOTE_COPIA, ate_id)
+        cursor.execute("SELECT COUNT(*) FROM Leitura WHERE Leitura.id > %s AND Leitura.id <= %s", (de_id, limite))
+        na_origem = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM Leitura_nova WHERE Leitura_nova.id > %s AND Leitura_nova.id <= %s", (de_id, limite))
+        if cursor.fetchone()[0] != na_origem:
+            cursor.execute(
+                "DELETE Leitura_nova FROM Leitura_nova LEFT JOIN Leitura ON Leitura.id = Leitura_nova.id"
+                " WHERE Leitura_nova.id > %s AND Leitura_nova.id <= %s AND Leitura.id IS NULL",
+                (de_id, limite)
+            )
+        conn.commit()
+        de_id = limite
+
+def _reconstruir_leitura(conn, cursor, ddl_nova, sql_copia, nome_backup, travas_extras="", antes_do_delta=None):
+    """
+    Reconstrói Leitura com o DDL de `Leitura_nova` sem travar as gravações durante a cópia:
+    as linhas são copiadas em lotes, só a diferença final é copiada com a tabela bloqueada
+    e as tabelas trocam de nome atomicamente. Linhas removidas de Leitura depois de copiadas
+    são descartadas da cópia (uma vez antes do bloqueio e de novo com ele, antes da troca).
+    A tabela antiga fica como `nome_backup`.
+    """
+    cursor.execute("DROP TABLE IF EXISTS Leitura_nova") # sobra de uma execução interrompida
+    cursor.execute(ddl_nova)
+
+    # Cópia em lotes enquanto a aplicação continua gravando em Leitura
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM Leitura")
+    copiado = _copiar_em_lotes(conn, cursor, sql_copia, 0, cursor.fetchone()[0])
+    _descartar_removidas(conn, cursor, copiado) # sem bloqueio: o passe sob a trava só acha o que mudou depois
+
+    # Diferença final com a tabela bloqueada, seguida da troca atômica de nomes
+    cursor.execute(f"LOCK TABLES Leitura WRITE, Leitura_nova WRITE{travas_extras}")
+    try:
+        if antes_do_delta:
+            antes_do_delta(cursor, copiado)
+        _descartar_removidas(conn, cursor, copiado)
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM Leitura")
+        _copiar_em_lotes(conn, cursor, sql_copia, copiado, cursor.fetchone()[0])
+        cursor.execute(f"RENAME TABLE Leitura TO {nome_backup}, Leitura_nova TO Leitura")
+    finally:
+        cursor.execute("UNLOCK TABLES")
+    print(f" (tabela anterior mantida como {nome_backup}; remova-a após conferir)", end='')
+
+def _migracao_2_leitura_serie_temporal(conn, cursor):
+    """
+    Leitura com id BIGINT, tipo do sensor como código de 1 byte (tabela TipoSensor)
+    e índices compostos para consultas por sensor e por período.
+    """
+    if _tabela_existe(cursor, 'Leitura_v1'):
+        return # troca já feita por uma execução interrompida antes do registro da versão
+
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS `TipoSensor` ("
+        "  `id` TINYINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,"
+        "  `nome` VARCHAR(50) NOT NULL,"
+        "  UNIQUE KEY `uk_tipo_sensor_nome` (`nome`)"
+        ") ENGINE=InnoDB"
+    )
+    cursor.execute("INSERT IGNORE INTO TipoSensor (nome) SELECT DISTINCT LOWER(TRIM(tipo)) FROM Sensor")
+    cursor.execute("INSERT IGNORE INTO TipoSensor (nome) SELECT DISTINCT LOWER(TRIM(tipo_sensor)) FROM Leitura")
+    conn.commit()
+
+    def cadastrar_tipos_do_delta(cursor, copiado):
+        cursor.execute(
+            "INSERT IGNORE INTO TipoSensor (nome) SELECT DISTINCT LOWER(TRIM(tipo_sensor)) FROM Leitura WHERE id > %s",
+            (copiado,)
+        )
+
+    _reconstruir_leitura(
+        conn, cursor,
+        "CREATE TABLE `Leitura_nova` ("
+        "  `id` BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,"
+        "  `id_sensor` INT NOT NULL,"
+        "  `id_tipo` TINYINT UNSIGNED NOT NULL,"
+        "  `data_hora` DATETIME NOT NULL,"
+        "  `valor` FLOAT NOT NULL,"
+        "  KEY `idx_leitura_sensor_data` (`id_sensor`, `data_hora`),"
+        "  KEY `idx_leitura_data` (`data_hora`, `id`),"
+        "  CONSTRAINT `fk_leitura_sensor` FOREIGN KEY (`id_sensor`) REFERENCES `Sensor`(`id`) ON DELETE CASCADE,"
+        "  CONSTRAINT `fk_leitura_tipo` FOREIGN KEY (`id_tipo`) REFERENCES `TipoSensor`(`id`)"
+        ") ENGINE=InnoDB",
+        """
+            INSERT INTO Leitura_nova (id, id_sensor, id_tipo, data_hora, valor)
+            SELECT Leitura.id, Leitura.id_sensor, TipoSensor.id, Leitura.data_hora, Leitura.valor
+            FROM Leitura
+            JOIN TipoSensor ON TipoSensor.nome = LOWER(TRIM(Leitura.tipo_sensor))
+            WHERE Leitura.id > %s AND Leitura.id <= %s
+        """,
+        'Leitura_v1',
+        travas_extras=", TipoSensor WRITE, Sensor READ",
+        antes_do_delta=cadastrar_tipos_do_delta
+    )
+
+def _migracao_3_leitura_particionada(conn, cursor):
+    """
+    Leitura particionada por mês (RANGE COLUMNS em data_hora), para que a retenção remova
+    meses inteiros em O(1) e consultas com filtro de período leiam só as partições do período.
+
+    O MySQL não aceita chaves estrangeiras em tabelas particionadas e exige data_hora em toda
+    chave única: a chave primária passa a ser (id, data_hora) e a remoção das leituras de
+    sensores/plantações excluídos passa a ser feita pela aplicação (banco_dados.py).
+    """
+    if _tabela_existe(cursor, 'Leitura_v2'):
+        return # troca já feita por uma execução interrompida antes do registro da versão
+
+    cursor.execute("SELECT MIN(data_hora) FROM Leitura")
+    mais_antiga = cursor.fetchone()[0] or datetime.datetime.now()
+
+    _reconstruir_leitura(
+        conn, cursor,
+        "CREATE TABLE `Leitura_nova` ("
+        "  `id` BIGINT UNSIGNED AUTO_INCREMENT,"
+        "  `id_sensor` INT NOT NULL,"
+        "  `id_tipo` TINYINT UNSIGNED NOT NULL,"
+        "  `data_hora` DATETIME NOT NULL,"
+        "  `valor` FLOAT NOT NULL,"
+        "  PRIMARY KEY (`id`, `data_hora`),"
+        "  KEY `idx_leitura_sensor_data` (`id_sensor`, `data_hora`),"
+        "  KEY `idx_leitura_data` (`data_hora`, `id`)"
+        ") ENGINE=InnoDB "
+        + definicao_particoes(mais_antiga.date(), MESES_FUTUROS),
+        """
+            INSERT INTO Leitura_nova (id, id_sensor, id_tipo, data_hora, valor)
+            SELECT id, id_sensor, id_tipo, data_hora, valor
+            FROM Leitura
+            WHERE Leitura.id > %s AND Leitura.id <= %s
+        """,
+        'Leitura_v2'
+    )
+
+def _migracao_4_agregados(conn, cursor):
+    """Tabelas de agregados por hora e por dia, preenchidas a partir das leituras existentes."""
+    for tabela in TABELAS_AGREGADOS:
+        cursor.execute(ddl_agregado(tabela))
+    recalcular_agregados(conn)
+
+def _migracao_5_alertas(conn, cursor):
+    """Alertas de leituras fora dos limites ideais da plantação (gravados por src/alertas.py)."""
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS `Alerta` ("
+        "  `id` BIGINT AUTO_INCREMENT PRIMARY KEY,"
+        "  `id_sensor` INT NOT NULL,"
+        "  `id_plantacao` INT NOT NULL,"
+        "  `situacao` VARCHAR(10) NOT NULL," # 'baixo', 'alto' ou 'ok' (volta ao normal)
+        "  `valor` FLOAT NOT NULL,"
+        "  `limite` FLOAT NOT NULL,"
+        "  `data_hora` DATETIME NOT NULL,"
+        "  KEY `idx_alerta_data` (`data_hora`),"
+        "  CONSTRAINT `fk_alerta_sensor` FOREIGN KEY (`id_sensor`) REFERENCES `Sensor`(`id`) ON DELETE CASCADE"
+        ") ENGINE=InnoDB"
+    )
+
+def _migracao_6_versao_metadados(conn, cursor):
+    """Contador incrementado a cada alteração em Sensor/Plantacao, usado pelo cache de src/metadados.py."""
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS `MetadadosVersao` ("
+        "  `id` TINYINT PRIMARY KEY,"
+        "  `versao` BIGINT UNSIGNED NOT NULL"
+        ") ENGINE=InnoDB"
+    )
+    cursor.execute("INSERT IGNORE INTO MetadadosVersao (id, versao) VALUES (1, 0)")
+
+def _migracao_7_agregados_por_inicio(conn, cursor):
+    """Índice por `inicio` nos agregados: as consultas por período de todos os sensores (visão geral) não varrem a tabela."""
+    for tabela in TABELAS_AGREGADOS:
+        cursor.execute(f"ALTER TABLE `{tabela}` ADD KEY `idx_{tabela.lower()}_inicio` (`inicio`), ALGORITHM=INPLACE, LOCK=NONE")
+
+# (versão, descrição, função) — nunca altere uma migração já publicada; crie uma nova.
+MIGRACOES = [
+    (2, "Leitura: BIGINT, código de tipo e índices compostos", _migracao_2_leitura_serie_temporal),
+    (3, "Leitura particionada por mês", _migracao_3_leitura_particionada),
+    (4, "Agregados por hora e por dia", _migracao_4_agregados),
+    (5, "Alertas de limites das plantações", _migracao_5_alertas),
+    (6, "Versão dos metadados de sensores e plantações", _migracao_6_versao_metadados),
+    (7, "Índice por início nos agregados", _migracao_7_agregados_por_inicio),
+]
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações ainda não registradas em SchemaVersao."""
+    atual = versao_atual(conn)
+    cursor = conn.cursor()
+    try:
+        for versao, descricao, migrar in MIGRACOES:
+            if versao <= atual:
+                continue
+            print(f"Aplicando migração {versao}: {descricao}...", end='')
+            migrar(conn, cursor)
+            cursor.execute("INSERT INTO SchemaVersao (versao, descricao) VALUES (%s, %s)", (versao, descricao))
+            conn.commit()
+            print(" OK")
+    except mysql.connector.Error as err:
+        print(f"\nErro ao aplicar migração: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
@@ -0,0 +1,90 @@
+"""
+Registro em disco dos modelos de previsão ajustados (um JSON por modelo em dados/modelos),
+reaproveitados entre sessões, processos e reinícios do dashboard.
+
+Cada modelo tem uma chave (plantação, tipo de sensor, período fixo) e guarda a marca d'água dos
+dados em que foi ajustado: fonte, número de leituras, última leitura e soma dos valores, lidos
+dos agregados diários antes de carregar as leituras (consultas.resumo_agregados_por_tipo). Se a
+marca dos dados atuais é a mesma, o modelo gravado é usado como está; se entraram ou saíram
+leituras, ele é reajustado e regravado. Apagar o diretório só faz os modelos serem reajustados;
+modelos sem uso há VALIDADE_DIAS são apagados por `podar_modelos`.
+
+O módulo de previsão (src/previsao.py) só é importado quando um modelo é lido ou ajustado.
+"""
+import hashlib
+import json
+import os
+import time
+
+from src.metricas import medido
+
+DIRETORIO_MODELOS = os.environ.get('FARMTECH_MODELOS_DIR', os.path.join('dados', 'modelos'))
+VERSAO = 2 # mudar quando o estado gravado mudar: os modelos antigos passam a ser reajustados
+VALIDADE_DIAS = int(os.environ.get('FARMTECH_MODELOS_VALIDADE_DIAS', 30)) # modelos não regravados há mais tempo são podados
+
+def _caminho(chave, diretorio):
+    # A chave tem datas e nomes de tipo: o nome do arquivo é um hash dela (a chave vai no conteúdo)
+    return os.path.join(diretorio, hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:20] + '.json')
+
+def marca_dagua(fonte, quantidade, ultima_data, soma):
+    """Marca d'água de um conjunto de leituras (quantidade, última data e soma dos valores) lido da `fonte`."""
+    return f"{fonte}:{quantidade}:{ultima_data}:{soma:.6f}"
+
+def ler_modelo(chave, marca, diretorio=DIRETORIO_MODELOS):
+    """Modelo gravado para a chave, se ajustado nos dados com esta marca d'água; senão None."""
+    try:
+        with open(_caminho(chave, diretorio), encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if dados.get('versao') != VERSAO or dados.get('chave') != repr(chave) or dados.get('marca') != marca:
+        return None
+    from src.previsao import RegressaoIncremental
+    return RegressaoIncremental.de_estado(dados['estado'])
+
+def gravar_modelo(chave, marca, modelo, diretorio=DIRETORIO_MODELOS):
+    """Grava o modelo de forma atômica (arquivo temporário + rename). Falhas de disco só são avisadas."""
+    caminho = _caminho(chave, diretorio)
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO, 'chave': repr(chave), 'marca': marca, 'estado': modelo.estado()}, arquivo)
+        os.replace(caminho + '.tmp', caminho)
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o modelo em {caminho}: {e}")
+
+@medido('modelos.obter_modelo')
+def obter_modelo(chave, marca, ajustar, diretorio=DIRETORIO_MODELOS):
+    """Modelo gravado para a chave e a marca d'água ou, se não houver, `ajustar()`, que é então gravado."""
+    modelo = ler_modelo(chave, marca, diretorio)
+    if modelo is None:
+        modelo = ajustar()
+        gravar_modelo(chave, marca, modelo, diretorio)
+    return modelo
+
+def apagar_modelo(chave, diretorio=DIRETORIO_MODELOS):
+    """Apaga o modelo gravado para a chave, se houver (ex: intervalo de datas que saiu de uso)."""
+    try:
+        os.remove(_caminho(chave, diretorio))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ Não foi possível apagar o modelo em {_caminho(chave, diretorio)}: {e}")
+
+def podar_modelos(validade_dias=VALIDADE_DIAS, diretorio=DIRETORIO_MODELOS):
+    """Apaga os modelos (e temporários) não gravados nos últimos `validade_dias` dias. Retorna quantos apagou."""
+    limite = time.time() - validade_dias * 86400
+    apagados = 0
+    try:
+        nomes = os.listdir(diretorio)
+    except OSError:
+        return 0
+    for nome in nomes:
+        caminho = os.path.join(diretorio, nome)
+        try:
+            if nome.endswith(('.json', '.tmp')) and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                apagados += 1
+        except OSError:
+            continue # removido por outro processo
+    return apagados
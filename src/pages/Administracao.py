@@ -0,0 +1,58 @@
+"""
+Página de administração do dashboard: tempos das consultas e da previsão medidos por
+src/metricas.py, deste processo (ao vivo) e dos demais processos que exportam métricas
+(serviços de ingestão, carga de dados) em DIRETORIO_METRICAS.
+"""
+import datetime
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.metricas import DIRETORIO_METRICAS, ler_exportacoes, resumo, zerar
+
+COLUNAS = {
+    'rotulo': 'Operação', 'chamadas': 'Chamadas', 'erros': 'Erros', 'linhas': 'Linhas', 'total_s': 'Total (s)',
+    'media_ms': 'Média (ms)', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'p99_ms': 'p99 (ms)', 'max_ms': 'Máx (ms)'
+}
+ORDENACOES = {"Tempo total": 'total_s', "p95": 'p95_ms', "p99": 'p99_ms', "Chamadas": 'chamadas'}
+
+st.set_page_config(page_title="FarmTech - Administração", page_icon="⚙️", layout="wide")
+
+st.title("⚙️ Administração - Desempenho das Operações")
+st.markdown(
+    "Latência por operação: comandos SQL (`VERBO Tabela`, com a operação que os executou como prefixo), "
+    "commits, carga das telas e passos de previsão. Percentis estimados por histograma logarítmico."
+)
+
+ordenacao = ORDENACOES[st.sidebar.selectbox("Ordenar por", list(ORDENACOES))]
+
+def exibir(operacoes):
+    if not operacoes:
+        st.info("Nenhuma operação medida ainda.")
+        return
+    df = pd.DataFrame(operacoes).sort_values(ordenacao, ascending=False)
+    st.dataframe(df[list(COLUNAS)].rename(columns=COLUNAS), use_container_width=True, hide_index=True)
+
+st.subheader("📈 Este processo (dashboard)")
+if st.button("Zerar métricas do dashboard"):
+    zerar()
+operacoes = resumo()
+if operacoes:
+    mais_lenta = max(operacoes, key=lambda linha: linha['p95_ms'])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Operações medidas", len(operacoes))
+    col2.metric("Chamadas", sum(linha['chamadas'] for linha in operacoes))
+    col3.metric("Maior p95", f"{mais_lenta['p95_ms']:.1f} ms", mais_lenta['rotulo'], delta_color="off")
+exibir(operacoes)
+
+st.subheader("🗂️ Outros processos")
+exportacoes = [dados for dados in ler_exportacoes() if dados.get('pid') != os.getpid()]
+if not exportacoes:
+    st.info(f"Nenhuma métrica exportada em `{DIRETORIO_METRICAS}`. Os serviços de ingestão e o populate_db exportam ao rodar.")
+for dados in exportacoes:
+    idade = datetime.datetime.now() - datetime.datetime.fromisoformat(dados['gerado_em'])
+    with st.expander(f"{dados['processo']} (pid {dados['pid']}), exportado há {int(idade.total_seconds())}s"):
+        exibir(dados['operacoes'])
@@ -0,0 +1,141 @@
+"""
+Partições mensais da tabela Leitura e política de retenção.
+
+Cada mês fica numa partição `pAAAAMM`; a última, `pmax`, recebe datas além das partições
+criadas e deve permanecer vazia. Rode periodicamente (ex: cron diário) para criar as
+partições dos próximos meses e descartar ou arquivar os meses fora da retenção:
+
+    python -m src.particoes                     # cria partições futuras e aplica a retenção
+    python -m src.particoes --arquivar          # move os meses antigos para tabelas de arquivo
+"""
+import argparse
+import datetime
+import os
+
+import mysql.connector
+
+from src.armazenamento import dialeto
+
+MESES_FUTUROS = 3 # partições criadas com antecedência
+RETENCAO_MESES = int(os.environ.get('FARMTECH_RETENCAO_MESES', 24))
+
+def _primeiro_dia(data):
+    return datetime.date(data.year, data.month, 1)
+
+def _somar_meses(mes, n):
+    total = mes.year * 12 + mes.month - 1 + n
+    return datetime.date(total // 12, total % 12 + 1, 1)
+
+def nome_particao(mes):
+    return f"p{mes:%Y%m}"
+
+def _particao_mensal(mes):
+    return f"PARTITION {nome_particao(mes)} VALUES LESS THAN ('{_somar_meses(mes, 1):%Y-%m-%d}')"
+
+def definicao_particoes(inicio, meses_futuros=MESES_FUTUROS):
+    """Cláusula PARTITION BY com um mês por partição, de `inicio` até `meses_futuros` após o mês atual."""
+    mes = _primeiro_dia(inicio)
+    ultimo = _somar_meses(_primeiro_dia(datetime.date.today()), meses_futuros)
+    particoes = []
+    while mes <= ultimo:
+        particoes.append(_particao_mensal(mes))
+        mes = _somar_meses(mes, 1)
+    particoes.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return "PARTITION BY RANGE COLUMNS(`data_hora`) (\n  " + ",\n  ".join(particoes) + "\n)"
+
+def listar_particoes(conn):
+    """Retorna os meses (date do dia 1) das partições mensais de Leitura, em ordem."""
+    if dialeto(conn) != 'mysql':
+        return [] # backends embarcados não particionam Leitura
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Leitura' AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """)
+        nomes = [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return [datetime.date(int(n[1:5]), int(n[5:7]), 1) for n in nomes if n != 'pmax']
+
+def garantir_particoes_futuras(conn, meses_futuros=MESES_FUTUROS):
+    """Divide `pmax` para criar as partições que faltam até `meses_futuros` após o mês atual."""
+    meses = listar_particoes(conn)
+    if not meses:
+        return 0 # tabela ainda não particionada (migração 3 não aplicada)
+
+    alvo = _somar_meses(_primeiro_dia(datetime.date.today()), meses_futuros)
+    novos = []
+    mes = _somar_meses(meses[-1], 1)
+    while mes <= alvo:
+        novos.append(_particao_mensal(mes))
+        mes = _somar_meses(mes, 1)
+    if not novos:
+        return 0
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "ALTER TABLE Leitura REORGANIZE PARTITION pmax INTO ("
+            + ", ".join(novos) + ", PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        )
+    finally:
+        cursor.close()
+    print(f"📅 {len(novos)} partição(ões) futura(s) criada(s) em Leitura.")
+    return len(novos)
+
+def aplicar_retencao(conn, meses_retencao=RETENCAO_MESES, arquivar=False):
+    """
+    Descarta as partições mais antigas que `meses_retencao` meses (o mês atual conta como um).
+    DROP PARTITION é uma operação de metadados, sem apagar linha por linha. Com `arquivar`,
+    cada mês é antes trocado (EXCHANGE PARTITION, também O(1)) para a tabela Leitura_arquivo_pAAAAMM.
+    """
+    corte = _somar_meses(_primeiro_dia(datetime.date.today()), -(meses_retencao - 1))
+    meses = listar_particoes(conn)
+    # Mantém ao menos uma partição mensal, mesmo que todas estejam fora da retenção
+    antigos = [mes for mes in meses[:-1] if mes < corte]
+
+    cursor = conn.cursor()
+    try:
+        for mes in antigos:
+            particao = nome_particao(mes)
+            if arquivar:
+                arquivo = f"Leitura_arquivo_{particao}"
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                    (arquivo,)
+                )
+                if cursor.fetchone()[0]:
+                    print(f"⚠️ {arquivo} já existe; partição {particao} mantida.")
+                    continue
+                cursor.execute(f"CREATE TABLE {arquivo} LIKE Leitura")
+                cursor.execute(f"ALTER TABLE {arquivo} REMOVE PARTITIONING")
+                cursor.execute(f"ALTER TABLE Leitura EXCHANGE PARTITION {particao} WITH TABLE {arquivo}")
+                print(f"📦 Partição {particao} arquivada em {arquivo}.")
+            cursor.execute(f"ALTER TABLE Leitura DROP PARTITION {particao}")
+            print(f"🗑️ Partição {particao} removida de Leitura.")
+    finally:
+        cursor.close()
+    return len(antigos)
+
+def main():
+    from src.banco_dados import conexao # import local: banco_dados depende deste módulo via migracoes
+
+    parser = argparse.ArgumentParser(description="Manutenção das partições mensais de Leitura.")
+    parser.add_argument('--retencao-meses', type=int, default=RETENCAO_MESES)
+    parser.add_argument('--meses-futuros', type=int, default=MESES_FUTUROS)
+    parser.add_argument('--arquivar', action='store_true', help="Arquiva os meses antigos em vez de descartá-los")
+    args = parser.parse_args()
+
+    with conexao() as conn:
+        if not conn:
+            return
+        try:
+            garantir_particoes_futuras(conn, args.meses_futuros)
+            aplicar_retencao(conn, args.retencao_meses, args.arquivar)
+        except mysql.connector.Error as err:
+            print(f"Erro na manutenção das partições: {err}")
+
+if __name__ == '__main__':
+    main()
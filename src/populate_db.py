@@ -1,47 +1,93 @@
-import mysql.connector
-from mysql.connector import errorcode
+import argparse
 import datetime
-from src.dataset_mock import plantacoes_mock, sensores_mock_template, gerar_leituras_mock
-from src.banco_dados import DB_CONFIG # Importa a configuração do DB do banco_dados.py
+import time
+
+import mysql.connector
+from src.dataset_mock import (
+    plantacoes_mock, sensores_mock_template, gerar_leituras_mock,
+    PREFIXO_SINTETICO, TIPOS_SINTETICOS, gerar_plantacoes_sinteticas, gerar_blocos_sinteticos, linhas_do_bloco
+)
+from src.armazenamento import dialeto
+from src.arquivamento import apagar_arquivo
+from src.banco_dados import TAMANHO_LOTE_PURGA, criar_conexao, inserir_leituras_em_lote, purgar_leituras # Conexões vêm do pool compartilhado em banco_dados.py
+from src.metadados import registrar_alteracao
+from src.metricas import iniciar_exportacao, medido
 
-def criar_conexao():
-    """Cria e retorna uma conexão com o banco de dados MySQL."""
+@medido('populate_db.limpar_plantacoes')
+def limpar_plantacoes(conn, nomes=None, prefixo=None, tamanho_lote=TAMANHO_LOTE_PURGA):
+    """
+    Remove as plantações com os `nomes` dados (ou cujo nome começa com `prefixo`) e seus dados.
+    As leituras saem antes, em fatias pequenas (banco_dados.purgar_leituras); o DELETE da
+    plantação só leva em cascata sensores e agregados, que são poucas linhas.
+    Retorna o número de leituras removidas.
+    """
+    cursor = conn.cursor()
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        print("Conexão com o banco de dados estabelecida para população.")
-        return conn
-    except mysql.connector.Error as err:
-        if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-            print("Erro de acesso: verifique usuário e senha.")
-        elif err.errno == errorcode.ER_BAD_DB_ERROR:
-            print("O banco de dados não existe.")
+        if nomes:
+            cursor.execute(
+                f"SELECT id, nome FROM Plantacao WHERE nome IN ({', '.join(['%s'] * len(nomes))})", tuple(nomes)
+            )
         else:
-            print(f"Erro ao conectar ao banco de dados para população: {err}")
-        return None
+            cursor.execute("SELECT id, nome FROM Plantacao WHERE nome LIKE %s", (f"{prefixo}%",))
+        plantacoes = cursor.fetchall()
+        if not plantacoes:
+            return 0
+
+        ids_plantacoes = tuple(id_plantacao for id_plantacao, _ in plantacoes)
+        marcadores = ', '.join(['%s'] * len(ids_plantacoes))
+        cursor.execute(f"SELECT id FROM Sensor WHERE id_plantacao IN ({marcadores})", ids_plantacoes)
+        ids_sensores = [linha[0] for linha in cursor.fetchall()]
+        print(f"ℹ️ Removendo {len(plantacoes)} plantação(ões) e os dados de {len(ids_sensores)} sensor(es)...")
+
+        t0 = time.perf_counter()
+        removidas = purgar_leituras(conn, ids_sensores, tamanho_lote=tamanho_lote)
+        cursor.execute(f"DELETE FROM Plantacao WHERE id IN ({marcadores})", ids_plantacoes)
+        registrar_alteracao(cursor)
+        conn.commit()
+        print(f"Dados antigos removidos: {len(plantacoes)} plantação(ões), {removidas} leituras em {time.perf_counter() - t0:.1f}s.")
+        return removidas
+    except mysql.connector.Error as err:
+        print(f"Erro ao limpar plantações: {err}")
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
 
 def limpar_dados_mockados(conn):
     """
     Remove plantações e dados associados que correspondem aos nomes mockados,
     garantindo um estado limpo para a repopulação.
     """
+    limpar_plantacoes(conn, nomes=[plantacao["nome"] for plantacao in plantacoes_mock])
+
+@medido('populate_db.resetar_dados')
+def resetar_dados(conn):
+    """
+    Apaga todas as plantações, sensores, leituras e alertas. No MySQL, Leitura e os agregados são
+    esvaziados com TRUNCATE (recria a tabela e suas partições, sem apagar linha por linha).
+    O arquivo colunar (src/arquivamento.py) também é apagado.
+    """
     cursor = conn.cursor()
     try:
-        for plantacao in plantacoes_mock:
-            nome_plantacao = plantacao["nome"]
-            cursor.execute("SELECT id FROM Plantacao WHERE nome = %s", (nome_plantacao,))
-            plantacao_existente = cursor.fetchone()
-            if plantacao_existente:
-                plantacao_id = plantacao_existente[0]
-                print(f"ℹ️ Removendo dados antigos para a plantação '{nome_plantacao}' (ID: {plantacao_id})...")
-                cursor.execute("DELETE FROM Plantacao WHERE id = %s", (plantacao_id,))
-                conn.commit()
-                print(f"Dados antigos de '{nome_plantacao}' removidos.")
+        for tabela in ('Leitura', 'LeituraHora', 'LeituraDia'):
+            if dialeto(conn) == 'mysql':
+                cursor.execute(f"TRUNCATE TABLE {tabela}")
+            else:
+                cursor.execute(f"DELETE FROM {tabela}")
+        cursor.execute("DELETE FROM Alerta")
+        cursor.execute("DELETE FROM Sensor")
+        cursor.execute("DELETE FROM Plantacao")
+        registrar_alteracao(cursor)
+        conn.commit()
+        apagar_arquivo()
+        print("🧹 Banco de dados esvaziado.")
     except mysql.connector.Error as err:
-        print(f"Erro ao limpar dados mockados: {err}")
+        print(f"Erro ao esvaziar o banco de dados: {err}")
         conn.rollback()
     finally:
         cursor.close()
 
+@medido('populate_db.popular_banco_de_dados_com_mocks')
 def popular_banco_de_dados_com_mocks():
     """
     Popula o banco de dados com os dados mockados definidos em dataset_mock.py.
@@ -73,9 +119,10 @@ def popular_banco_de_dados_com_mocks():
                 plantacao_data['ph_ideal_min'],
                 plantacao_data['ph_ideal_max']
             ))
-            conn.commit()
             plantacao_ids[plantacao_data['nome']] = cursor.lastrowid
-            print(f"Plantação '{plantacao_data['nome']}' (ID: {cursor.lastrowid}) inserida.")
+            registrar_alteracao(cursor)
+            conn.commit()
+            print(f"Plantação '{plantacao_data['nome']}' (ID: {plantacao_ids[plantacao_data['nome']]}) inserida.")
 
         # 2. Inserir Sensores para cada plantação
         sensor_ids_por_tipo_e_plantacao = {} # {plantacao_nome: {tipo_sensor: id_sensor}}
@@ -86,16 +133,13 @@ def popular_banco_de_dados_com_mocks():
                 tipo_sensor = sensor_template['tipo']
                 query_sensor = "INSERT INTO Sensor (tipo, id_plantacao) VALUES (%s, %s)"
                 cursor.execute(query_sensor, (tipo_sensor, p_id))
-                conn.commit()
                 sensor_ids_por_tipo_e_plantacao[plantacao_nome][tipo_sensor] = cursor.lastrowid
-                print(f"Sensor '{tipo_sensor}' (ID: {cursor.lastrowid}) inserido para '{plantacao_nome}'.")
+                registrar_alteracao(cursor)
+                conn.commit()
+                print(f"Sensor '{tipo_sensor}' (ID: {sensor_ids_por_tipo_e_plantacao[plantacao_nome][tipo_sensor]}) inserido para '{plantacao_nome}'.")
 
         # 3. Inserir Leituras Mockadas
         print("\n📊 Inserindo leituras mockadas para todas as plantações e sensores...")
-        query_leitura = """
-            INSERT INTO Leitura (id_sensor, tipo_sensor, data_hora, valor) 
-            VALUES (%s, %s, %s, %s)
-        """
         for plantacao_nome, p_id in plantacao_ids.items():
             if plantacao_nome == "Fazenda Teste Mockada":
                 # Usar os IDs de sensores da "Fazenda Teste Mockada"
@@ -105,14 +149,7 @@ def popular_banco_de_dados_com_mocks():
 
                 if umidade_sensor_id and ph_sensor_id and temperatura_sensor_id:
                     leituras = gerar_leituras_mock(umidade_sensor_id, ph_sensor_id, temperatura_sensor_id)
-                    for leitura_data in leituras:
-                        cursor.execute(query_leitura, (
-                            leitura_data['id_sensor'],
-                            leitura_data['tipo_sensor'],
-                            leitura_data['data_hora'],
-                            leitura_data['valor']
-                        ))
-                    conn.commit()
+                    inserir_leituras_em_lote(leituras, conn=conn)
                     print(f"Leituras para '{plantacao_nome}' inseridas.")
                 else:
                     print(f"Aviso: Sensores para '{plantacao_nome}' não encontrados, leituras não inseridas.")
@@ -122,18 +159,9 @@ def popular_banco_de_dados_com_mocks():
                 
                 if umidade_sensor_id and ph_sensor_id:
                     leituras = gerar_leituras_mock(umidade_sensor_id, ph_sensor_id, umidade_sensor_id)
-                    
-                    for leitura_data in leituras:
-                        if leitura_data['tipo_sensor'] == 'temperatura':
-                            continue 
-                        
-                        cursor.execute(query_leitura, (
-                            leitura_data['id_sensor'],
-                            leitura_data['tipo_sensor'],
-                            leitura_data['data_hora'],
-                            leitura_data['valor']
-                        ))
-                    conn.commit()
+                    inserir_leituras_em_lote(
+                        (l for l in leituras if l['tipo_sensor'] != 'temperatura'), conn=conn
+                    )
                     print(f"Leituras para '{plantacao_nome}' inseridas.")
                 else:
                     print(f"Aviso: Sensores para '{plantacao_nome}' não encontrados, leituras não inseridas.")
@@ -148,5 +176,95 @@ def popular_banco_de_dados_com_mocks():
         cursor.close()
         conn.close()
 
+@medido('populate_db.popular_carga_sintetica')
+def popular_carga_sintetica(num_plantacoes, sensores_por_plantacao, dias, intervalo_segundos=60, semente=42, usar_load_data=True):
+    """
+    Cria plantações "Carga Sintética N" com seus sensores e as preenche com leituras geradas
+    por dataset_mock.gerar_blocos_sinteticos, bloco a bloco, para testes de capacidade.
+    """
+    conn = criar_conexao()
+    if not conn:
+        print("Não foi possível conectar ao banco de dados. Abortando carga sintética.")
+        return
+
+    cursor = conn.cursor()
+    try:
+        print(f"--- Carga sintética: {num_plantacoes} plantação(ões) × {sensores_por_plantacao} sensor(es), {dias} dia(s) ---")
+        sensores = []
+        for plantacao_data in gerar_plantacoes_sinteticas(num_plantacoes, semente):
+            cursor.execute("""
+                INSERT INTO Plantacao (nome, localizacao, umidade_ideal, ph_ideal_min, ph_ideal_max)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (
+                plantacao_data['nome'],
+                plantacao_data['localizacao'],
+                plantacao_data['umidade_ideal'],
+                plantacao_data['ph_ideal_min'],
+                plantacao_data['ph_ideal_max']
+            ))
+            id_plantacao = cursor.lastrowid
+            for s in range(sensores_por_plantacao):
+                tipo_sensor = TIPOS_SINTETICOS[s % len(TIPOS_SINTETICOS)]
+                cursor.execute("INSERT INTO Sensor (tipo, id_plantacao) VALUES (%s, %s)", (tipo_sensor, id_plantacao))
+                sensores.append((cursor.lastrowid, tipo_sensor))
+        registrar_alteracao(cursor)
+        conn.commit()
+        print(f"🌱 {num_plantacoes} plantação(ões) e {len(sensores)} sensor(es) inseridos.")
+
+        fim = datetime.datetime.now().replace(microsecond=0)
+        inicio = fim - datetime.timedelta(days=dias)
+        blocos = gerar_blocos_sinteticos(sensores, inicio, fim, intervalo_segundos, semente)
+
+        t0 = time.perf_counter()
+        inseridas = inserir_leituras_em_lote(
+            (linhas_do_bloco(bloco) for bloco in blocos),
+            tamanho_lote=100000 if usar_load_data else 1000,
+            linhas_por_commit=500000,
+            usar_load_data=usar_load_data,
+            conn=None if usar_load_data else conn
+        )
+        duracao = time.perf_counter() - t0
+        print(f"📊 {inseridas} leituras sintéticas inseridas em {duracao:.1f}s ({inseridas / max(duracao, 1e-9):,.0f} leituras/s).")
+    except mysql.connector.Error as err:
+        print(f"Erro ao gerar carga sintética: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco com os dados mockados ou com uma carga sintética.")
+    parser.add_argument('--sintetico', action='store_true', help=f"Gera plantações '{PREFIXO_SINTETICO} N' em vez dos mocks")
+    parser.add_argument('--plantacoes', type=int, default=10)
+    parser.add_argument('--sensores', type=int, default=3, help="Sensores por plantação")
+    parser.add_argument('--dias', type=float, default=30)
+    parser.add_argument('--intervalo', type=int, default=60, help="Segundos entre leituras de um sensor")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--sem-load-data', action='store_true', help="Usa INSERT multi-linha em vez de LOAD DATA")
+    parser.add_argument('--limpar', action='store_true', help="Só remove os dados mockados (ou sintéticos, com --sintetico)")
+    parser.add_argument('--resetar', action='store_true', help="Apaga TODAS as plantações, sensores e leituras")
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_PURGA, help="Leituras removidas por transação")
+    args = parser.parse_args()
+
+    iniciar_exportacao('populate_db') # tempos das etapas e comandos, exportados ao terminar
+    if args.limpar or args.resetar:
+        conn = criar_conexao()
+        if not conn:
+            return
+        try:
+            if args.resetar:
+                resetar_dados(conn)
+            elif args.sintetico:
+                limpar_plantacoes(conn, prefixo=f"{PREFIXO_SINTETICO} ", tamanho_lote=args.tamanho_lote)
+            else:
+                limpar_plantacoes(conn, nomes=[p["nome"] for p in plantacoes_mock], tamanho_lote=args.tamanho_lote)
+        finally:
+            conn.close()
+    elif args.sintetico:
+        popular_carga_sintetica(args.plantacoes, args.sensores, args.dias, args.intervalo, args.semente,
+                                usar_load_data=not args.sem_load_data)
+    else:
+        popular_banco_de_dados_com_mocks()
+
 if __name__ == '__main__':
-    popular_banco_de_dados_com_mocks()
+    main()
@@ -0,0 +1,117 @@
+"""
+Previsão por regressão linear (valor ~ tempo) mantida de forma incremental.
+
+Em vez de reajustar um modelo sobre todo o histórico a cada atualização do dashboard,
+guardamos as estatísticas suficientes dos mínimos quadrados (n, Σt, Σy, Σt², Σty).
+Somar ou retirar leituras custa O(1) por leitura, e a reta sai delas em forma fechada,
+com o mesmo resultado de `sklearn.linear_model.LinearRegression` sobre as mesmas leituras.
+"""
+import numpy as np
+
+HORIZONTES_PADRAO = {
+    "próxima hora": 3600,
+    "próximas 6 horas": 6 * 3600,
+    "próximas 24 horas": 24 * 3600
+}
+
+def para_segundos(datas):
+    """Converte datas (Series/array datetime64 ou escalar) em segundos desde a Época, como float."""
+    return np.asarray(datas, dtype='datetime64[ns]').astype(np.int64) / 1e9
+
+class RegressaoIncremental:
+    """
+    Reta de mínimos quadrados sobre um conjunto de leituras que pode crescer e encolher.
+    O tempo é medido em horas a partir de uma referência fixa (a primeira leitura vista),
+    para que as somas não percam precisão com timestamps grandes.
+    """
+
+    def __init__(self):
+        self.referencia = None
+        self.n = 0
+        self.soma_t = self.soma_y = self.soma_tt = self.soma_ty = 0.0
+
+    def _tempo(self, t):
+        return (np.asarray(t, dtype=np.float64) - self.referencia) / 3600.0
+
+    def _acumular(self, t, y, sinal):
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        if len(t) == 0:
+            return
+        if self.referencia is None:
+            self.referencia = float(t[0])
+        h = self._tempo(t)
+        self.n += sinal * len(h)
+        self.soma_t += sinal * h.sum()
+        self.soma_y += sinal * y.sum()
+        self.soma_tt += sinal * (h * h).sum()
+        self.soma_ty += sinal * (h * y).sum()
+
+    def estado(self):
+        """Estatísticas suficientes em dict (JSON), para gravar o modelo ajustado (src/modelos.py)."""
+        return {'referencia': self.referencia, 'n': self.n, 'soma_t': self.soma_t, 'soma_y': self.soma_y,
+                'soma_tt': self.soma_tt, 'soma_ty': self.soma_ty}
+
+    @classmethod
+    def de_estado(cls, estado):
+        """Reconstrói o modelo a partir de `estado()`, sem rever as leituras."""
+        modelo = cls()
+        for campo, valor in estado.items():
+            setattr(modelo, campo, valor)
+        return modelo
+
+    def adicionar(self, t, y):
+        """Inclui leituras (t em segundos desde a Época; escalares ou arrays)."""
+        self._acumular(t, y, 1)
+
+    def remover(self, t, y):
+        """Retira leituras incluídas antes (ex: que saíram da janela do gráfico)."""
+        self._acumular(t, y, -1)
+
+    def coeficientes(self):
+        """(intercepto, inclinação por hora) na escala de `referencia`, ou None com menos de 2 tempos distintos."""
+        if self.n < 2:
+            return None
+        variancia = self.n * self.soma_tt - self.soma_t ** 2
+        if variancia <= 1e-12 * max(1.0, self.n * self.soma_tt):
+            return None
+        inclinacao = (self.n * self.soma_ty - self.soma_t * self.soma_y) / variancia
+        intercepto = (self.soma_y - inclinacao * self.soma_t) / self.n
+        return intercepto, inclinacao
+
+    def prever(self, t):
+        """Valor previsto no(s) instante(s) t (segundos desde a Época), ou None sem dados suficientes."""
+        coeficientes = self.coeficientes()
+        if coeficientes is None:
+            return None
+        intercepto, inclinacao = coeficientes
+        return intercepto + inclinacao * self._tempo(t)
+
+    def prever_horizontes(self, t_base, horizontes=HORIZONTES_PADRAO):
+        """{nome: previsão} para cada horizonte (em segundos) a partir de t_base."""
+        if self.coeficientes() is None:
+            return {}
+        return {nome: float(self.prever(t_base + segundos)) for nome, segundos in horizontes.items()}
+
+def regressao_por_grupo(df, chaves, horizonte_s=3600):
+    """
+    Ajusta a reta valor ~ tempo de todos os grupos de `df` (colunas data_hora e valor) numa
+    única passada: as estatísticas suficientes saem de um groupby().sum(), sem laço por grupo.
+    Retorna, por grupo, `n`, `ultima_data` e `previsao` (horizonte_s após a última leitura;
+    NaN para grupos com menos de 2 tempos distintos).
+    """
+    t = para_segundos(df['data_hora'])
+    h = (t - t.min()) / 3600.0 if len(t) else t
+    y = df['valor'].to_numpy(dtype=np.float64)
+    somas = df[chaves].assign(n=1, t=h, y=y, tt=h * h, ty=h * y).groupby(chaves).sum()
+
+    variancia = somas['n'] * somas['tt'] - somas['t'] ** 2
+    variancia = variancia.where(variancia > 1e-12 * np.maximum(1.0, somas['n'] * somas['tt']))
+    inclinacao = (somas['n'] * somas['ty'] - somas['t'] * somas['y']) / variancia
+    intercepto = (somas['y'] - inclinacao * somas['t']) / somas['n']
+
+    ultimo_h = df[chaves].assign(h=h).groupby(chaves)['h'].max()
+    resultado = somas[['n']].copy()
+    resultado['ultima_data'] = df.groupby(chaves)['data_hora'].max()
+    resultado['previsao'] = intercepto + inclinacao * (ultimo_h + horizonte_s / 3600.0)
+    return resultado
@@ -72,6 +72,10 @@ void loop() {
   if (isnan(temperatura)) {
     Serial.println(F("Erro na leitura de temperatura!"));
   } else {
+    // Linha "Temp: xx.x" consumida pelo daemon de ingestão (src/ingestao_serial.py)
+    Serial.print("Temp: ");
+    Serial.println(temperatura, 1);
+
     lcd.setCursor(0, 1);
     lcd.print("Temp: ");
     lcd.print(temperatura, 1);
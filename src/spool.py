@@ -0,0 +1,272 @@
+"""
+Spool em disco das leituras que não puderam ser gravadas no banco (queda ou lentidão do MySQL).
+
+As leituras são anexadas a arquivos de segmento (somente append) numa pasta local e, quando o
+banco volta, reenviadas em ordem e em lotes grandes por inserir_leituras_em_lote. Os segmentos
+são lidos com mmap; o deslocamento já reenviado de cada segmento fica num arquivo .pos, então
+uma interrupção no meio do reenvio retoma do último lote confirmado (no pior caso, o lote em
+andamento é gravado duas vezes). Segmentos totalmente reenviados são apagados.
+
+Usado pelos daemons de ingestão (src/ingestao_serial.py e src/ingestao_http.py com --spool).
+Para ver o que está pendente ou reenviar tudo manualmente:
+
+    python -m src.spool                  # segmentos e bytes pendentes
+    python -m src.spool --drenar         # reenvia tudo para o banco
+"""
+import argparse
+import datetime
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+
+import mysql.connector
+
+from src.banco_dados import conexao, inserir_leituras_em_lote
+from src.metricas import medido
+
+DIRETORIO_SPOOL = os.environ.get('FARMTECH_SPOOL_DIR', os.path.join('dados', 'spool'))
+TAMANHO_SEGMENTO = 64 * 1024 * 1024 # bytes por arquivo de segmento antes de abrir o próximo
+TAMANHO_LOTE_REENVIO = 50000 # leituras por transação ao reenviar
+INTERVALO_NOVA_TENTATIVA = 5.0 # segundos sem tentar o banco depois de uma falha
+TENTATIVAS_REENVIO = 3 # falhas seguidas do mesmo lote (com o banco no ar) antes de separá-lo
+
+# Registro: id_sensor, data_hora (microssegundos desde 1970, sem fuso), valor, tamanho do tipo + tipo (UTF-8)
+_REGISTRO = struct.Struct('<iqdB')
+_EPOCA = datetime.datetime(1970, 1, 1)
+_MICROSSEGUNDO = datetime.timedelta(microseconds=1)
+
+def _codificar(leitura):
+    if isinstance(leitura, dict):
+        leitura = (leitura['id_sensor'], leitura['tipo_sensor'], leitura['data_hora'], leitura['valor'])
+    id_sensor, tipo_sensor, data_hora, valor = leitura
+    if isinstance(data_hora, str):
+        data_hora = datetime.datetime.fromisoformat(data_hora)
+    if data_hora.tzinfo is not None:
+        data_hora = data_hora.astimezone().replace(tzinfo=None)
+    tipo = tipo_sensor.strip().lower().encode('utf-8')
+    return _REGISTRO.pack(int(id_sensor), (data_hora - _EPOCA) // _MICROSSEGUNDO, float(valor), len(tipo)) + tipo
+
+def _decodificar(dados, inicio, limite):
+    """Lê até `limite` registros a partir de `inicio`; retorna (leituras, deslocamento do próximo registro)."""
+    leituras = []
+    posicao = inicio
+    fim = len(dados)
+    while len(leituras) < limite and posicao + _REGISTRO.size <= fim:
+        id_sensor, micros, valor, tamanho_tipo = _REGISTRO.unpack_from(dados, posicao)
+        final = posicao + _REGISTRO.size + tamanho_tipo
+        if final > fim:
+            break # registro incompleto no fim do arquivo (gravação interrompida)
+        tipo = bytes(dados[posicao + _REGISTRO.size:final]).decode('utf-8')
+        leituras.append((id_sensor, tipo, _EPOCA + micros * _MICROSSEGUNDO, valor))
+        posicao = final
+    return leituras, posicao
+
+class SpoolLeituras:
+    """Fila de leituras em disco, segura para várias threads anexando e uma reenviando."""
+
+    def __init__(self, diretorio=DIRETORIO_SPOOL, tamanho_segmento=TAMANHO_SEGMENTO, sincronizar=False):
+        self.diretorio = diretorio
+        self.tamanho_segmento = tamanho_segmento
+        self.sincronizar = sincronizar # fsync a cada anexação: sobrevive a queda de energia, custa latência
+        self.total_anexadas = 0
+        self.total_reenviadas = 0
+        self._lock = threading.Lock()
+        self._ativo = None # segmento aberto para anexar
+        self._bytes_ativo = 0
+        self._espera_ate = 0.0 # não tenta o banco antes disso (monotonic)
+        self._recusas = 0 # falhas seguidas do mesmo lote no reenvio
+        os.makedirs(diretorio, exist_ok=True)
+        # Segmentos de execuções anteriores ficam como estão: serão reenviados antes dos novos
+        self._proximo = max((self._numero(c) for c in self._segmentos()), default=0) + 1
+
+    @staticmethod
+    def _numero(caminho):
+        return int(os.path.basename(caminho).split('.')[0])
+
+    def _segmentos(self):
+        return sorted(glob.glob(os.path.join(self.diretorio, '*.spool')), key=self._numero)
+
+    def _selar(self):
+        """Fecha o segmento ativo; o próximo anexo abre um novo. Chamar com o lock."""
+        if self._ativo:
+            self._ativo.close()
+            self._ativo = None
+            self._bytes_ativo = 0
+
+    def adicionar(self, leituras):
+        """Anexa leituras (tuplas ou dicts como em inserir_leituras_em_lote) ao spool. Retorna quantas."""
+        registros = [_codificar(leitura) for leitura in leituras]
+        if not registros:
+            return 0
+        dados = b''.join(registros)
+        with self._lock:
+            if self._ativo is None:
+                caminho = os.path.join(self.diretorio, f"{self._proximo:010d}.spool")
+                self._proximo += 1
+                self._ativo = open(caminho, 'ab')
+            try:
+                self._ativo.write(dados)
+                self._ativo.flush()
+                if self.sincronizar:
+                    os.fsync(self._ativo.fileno())
+            except OSError:
+                # Não deixa um registro pela metade no meio do segmento
+                self._ativo.truncate(self._bytes_ativo)
+                self._selar()
+                raise
+            self._bytes_ativo += len(dados)
+            self.total_anexadas += len(registros)
+            if self._bytes_ativo >= self.tamanho_segmento:
+                self._selar()
+        return len(registros)
+
+    @property
+    def pendente(self):
+        return self._ativo is not None or bool(self._segmentos())
+
+    def bytes_pendentes(self):
+        total = 0
+        for caminho in self._segmentos():
+            try:
+                total += os.path.getsize(caminho) - self._ler_posicao(caminho)
+            except OSError:
+                pass # segmento apagado por um reenvio em andamento
+        return total
+
+    def _ler_posicao(self, caminho):
+        try:
+            with open(caminho[:-len('.spool')] + '.pos') as arquivo:
+                return int(arquivo.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _salvar_posicao(self, caminho, posicao):
+        destino = caminho[:-len('.spool')] + '.pos'
+        with open(destino + '.tmp', 'w') as arquivo:
+            arquivo.write(str(posicao))
+        os.replace(destino + '.tmp', destino)
+
+    def _descartar(self, caminho):
+        posicao = caminho[:-len('.spool')] + '.pos'
+        os.remove(caminho)
+        if os.path.exists(posicao):
+            os.remove(posicao)
+
+    def _separar_lote(self, caminho, dados, posicao):
+        """Grava os registros de um lote recusado num arquivo .rejeitado (mesmo formato do segmento)."""
+        destino = f"{caminho[:-len('.spool')]}-{posicao}.rejeitado"
+        with open(destino, 'wb') as arquivo:
+            arquivo.write(dados)
+        return destino
+
+    def _falhou(self):
+        self._espera_ate = time.monotonic() + INTERVALO_NOVA_TENTATIVA
+
+    def gravar(self, lote, conn=None):
+        """
+        Grava o lote no banco numa única transação; se não der (banco fora do ar, conexão perdida),
+        anexa o lote ao spool. Depois de uma falha, os lotes vão direto para o spool por
+        INTERVALO_NOVA_TENTATIVA segundos, sem esperar o banco a cada lote.
+        Retorna (gravadas no banco, anexadas ao spool).
+        """
+        if not lote:
+            return 0, 0
+        if time.monotonic() >= self._espera_ate:
+            try:
+                gravadas = inserir_leituras_em_lote(lote, tamanho_lote=1000, linhas_por_commit=len(lote), conn=conn)
+            except mysql.connector.Error as err:
+                print(f"Erro ao gravar lote de leituras: {err}")
+                gravadas = 0
+            if gravadas == len(lote):
+                self._espera_ate = 0.0
+                if self.pendente:
+                    self.drenar(conn, max_lotes=1) # o banco voltou: reenvia aos poucos entre os lotes novos
+                return gravadas, 0
+            self._falhou()
+        return 0, self.adicionar(lote)
+
+    @medido('spool.drenar', linhas=int)
+    def drenar(self, conn=None, tamanho_lote=TAMANHO_LOTE_REENVIO, max_lotes=None, forcar=False):
+        """
+        Reenvia as leituras do spool em ordem, `tamanho_lote` por transação, até esvaziá-lo,
+        até `max_lotes` lotes ou até a primeira falha. Retorna quantas leituras foram reenviadas.
+        """
+        if not forcar and time.monotonic() < self._espera_ate:
+            return 0
+        with self._lock:
+            # O segmento ativo também entra no reenvio. A lista é tirada com o lock: um segmento aberto
+            # depois por outra thread fica para o próximo reenvio, em vez de ser lido pela metade e apagado.
+            self._selar()
+            segmentos = self._segmentos()
+        reenviadas = 0
+        lotes = 0
+        for caminho in segmentos:
+            with open(caminho, 'rb') as arquivo:
+                if os.fstat(arquivo.fileno()).st_size == 0:
+                    arquivo.close()
+                    self._descartar(caminho)
+                    continue
+                with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+                    posicao = self._ler_posicao(caminho)
+                    while True:
+                        if max_lotes is not None and lotes >= max_lotes:
+                            return reenviadas
+                        lote, proxima = _decodificar(dados, posicao, tamanho_lote)
+                        if not lote:
+                            break
+                        try:
+                            gravadas = inserir_leituras_em_lote(lote, tamanho_lote=1000, linhas_por_commit=len(lote), conn=conn)
+                        except mysql.connector.Error as err:
+                            print(f"Erro ao reenviar leituras do spool: {err}")
+                            gravadas = 0
+                        lotes += 1
+                        if gravadas != len(lote):
+                            self._falhou()
+                            self._recusas += 1
+                            if self._recusas < TENTATIVAS_REENVIO or not self._banco_no_ar():
+                                return reenviadas
+                            # O banco responde mas recusa o lote (ex: sensor removido): separa só esse lote
+                            rejeitado = self._separar_lote(caminho, dados[posicao:proxima], posicao)
+                            print(f"⚠️ Lote do spool recusado {self._recusas} vezes; {len(lote)} leituras separadas em {rejeitado}")
+                            self._recusas = 0
+                            self._espera_ate = 0.0
+                        else:
+                            self._recusas = 0
+                            reenviadas += gravadas
+                            self.total_reenviadas += gravadas
+                        posicao = proxima
+                        self._salvar_posicao(caminho, posicao)
+            self._descartar(caminho)
+        if reenviadas:
+            print(f"📤 {reenviadas} leituras reenviadas do spool.")
+        return reenviadas
+
+    def _banco_no_ar(self):
+        with conexao() as teste:
+            return teste is not None
+
+    def fechar(self):
+        with self._lock:
+            self._selar()
+
+def main():
+    parser = argparse.ArgumentParser(description="Spool em disco das leituras não gravadas no banco.")
+    parser.add_argument('--diretorio', default=DIRETORIO_SPOOL)
+    parser.add_argument('--drenar', action='store_true', help="Reenvia todas as leituras pendentes para o banco")
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_REENVIO, help="Leituras por transação no reenvio")
+    args = parser.parse_args()
+
+    spool = SpoolLeituras(args.diretorio)
+    segmentos = spool._segmentos()
+    print(f"📦 {len(segmentos)} segmento(s), {spool.bytes_pendentes()} bytes pendentes em {args.diretorio}.")
+    if args.drenar and segmentos:
+        inicio = time.perf_counter()
+        reenviadas = spool.drenar(tamanho_lote=args.tamanho_lote, forcar=True)
+        print(f"✅ {reenviadas} leituras reenviadas em {time.perf_counter() - inicio:.1f}s; "
+              f"{spool.bytes_pendentes()} bytes ainda pendentes.")
+
+if __name__ == '__main__':
+    main()
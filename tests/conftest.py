@@ -0,0 +1,14 @@
+"""
+Configuração dos testes: o backend embarcado (SQLite, src/armazenamento.py) num arquivo
+temporário e sem métricas. As variáveis são lidas na importação de src, então ficam aqui.
+"""
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+os.environ['FARMTECH_BACKEND'] = 'sqlite'
+os.environ['FARMTECH_SQLITE_ARQUIVO'] = os.path.join(tempfile.mkdtemp(prefix='farmtech-testes-'), 'farmtech.db')
+os.environ['FARMTECH_METRICAS'] = '0'
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from src.alertas import HISTERESE, TOLERANCIA_UMIDADE, MotorAlertas, _classificar
+from src.banco_dados import conexao
+from src.metadados import registrar_alteracao
+
+UMIDADE_IDEAL, PH_MIN, PH_MAX = 60.0, 6.0, 7.0
+MINIMO, MAXIMO = UMIDADE_IDEAL - TOLERANCIA_UMIDADE, UMIDADE_IDEAL + TOLERANCIA_UMIDADE
+MARGEM = HISTERESE['umidade']
+
+@pytest.mark.parametrize('valor, atual, esperado', [
+    (MINIMO - 0.1, 'ok', 'baixo'),
+    (MAXIMO + 0.1, 'ok', 'alto'),
+    (MINIMO, 'ok', 'ok'), # os limites pertencem à faixa ideal
+    (MAXIMO, 'ok', 'ok'),
+    (MINIMO + MARGEM - 0.1, 'baixo', 'baixo'), # dentro da faixa, mas sem passar da histerese
+    (MINIMO + MARGEM, 'baixo', 'ok'),
+    (MAXIMO - MARGEM + 0.1, 'alto', 'alto'),
+    (MAXIMO - MARGEM, 'alto', 'ok'),
+    (MAXIMO + 1, 'baixo', 'alto'), # salto direto de um extremo ao outro
+    (MINIMO - 1, 'alto', 'baixo'),
+])
+def test_classificar(valor, atual, esperado):
+    assert _classificar(valor, atual, MINIMO, MAXIMO, MARGEM) == esperado
+
+@pytest.fixture(scope='module')
+def sensores():
+    """Uma plantação com sensores de umidade, pH e temperatura no banco SQLite dos testes."""
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO Plantacao (nome, localizacao, umidade_ideal, ph_ideal_min, ph_ideal_max) VALUES (%s, %s, %s, %s, %s)",
+            ('Teste', 'Bancada', UMIDADE_IDEAL, PH_MIN, PH_MAX)
+        )
+        id_plantacao = cursor.lastrowid
+        ids = {}
+        for tipo in ('umidade', 'ph', 'temperatura'):
+            cursor.execute("INSERT INTO Sensor (tipo, id_plantacao) VALUES (%s, %s)", (tipo, id_plantacao))
+            ids[tipo] = cursor.lastrowid
+        registrar_alteracao(cursor)
+        conn.commit()
+        cursor.close()
+    return ids
+
+def _leituras(id_sensor, tipo, valores):
+    inicio = datetime.datetime(2024, 3, 1, 8, 0)
+    return [(id_sensor, tipo, inicio + datetime.timedelta(minutes=i), valor) for i, valor in enumerate(valores)]
+
+def test_mudanca_exige_confirmacoes_seguidas(sensores):
+    motor = MotorAlertas(confirmacoes=3)
+    umidade = sensores['umidade']
+    # Duas leituras baixas e uma normal: a sequência recomeça, sem alerta
+    assert motor.avaliar(_leituras(umidade, 'umidade', [40, 40, 60, 40, 40])) == []
+    alertas = motor.avaliar(_leituras(umidade, 'umidade', [40]))
+    assert [(a['situacao'], a['anterior'], a['limite']) for a in alertas] == [('baixo', 'ok', MINIMO)]
+    # Já em alerta: novas leituras baixas não repetem o alerta
+    assert motor.avaliar(_leituras(umidade, 'umidade', [40] * 10)) == []
+
+def test_volta_ao_normal_respeita_histerese(sensores):
+    motor = MotorAlertas(confirmacoes=2)
+    umidade = sensores['umidade']
+    motor.avaliar(_leituras(umidade, 'umidade', [40, 40]))
+    # Oscilando logo acima do mínimo, dentro da margem: continua 'baixo'
+    assert motor.avaliar(_leituras(umidade, 'umidade', [MINIMO + MARGEM / 2] * 5)) == []
+    alertas = motor.avaliar(_leituras(umidade, 'umidade', [UMIDADE_IDEAL] * 2))
+    assert [(a['situacao'], a['anterior'], a['limite']) for a in alertas] == [('ok', 'baixo', MINIMO)]
+
+def test_sensores_independentes_e_sem_limites(sensores):
+    motor = MotorAlertas(confirmacoes=2)
+    leituras = (_leituras(sensores['ph'], 'ph', [7.5, 7.5]) + _leituras(sensores['umidade'], 'umidade', [40])
+                + _leituras(sensores['temperatura'], 'temperatura', [99, 99]))
+    alertas = motor.avaliar(leituras)
+    assert [(a['id_sensor'], a['situacao'], a['limite']) for a in alertas] == [(sensores['ph'], 'alto', PH_MAX)]
+
+def test_alertas_gravados_em_lote(sensores):
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Alerta")
+        antes = cursor.fetchone()[0]
+        motor = MotorAlertas(confirmacoes=1)
+        motor.avaliar(_leituras(sensores['ph'], 'ph', [5.0, 6.5, 7.5]))
+        assert motor.persistir(forcar=True) == 3
+        cursor.execute("SELECT situacao FROM Alerta ORDER BY id")
+        assert [situacao for (situacao,) in cursor.fetchall()][antes:] == ['baixo', 'ok', 'alto']
+        cursor.close()
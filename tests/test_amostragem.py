@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.amostragem import lttb, min_max, reduzir_serie
+
+def _serie(n, semente=0):
+    rng = np.random.default_rng(semente)
+    indice = pd.date_range('2024-03-01', periods=n, freq='min')
+    valores = 60 + 10 * np.sin(np.linspace(0, 12 * np.pi, n)) + rng.normal(0, 1.0, n)
+    return pd.Series(valores, index=indice)
+
+@pytest.mark.parametrize('n, n_pontos', [(10000, 1200), (1000, 3), (1001, 500), (5000, 4999)])
+def test_lttb_mantem_extremidades_e_tamanho(n, n_pontos):
+    serie = _serie(n)
+    indices = lttb(serie.index.values, serie.values, n_pontos)
+    assert len(indices) == n_pontos
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0) # um ponto por balde, em ordem
+
+def test_lttb_sem_reducao_devolve_todos():
+    serie = _serie(100)
+    assert list(lttb(serie.index.values, serie.values, 100)) == list(range(100))
+    assert list(lttb(serie.index.values, serie.values, 2)) == list(range(100))
+
+def test_lttb_preserva_pico_isolado():
+    serie = _serie(10000)
+    serie.iloc[4321] = 500.0
+    indices = lttb(serie.index.values, serie.values, 200)
+    assert 4321 in indices
+
+def test_min_max_mantem_extremos_de_cada_balde():
+    serie = _serie(10000, semente=1)
+    indices = min_max(serie.values, 200)
+    assert indices[0] == 0 and indices[-1] == len(serie) - 1
+    assert len(indices) <= 200 + 2
+    assert serie.values.argmin() in indices and serie.values.argmax() in indices
+
+def test_reduzir_serie():
+    serie = _serie(5000)
+    reduzida = reduzir_serie(serie, n_pontos=300)
+    assert len(reduzida) == 300
+    assert reduzida.index[0] == serie.index[0] and reduzida.index[-1] == serie.index[-1]
+    curta = serie.iloc[:300]
+    assert reduzir_serie(curta, n_pontos=300) is curta
+    with pytest.raises(ValueError):
+        reduzir_serie(serie, n_pontos=300, metodo='media')
@@ -0,0 +1,71 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from src.previsao import RegressaoIncremental, para_segundos, regressao_por_grupo
+
+INICIO = datetime.datetime(2024, 3, 1).timestamp()
+
+def _leituras(n, semente=0):
+    rng = np.random.default_rng(semente)
+    t = INICIO + np.sort(rng.uniform(0, 7 * 24 * 3600, n))
+    y = 55.0 - 0.3 * (t - INICIO) / 3600.0 + rng.normal(0, 2.0, n)
+    return t, y
+
+def _reta_em_lote(t, y):
+    """(intercepto, inclinação por hora) do LinearRegression, na mesma escala de RegressaoIncremental."""
+    h = ((t - t[0]) / 3600.0).reshape(-1, 1)
+    modelo = LinearRegression().fit(h, y)
+    return modelo.intercept_, modelo.coef_[0]
+
+def test_coeficientes_iguais_ao_ajuste_em_lote():
+    t, y = _leituras(500)
+    modelo = RegressaoIncremental()
+    modelo.adicionar(t, y)
+    assert modelo.coeficientes() == pytest.approx(_reta_em_lote(t, y), rel=1e-9)
+
+def test_adicionar_aos_poucos_e_remover_equivale_a_reajustar():
+    t, y = _leituras(1000, semente=1)
+    modelo = RegressaoIncremental()
+    for inicio in range(0, len(t), 100):
+        modelo.adicionar(t[inicio:inicio + 100], y[inicio:inicio + 100])
+    # Janela deslizante: as 300 primeiras saem, a referência continua sendo a primeira leitura vista
+    modelo.remover(t[:300], y[:300])
+    intercepto, inclinacao = _reta_em_lote(t[300:], y[300:])
+    deslocamento = (t[300] - t[0]) / 3600.0
+    esperado = (intercepto - inclinacao * deslocamento, inclinacao)
+    assert modelo.n == 700
+    assert modelo.coeficientes() == pytest.approx(esperado, rel=1e-7)
+    assert modelo.prever(t[-1] + 3600) == pytest.approx(intercepto + inclinacao * ((t[-1] + 3600 - t[300]) / 3600.0), rel=1e-7)
+
+def test_estado_reconstroi_o_mesmo_modelo():
+    t, y = _leituras(200, semente=2)
+    modelo = RegressaoIncremental()
+    modelo.adicionar(t, y)
+    copia = RegressaoIncremental.de_estado(modelo.estado())
+    assert copia.prever_horizontes(t[-1]) == modelo.prever_horizontes(t[-1])
+
+def test_sem_tempos_distintos_nao_ha_reta():
+    modelo = RegressaoIncremental()
+    assert modelo.prever(INICIO) is None
+    modelo.adicionar([INICIO, INICIO], [50.0, 52.0])
+    assert modelo.coeficientes() is None
+    assert modelo.prever_horizontes(INICIO) == {}
+
+def test_regressao_por_grupo_igual_a_um_modelo_por_grupo():
+    t, y = _leituras(600, semente=3)
+    df = pd.DataFrame({
+        'id_sensor': np.arange(len(t)) % 3,
+        'data_hora': pd.to_datetime(t, unit='s'),
+        'valor': y,
+    })
+    resultado = regressao_por_grupo(df, ['id_sensor'])
+    for id_sensor, grupo in df.groupby('id_sensor'):
+        modelo = RegressaoIncremental()
+        segundos = para_segundos(grupo['data_hora'])
+        modelo.adicionar(segundos, grupo['valor'])
+        assert resultado.loc[id_sensor, 'n'] == len(grupo)
+        assert resultado.loc[id_sensor, 'previsao'] == pytest.approx(float(modelo.prever(segundos.max() + 3600)), rel=1e-9)